@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark volledige vs gereduceerde decode: latency en piek geheugen per resolutie"""
+
+import argparse
+import io
+import math
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MEGAPIXELS = (1, 4, 12, 48)
+
+
+def make_jpeg(megapixels: float, quality: int = 90) -> bytes:
+    """Synthetische 4:3 foto met textuur, zodat JPEG niet triviaal comprimeert"""
+    from PIL import Image
+
+    breedte = int(math.sqrt(megapixels * 1_000_000 * 4 / 3))
+    hoogte = int(breedte * 3 / 4)
+    ruis = Image.effect_noise((breedte, hoogte), 48)
+    gradient = Image.linear_gradient("L").resize((breedte, hoogte))
+    afbeelding = Image.merge("RGB", (ruis, gradient, gradient.rotate(180)))
+
+    buffer = io.BytesIO()
+    afbeelding.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _measure(afbeelding_bytes: bytes, fast: bool, image_size: int, runs: int, queue) -> None:
+    """Child proces: eigen piek RSS, zodat metingen elkaar niet beïnvloeden"""
+    import psutil
+    from timm.data import create_transform
+
+    from src.context_managers.image_context import decoded_image
+    from src.features.image_decoding import apply_transform, min_decode_side
+
+    transform = create_transform(input_size=(3, image_size, image_size), crop_pct=1.0)
+    min_side = min_decode_side(transform) if fast else None
+    baseline_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        with decoded_image(afbeelding_bytes, len(afbeelding_bytes), min_side) as (img, _):
+            decoded_size = img.size
+            apply_transform(transform, img)
+        timings.append(time.perf_counter() - start)
+
+    # ru_maxrss is in KB op Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put(
+        {
+            "median_ms": statistics.median(timings) * 1000,
+            "peak_mb": peak_mb - baseline_mb,
+            "decoded": decoded_size,
+        }
+    )
+
+
+def measure(afbeelding_bytes: bytes, fast: bool, image_size: int, runs: int) -> dict:
+    """Meet in een vers (spawn) proces"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(
+        target=_measure, args=(afbeelding_bytes, fast, image_size, runs, queue)
+    )
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=384, help="Model input resolutie")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--megapixels", type=float, nargs="+", default=list(MEGAPIXELS)
+    )
+    args = parser.parse_args()
+
+    print(f"Model input {args.size}x{args.size}, mediaan van {args.runs} runs")
+    print(
+        f"{'MP':>5}{'MB':>7}{'mode':>10}{'decoded':>13}"
+        f"{'median ms':>12}{'piek MB':>10}{'speedup':>9}"
+    )
+    for megapixels in args.megapixels:
+        afbeelding_bytes = make_jpeg(megapixels)
+        full = measure(afbeelding_bytes, False, args.size, args.runs)
+        fast = measure(afbeelding_bytes, True, args.size, args.runs)
+        for name, result in (("volledig", full), ("draft", fast)):
+            speedup = full["median_ms"] / result["median_ms"]
+            decoded = "x".join(str(side) for side in result["decoded"])
+            print(
+                f"{megapixels:5g}{len(afbeelding_bytes) / 1e6:7.1f}{name:>10}"
+                f"{decoded:>13}{result['median_ms']:12.1f}"
+                f"{result['peak_mb']:10.1f}{speedup:8.1f}x"
+            )
+    print("(piek MB = piek RSS boven de baseline van het meetproces)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Benchmark fp32 vs INT8 ConvNeXt: latency, RSS en output drift"""
+
+import argparse
+import copy
+import gc
+import io
+import math
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import psutil  # noqa: E402
+import timm  # noqa: E402
+import torch  # noqa: E402
+
+from src.config.app_config import AppConfig  # noqa: E402
+from src.services.quantization import check_parity, quantize_int8  # noqa: E402
+
+
+def rss_mb() -> float:
+    """Resident set size van dit proces in MB"""
+    gc.collect()
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def model_size_mb(model) -> float:
+    """Grootte van de geserialiseerde gewichten in MB"""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+
+def measure_latency(model, inputs: torch.Tensor, runs: int) -> dict:
+    """Mediaan en p95 latency van forward passes"""
+    timings = []
+    with torch.no_grad():
+        model(inputs)  # warmup
+        for _ in range(runs):
+            start = time.perf_counter()
+            model(inputs)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "median_ms": statistics.median(timings) * 1000,
+        "p95_ms": timings[max(0, math.ceil(0.95 * len(timings)) - 1)] * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=AppConfig().model_name)
+    parser.add_argument("--pretrained", action="store_true")
+    parser.add_argument("--batch", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--conv", action="store_true", help="Ook Conv2d lagen")
+    parser.add_argument("--threads", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    model = timm.create_model(args.model, pretrained=args.pretrained).eval()
+    fp32_rss = rss_mb()
+
+    size = timm.data.resolve_data_config({}, model=model)["input_size"]
+    inputs = torch.randn(args.batch, *size)
+    fp32 = measure_latency(model, inputs, args.runs)
+
+    quantized = quantize_int8(copy.deepcopy(model), include_conv=args.conv)
+    int8_rss = rss_mb()
+    int8 = measure_latency(quantized, inputs, args.runs)
+
+    parity = check_parity(model, quantized, inputs)
+
+    print(f"Model: {args.model}  batch={args.batch}  threads={torch.get_num_threads()}")
+    print(f"{'':8}{'median ms':>12}{'p95 ms':>12}{'gewicht MB':>12}{'RSS MB':>12}")
+    for name, latency, weights, rss in (
+        ("fp32", fp32, model_size_mb(model), fp32_rss),
+        ("int8", int8, model_size_mb(quantized), int8_rss),
+    ):
+        print(
+            f"{name:8}{latency['median_ms']:12.1f}{latency['p95_ms']:12.1f}"
+            f"{weights:12.1f}{rss:12.1f}"
+        )
+    print("(RSS is proces totaal na laden; int8 rij bevat ook het fp32 model)")
+    print(f"Speedup: {fp32['median_ms'] / int8['median_ms']:.2f}x")
+    print(
+        f"Drift: max_abs={parity['max_abs_diff']:.4f} "
+        f"min_cosine={parity['min_cosine']:.4f} "
+        f"top1={parity['top1_overeenkomst']:.0%}"
+    )
+    for key, value in sorted(parity["stats_drift"].items()):
+        print(f"  stats drift {key:24} {value:.5f}")
+    print("Parity OK" if parity["ok"] else "Parity BUITEN TOLERANTIE")
+    return 0 if parity["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Micro-benchmark extract_tensor_stats: multi-pass referentie vs gefuseerde batch versie"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import torch  # noqa: E402
+
+from src.features.tensor_processing import (  # noqa: E402
+    extract_tensor_stats,
+    extract_tensor_stats_batch,
+    reference_tensor_stats,
+)
+
+
+def median_us(func, runs: int) -> float:
+    """Mediaan wall-clock tijd in microseconden"""
+    func()  # warmup
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--features", type=int, nargs="+", default=[768, 1000, 1024])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    print(f"threads={torch.get_num_threads()}  mediaan van {args.runs} runs (µs)")
+    print(f"{'features':>9}{'batch':>7}{'referentie':>13}{'enkel':>10}{'batch':>10}{'speedup':>9}")
+
+    for features in args.features:
+        for batch in args.batch:
+            tensor = torch.randn(batch, features)
+            samples = tensor.split(1)
+
+            reference = median_us(lambda: [reference_tensor_stats(s) for s in samples], args.runs)
+            single = median_us(lambda: [extract_tensor_stats(s) for s in samples], args.runs)
+            batched = median_us(lambda: extract_tensor_stats_batch(tensor), args.runs)
+
+            assert extract_tensor_stats_batch(tensor) == [reference_tensor_stats(s) for s in samples]
+            print(
+                f"{features:9}{batch:7}{reference:13.1f}{single:10.1f}"
+                f"{batched:10.1f}{reference / batched:8.1f}x"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
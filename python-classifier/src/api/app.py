@@ -1,7 +1,30 @@
 """FastAPI Application Instance"""
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from ..config.app_config import AppConfig
+from .uploads import MULTIPART_OVERHEAD, BodySizeLimitMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Met WARMUP_ON_STARTUP: laad model en backend en draai warmup batches"""
+    from ..services.warmup import start_warmup
+
+    config = AppConfig()
+    if config.warmup_on_startup:
+        start_warmup(config)
+    yield
+
+    from ..cache.embedding_cache import EmbeddingCache
+    from ..services.implementations.gemini_service import GeminiService
+
+    await GeminiService().aclose()
+    EmbeddingCache().save()
+
+
 app = FastAPI(
     title="AfvalAlert - Nederlandse Afval Classificatie",
     description="Ultra-compacte afval classificatie met Swin Tiny + Gemini AI",
@@ -9,6 +32,7 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
     contact={
         "name": "AfvalAlert Team",
         "email": "team@afvalalert.nl",
@@ -18,3 +42,8 @@ app = FastAPI(
         "url": "https://opensource.org/licenses/MIT",
     },
 )
+
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=AppConfig().max_file_size + MULTIPART_OVERHEAD,
+)
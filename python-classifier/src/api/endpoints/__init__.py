@@ -1,6 +1,6 @@
 """API endpoints module"""
 
 # Import all endpoint modules to register routes
-from . import classification, info, status
+from . import classification, health, info, metrics, profiling, status
 
-__all__ = ["classification", "info", "status"]
+__all__ = ["classification", "health", "info", "metrics", "profiling", "status"]
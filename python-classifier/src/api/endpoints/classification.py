@@ -1,15 +1,37 @@
 """Classification Endpoints"""
 
-from typing import Any, Dict, List
-
-from fastapi import File, HTTPException, UploadFile
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import (
+    BackgroundTasks,
+    File,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    UploadFile,
+)
 from pydantic import BaseModel, Field
 
+from ...config.config_registry import ConfigRegistry
 from ...decorators.logging_decorator import logged
 from ...exceptions.service_exceptions import ServiceNotAvailableError
 from ...exceptions.validation_exceptions import ValidationError
-from ...pipeline import debug_pipeline, execute_classification
+from ...monitoring.profiling import Profiling
+from ...monitoring.request_timing import RequestTiming
+from ...pipeline import (
+    BRON_CACHE,
+    BRON_INDEX,
+    classificatie_bron,
+    debug_pipeline,
+    execute_classification_async,
+    profile_request,
+)
+from ...services.worker_pools import WorkerPools
 from ..app import app
+from ..uploads import read_upload
+from .profiling import require_profiel_token
 
 
 class ClassificationResponse(BaseModel):
@@ -25,42 +47,138 @@ class DebugResponse(BaseModel):
     processing_time: float = Field(..., description="Verwerkingstijd in seconden")
 
 
-@app.post("/classificeer")
+def timing_headers(timing: RequestTiming) -> Dict[str, str]:
+    """Server-Timing en optionele resource headers volgens AppConfig"""
+    config = ConfigRegistry().app_config
+    headers: Dict[str, str] = {}
+    if config.server_timing:
+        headers["Server-Timing"] = timing.server_timing()
+        if config.timing_allow_origin:
+            headers["Timing-Allow-Origin"] = config.timing_allow_origin
+    if config.resource_headers:
+        headers.update(timing.resource_headers())
+    return headers
+
+
+def schedule_profile(
+    background_tasks: BackgroundTasks, afbeelding_bytes: bytes, token: Optional[str]
+) -> Optional[str]:
+    """Profiel id als deze request (token of sample) na de response wordt opgenomen"""
+    profiler = Profiling()
+    if profiler.busy() or not (profiler.authorized(token) or profiler.sample()):
+        return None
+    profile_id = profiler.store.new_id()
+    background_tasks.add_task(profile_request, afbeelding_bytes, profile_id)
+    return profile_id
+
+
+@app.post(
+    "/classificeer",
+    responses={
+        200: {
+            "headers": {
+                "X-Classificatie-Bron": {
+                    "description": "gemini, lokaal, cache, index of lokaal-fallback",
+                    "schema": {"type": "string"},
+                },
+                "Server-Timing": {
+                    "description": "Duur per stap in ms, cache hit/miss en totaal",
+                    "schema": {"type": "string"},
+                },
+                "X-Profiel-Id": {
+                    "description": "Profiel dat na deze response wordt opgenomen",
+                    "schema": {"type": "string"},
+                },
+            }
+        },
+        400: {"description": "Geen geldige afbeelding"},
+        413: {"description": "Afbeelding te groot"},
+        503: {"description": "Service niet beschikbaar"},
+    },
+)
 @logged
 async def classificeer_afval(
+    response: Response,
+    background_tasks: BackgroundTasks,
     afbeelding: UploadFile = File(...),
+    gebruik_cache: bool = Query(
+        True, description="False om de resultaat cache over te slaan"
+    ),
+    modus: Optional[str] = Query(
+        None,
+        description="gemini of lokaal (offline, zonder externe call); "
+        "standaard CLASSIFICATIE_MODUS",
+    ),
+    x_profiel_token: Optional[str] = Header(None, include_in_schema=False),
 ) -> List[ClassificationResponse]:
     """
     Ultra-compacte classificatie endpoint
 
     Upload: Alle image formaten (jpg, png, webp, gif, bmp, tiff)
     Output: [{"type": "Glas", "confidence": 0.95}]
+    Header X-Classificatie-Bron geeft aan of het antwoord van Gemini, het
+    lokale model, uit de cache, uit de embedding index of van de lokale
+    fallback komt (alleen met LOCAL_FALLBACK, anders 503). Server-Timing (ook bij 4xx/5xx na de upload) splitst de
+    tijd op per stap: upload, wachtrij, decode, inferentie (waarvan forward),
+    stats, gemini en validatie. Met een geldig X-Profiel-Token (of volgens
+    PROFILE_SAMPLE_RATE) wordt de feature extractie van deze afbeelding na de
+    response geprofileerd; X-Profiel-Id noemt de artifacts onder /profielen.
     """
+    timing = RequestTiming()
+
     # Basis validatie
     if not afbeelding.content_type or not afbeelding.content_type.startswith("image/"):
         raise HTTPException(400, "Alleen afbeeldingen toegestaan")
 
-    # Lees data
-    afbeelding_bytes = await afbeelding.read()
+    # Lees data in chunks, met harde limiet en vroege header controle
+    afbeelding_bytes = await read_upload(afbeelding)
+    timing.add("upload", time.perf_counter() - timing.start)
 
     try:
         # Voer pipeline uit (alle logica in pipeline module)
-        resultaat = execute_classification(afbeelding_bytes)
+        resultaat = await execute_classification_async(
+            afbeelding_bytes, gebruik_cache, modus=modus, timing=timing
+        )
+        bron = classificatie_bron.get()
+        timing.cache = "hit" if bron in (BRON_CACHE, BRON_INDEX) else "miss"
+        response.headers["X-Classificatie-Bron"] = bron
+        response.headers.update(timing_headers(timing))
+        profile_id = schedule_profile(
+            background_tasks, afbeelding_bytes, x_profiel_token
+        )
+        if profile_id is not None:
+            response.headers["X-Profiel-Id"] = profile_id
         return resultaat
 
     except ValidationError as e:
-        raise HTTPException(400, f"Validatie fout: {e}")
+        raise HTTPException(400, f"Validatie fout: {e}", timing_headers(timing))
     except ServiceNotAvailableError as e:
-        raise HTTPException(503, f"Service fout: {e}")
+        raise HTTPException(503, f"Service fout: {e}", timing_headers(timing))
     except Exception as e:
-        raise HTTPException(500, f"Pipeline fout: {e}")
+        raise HTTPException(500, f"Pipeline fout: {e}", timing_headers(timing))
 
 
-@app.post("/debug")
-async def debug_classificatie(afbeelding: UploadFile = File(...)) -> DebugResponse:
-    """Debug endpoint met pipeline details"""
+@app.post("/debug", response_model=DebugResponse)
+async def debug_classificatie(
+    afbeelding: UploadFile = File(...),
+    modus: Optional[str] = Query(None, description="gemini of lokaal"),
+    profiel: bool = Query(
+        False, description="cProfile en torch.profiler opname (X-Profiel-Token)"
+    ),
+    x_profiel_token: Optional[str] = Header(None, include_in_schema=False),
+) -> DebugResponse:
+    """Debug endpoint met duur en details per pipeline stap, zonder cache"""
+    if profiel:
+        require_profiel_token(x_profiel_token)
     if not afbeelding.content_type or not afbeelding.content_type.startswith("image/"):
         raise HTTPException(400, "Alleen afbeeldingen toegestaan")
 
-    afbeelding_bytes = await afbeelding.read()
-    return debug_pipeline(afbeelding_bytes)
+    afbeelding_bytes = await read_upload(afbeelding)
+    try:
+        return await WorkerPools().inference.run(
+            debug_pipeline, afbeelding_bytes, modus, profiel
+        )
+    except ValidationError as e:
+        raise HTTPException(400, f"Validatie fout: {e}")
+    except ServiceNotAvailableError as e:
+        raise HTTPException(503, f"Service fout: {e}")
@@ -0,0 +1,21 @@
+"""Health & Readiness Endpoints"""
+
+from typing import Any, Dict
+
+from fastapi.responses import JSONResponse
+
+from ...services.warmup import WarmupStatus, is_ready
+from ..app import app
+
+
+@app.get("/health")
+async def health() -> Dict[str, str]:
+    """Liveness: proces leeft en de event loop reageert"""
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+async def ready() -> Any:
+    """Readiness: met WARMUP_ON_STARTUP pas na laden en opwarmen, anders 503"""
+    body: Dict[str, Any] = {"klaar": is_ready(), "warmup": WarmupStatus().as_dict()}
+    return JSONResponse(body, status_code=200 if body["klaar"] else 503)
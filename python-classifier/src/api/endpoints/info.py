@@ -13,6 +13,8 @@ async def basis_info() -> Dict[str, Any]:
         "versie": "3.0.0",
         "pipeline": "afbeelding → ConvNeXt Base model → Gemini AI → classificatie",
         "technologie": ["Singleton", "Factory", "Functional", "Decorators"],
-        "beschikbare_endpoints": ["/classificeer", "/status", "/debug", "/docs"],
+        "beschikbare_endpoints": [
+            "/classificeer", "/status", "/health", "/ready", "/debug", "/docs"
+        ],
         "status": "actief en klaar voor gebruik"
     }
@@ -0,0 +1,15 @@
+"""Metrics Endpoint"""
+
+from fastapi.responses import Response
+
+from ...monitoring.metrics import CONTENT_TYPE, Metrics
+from ...pipeline import ClassificationStages
+from ..app import app
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus scrape: latency histogrammen, in flight, fouten en batch groottes"""
+    # Zorgt dat de pipeline series (en hun wachtrij collector) altijd bestaan
+    ClassificationStages()
+    return Response(Metrics().render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,40 @@
+"""Profiling Endpoints"""
+
+from typing import Any, Dict, Optional
+
+from fastapi import Header, HTTPException
+from fastapi.responses import FileResponse
+
+from ...monitoring.profiling import PSTATS_SUFFIX, Profiling
+from ..app import app
+
+
+def require_profiel_token(token: Optional[str]) -> None:
+    """404 als profiling uit staat, 403 bij een ontbrekend of verkeerd token"""
+    profiler = Profiling()
+    if not profiler.enabled:
+        raise HTTPException(404, "Profiling staat uit (PROFILE_TOKEN)")
+    if not profiler.authorized(token):
+        raise HTTPException(403, "Ongeldig profiel token")
+
+
+@app.get("/profielen", include_in_schema=False)
+async def profielen(x_profiel_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """Opgeslagen profiel artifacts, nieuwste eerst"""
+    require_profiel_token(x_profiel_token)
+    profiler = Profiling()
+    return {**profiler.stats(), "artifacts": profiler.store.artifacts()}
+
+
+@app.get("/profielen/{bestand}", include_in_schema=False)
+async def profiel_bestand(
+    bestand: str, x_profiel_token: Optional[str] = Header(None)
+) -> FileResponse:
+    """Download .pstats (pstats / snakeviz) of .trace.json (chrome://tracing)"""
+    require_profiel_token(x_profiel_token)
+    path = Profiling().store.path(bestand)
+    if path is None:
+        raise HTTPException(404, "Profiel niet gevonden")
+    pstats_bestand = bestand.endswith(PSTATS_SUFFIX)
+    media_type = "application/octet-stream" if pstats_bestand else "application/json"
+    return FileResponse(path, media_type=media_type, filename=bestand)
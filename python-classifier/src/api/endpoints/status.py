@@ -2,7 +2,16 @@
 
 from typing import Any, Dict
 
+from ...cache.embedding_cache import EmbeddingCache
+from ...cache.near_duplicate_cache import NearDuplicateCache
+from ...cache.prompt_cache import PromptCache
+from ...cache.result_cache import ResultCache
+from ...config.config_registry import ConfigRegistry
+from ...monitoring.profiling import Profiling
+from ...pipeline import ClassificationStages
+from ...services.implementations.lokale_service import LokaleService
 from ...services.service_factory import ServiceFactory
+from ...services.worker_pools import WorkerPools
 from ..app import app
 
 
@@ -16,6 +25,22 @@ async def service_status() -> Dict[str, Any]:
             "lokaal_model": services["lokaal"].is_ready(),
             "gemini_ai": services["gemini"].is_ready(),
             "overall_status": all(s.is_ready() for s in services.values()),
+            "werkers": WorkerPools().stats(),
+            "pipeline": ClassificationStages().stats(),
+            "preprocessing": LokaleService().preprocess_stats(),
+            "cache": ResultCache().stats(),
+            "near_duplicate_cache": NearDuplicateCache().stats(),
+            "prompt_cache": PromptCache().stats(),
+            "embedding_index": EmbeddingCache().stats(),
+            "gemini_client": (
+                services["gemini"].async_client.stats()
+                if services["gemini"].async_client is not None
+                else None
+            ),
+            "gemini_batching": services["gemini"].batch_stats(),
+            "gemini_circuit": services["gemini"].circuit_stats(),
+            "config": ConfigRegistry().stats(),
+            "profiling": Profiling().stats(),
             "timestamp": "nu beschikbaar",
             "bericht": "Alle services operationeel"
         }
@@ -0,0 +1,217 @@
+"""Pre-fork Multi-Process Server"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def threads_per_worker(workers: int, configured: int = 0) -> int:
+    """Verdeel CPU cores over workers zodat torch threads niet overboeken"""
+    if configured > 0:
+        return configured
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def pin_torch_threads(threads: int) -> None:
+    """Zet vaste torch thread counts voor dit proces"""
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Kan maar één keer per proces, voordat inter-op werk gestart is
+        pass
+
+
+class RestartPolicy:
+    """
+    Exponentiële backoff voor het herstarten van gestopte workers
+
+    Elke crash van een worker slot verdubbelt de wachttijd tot de volgende
+    start (tot `max_delay`). Draaide de worker minstens `stable_seconds`,
+    dan begint de telling opnieuw. Na meer dan `max_restarts` crashes op
+    rij geeft `next_delay` None: de worker faalt bij opstarten (import,
+    bind) en herstarten heeft geen zin.
+    """
+
+    def __init__(
+        self,
+        max_restarts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        stable_seconds: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_restarts = max(0, max_restarts)
+        self.base_delay = max(0.0, base_delay)
+        self.max_delay = max_delay
+        self.stable_seconds = stable_seconds
+        self._clock = clock
+        self._started: Dict[int, float] = {}
+        self._failures: Dict[int, int] = {}
+
+    def started(self, slot: int) -> None:
+        """Worker in dit slot is (opnieuw) gestart"""
+        self._started[slot] = self._clock()
+
+    def next_delay(self, slot: int) -> Optional[float]:
+        """Wachttijd voor herstart na een gestopte worker, None = opgeven"""
+        if self._clock() - self._started.get(slot, 0.0) >= self.stable_seconds:
+            self._failures[slot] = 0
+        failures = self._failures.get(slot, 0) + 1
+        self._failures[slot] = failures
+        if failures > self.max_restarts:
+            return None
+        return min(self.max_delay, self.base_delay * 2 ** (failures - 1))
+
+
+def preload_model() -> None:
+    """
+    Laad ConvNeXt gewichten in het parent proces
+
+    Er wordt bewust geen forward pass gedaan en geen backend gemaakt: OpenMP
+    en ONNX Runtime thread pools die vóór fork gestart zijn werken niet
+    betrouwbaar in child processen. Backends worden per worker opgebouwd.
+    """
+    from ..services.implementations.lokale_service import LokaleService
+
+    LokaleService().load_model()
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    """Gedeelde listening socket voor alle workers"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, host: str, port: int, threads: int) -> None:
+    """Child proces: pin threads en serveer op de gedeelde socket"""
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    pin_torch_threads(threads)
+
+    config = uvicorn.Config(app, host=host, port=port, log_level="info")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def serve_prefork(
+    host: str,
+    port: int,
+    workers: int,
+    torch_threads: int = 0,
+    restarts: Optional[RestartPolicy] = None,
+) -> None:
+    """
+    Start `workers` uvicorn processen die één geladen model delen
+
+    Het model wordt in het parent proces geladen, daarna worden workers
+    geforkt. De tensor storage wordt door geen enkele worker beschreven en
+    blijft daardoor copy-on-write gedeeld. Gestopte workers worden met
+    backoff herstart (`restarts`); blijft een worker crashen, dan stopt de
+    server met exit code 1 zodat de orchestrator het ziet.
+    """
+    from ..controller import app
+
+    restarts = restarts or RestartPolicy()
+    threads = threads_per_worker(workers, torch_threads)
+    preload_model()
+
+    # Voorkom dat de GC refcount pagina's van geërfde objecten aanraakt
+    gc.collect()
+    gc.freeze()
+
+    sock = _bind_socket(host, port)
+    children: Dict[int, int] = {}
+    pending: Dict[int, float] = {}  # slot -> monotonic tijd van herstart
+    stopping = False
+    crash_loop = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            # Per-worker state op schijf (embedding index) gebruikt het slot
+            os.environ["WORKER_SLOT"] = str(slot)
+            try:
+                _run_worker(app, sock, host, port, threads)
+                code = 0
+            except BaseException:
+                logger.exception(f"Worker {slot} gecrasht")
+            finally:
+                os._exit(code)
+        children[pid] = slot
+        restarts.started(slot)
+        logger.info(f"Worker {slot} gestart (pid {pid}, {threads} torch threads)")
+
+    def shutdown(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    for slot in range(workers):
+        spawn(slot)
+
+    while children or (pending and not stopping):
+        # Herstarts die aan de beurt zijn
+        now = time.monotonic()
+        for slot, due in list(pending.items()):
+            if due <= now and not stopping:
+                del pending[slot]
+                spawn(slot)
+
+        try:
+            if pending and not stopping:
+                # Niet blokkeren: de volgende herstart moet op tijd gebeuren
+                pid, status = os.waitpid(-1, os.WNOHANG)
+                if pid == 0:
+                    time.sleep(max(0.0, min(0.1, min(pending.values()) - now)))
+                    continue
+            else:
+                pid, status = os.wait()
+        except ChildProcessError:
+            if pending and not stopping:
+                time.sleep(max(0.0, min(pending.values()) - time.monotonic()))
+                continue
+            break
+
+        slot = children.pop(pid, None)
+        if slot is None or stopping:
+            continue
+        delay = restarts.next_delay(slot)
+        if delay is None:
+            logger.error(
+                f"Worker {slot} (pid {pid}) blijft crashen (status {status}), "
+                "server stopt"
+            )
+            crash_loop = True
+            shutdown(signal.SIGTERM, None)
+            continue
+        logger.warning(
+            f"Worker {slot} (pid {pid}) gestopt met status {status}, "
+            f"herstart over {delay:.1f}s"
+        )
+        pending[slot] = time.monotonic() + delay
+
+    sock.close()
+    if crash_loop:
+        raise SystemExit(1)
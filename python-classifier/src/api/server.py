@@ -1,10 +1,39 @@
 """Server Startup Functions"""
 
+from typing import Optional
+
+from ..config.app_config import AppConfig
+
+
+def start_server(
+    host: str = "0.0.0.0", port: int = 8000, workers: Optional[int] = None
+) -> None:
+    """Start server met uvicorn, pre-fork bij meerdere workers"""
+    config = AppConfig()
+    workers = config.server_workers if workers is None else workers
+
+    if workers > 1:
+        from .prefork import RestartPolicy, serve_prefork
+
+        restarts = RestartPolicy(
+            config.worker_max_restarts, config.worker_restart_backoff_seconds
+        )
+        serve_prefork(host, port, workers, config.torch_threads_per_worker, restarts)
+        return
 
-def start_server(host: str = "0.0.0.0", port: int = 8000) -> None:
-    """Start server met uvicorn"""
     import uvicorn
 
+    if config.torch_threads_per_worker > 0:
+        from .prefork import pin_torch_threads
+
+        pin_torch_threads(config.torch_threads_per_worker)
+
     uvicorn.run(
         "src.controller:app", host=host, port=port, log_level="info", reload=False
     )
+
+
+if __name__ == "__main__":
+    import os
+
+    start_server(os.getenv("HOST", "0.0.0.0"), int(os.getenv("PORT", "8000")))
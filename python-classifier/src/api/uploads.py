@@ -0,0 +1,113 @@
+"""Streaming Upload Ingestion"""
+
+from typing import List
+
+from fastapi import HTTPException, UploadFile
+
+from ..config.app_config import AppConfig
+from ..features.image_decoding import check_pixels, probe_size
+
+CHUNK_SIZE = 64 * 1024
+# Headers (incl. EXIF) staan in de eerste paar honderd KB; daarna niet meer proberen
+PROBE_LIMIT = 1024 * 1024
+# Ruimte voor multipart boundaries en form velden rond het bestand
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(413, f"Afbeelding te groot (>{max_bytes // (1024 * 1024)}MB)")
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware die request bodies boven de limiet afbreekt
+
+    Een te grote Content-Length wordt direct geweigerd; bij chunked uploads
+    wordt tijdens het ontvangen geteld. Zo buffert de multipart parser nooit
+    meer dan `max_bytes` per request.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if (
+                name == b"content-length"
+                and value.isdigit()
+                and int(value) > self.max_bytes
+            ):
+                await self._reject(send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI laat HTTPExceptions uit body parsing ongewijzigd door
+                    raise _too_large(self.max_bytes - MULTIPART_OVERHEAD)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send) -> None:
+        detail = _too_large(self.max_bytes - MULTIPART_OVERHEAD).detail
+        body = f'{{"detail":"{detail}"}}'.encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"connection", b"close"),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+async def read_upload(
+    upload: UploadFile, config: AppConfig = AppConfig(), chunk_size: int = CHUNK_SIZE
+) -> bytes:
+    """
+    Lees een upload in chunks met harde limiet en vroege header controle
+
+    Stopt bij `max_file_size` (413) en weigert afbeeldingen waarvan de header
+    meer dan `max_image_pixels` belooft (400) zodra de header binnen is.
+    """
+    max_bytes = config.max_file_size
+    if upload.size is not None and upload.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    chunks: List[bytes] = []
+    total = 0
+    probed = False
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise _too_large(max_bytes)
+        chunks.append(chunk)
+
+        if not probed and total <= PROBE_LIMIT:
+            try:
+                size = probe_size(b"".join(chunks))
+                if size is not None:
+                    check_pixels(size, config.max_image_pixels)
+                    probed = True
+            except ValueError as e:
+                raise HTTPException(400, f"Validatie fout: {e}")
+
+    return b"".join(chunks)
@@ -0,0 +1,24 @@
+"""Cache module exports"""
+
+from .embedding_cache import EmbeddingCache
+from .embedding_index import EmbeddingIndex, ProductQuantizer
+from .near_duplicate_cache import NearDuplicateCache
+from .near_duplicate_index import NearDuplicateIndex
+from .prompt_cache import PromptCache, config_fingerprint, prompt_key, quantize_stats
+from .result_cache import ResultCache, content_key
+from .ttl_cache import TTLCache
+
+__all__ = [
+    "EmbeddingCache",
+    "EmbeddingIndex",
+    "NearDuplicateCache",
+    "NearDuplicateIndex",
+    "ProductQuantizer",
+    "PromptCache",
+    "ResultCache",
+    "TTLCache",
+    "config_fingerprint",
+    "content_key",
+    "prompt_key",
+    "quantize_stats",
+]
@@ -0,0 +1,184 @@
+"""Embedding Similarity Cache"""
+
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+from ..config.app_config import AppConfig
+from ..decorators.singleton_decorator import singleton
+from .embedding_index import EmbeddingIndex
+
+logger = logging.getLogger(__name__)
+
+Classificaties = List[Dict[str, Any]]
+
+
+def _as_vector(features: Any) -> Any:
+    """Model output (torch tensor of array) als platte float vector"""
+    if hasattr(features, "detach"):
+        return features.detach().float().reshape(-1).cpu().numpy()
+    return features
+
+
+def worker_path(path: str) -> str:
+    """Eigen indexbestand per pre-fork worker (WORKER_SLOT), anders `path` zelf"""
+    slot = os.getenv("WORKER_SLOT")
+    if not path or slot is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.worker{slot}{ext}"
+
+
+@singleton
+class EmbeddingCache:
+    """
+    Classificaties van visueel gelijkende, eerder gelabelde meldingen
+
+    Een treffer vereist `k` buren met minstens `min_similarity` cosine
+    similarity waarvan het hoofdtype voor minstens `agreement` (gewogen
+    naar similarity) overeenkomt; het antwoord is dat van de meest
+    gelijkende buur met dat type. De index wordt elke `save_every`
+    toevoegingen en bij afsluiten naar `path` geschreven. Pre-fork workers
+    hebben elk een eigen bestand (`worker_path`), zodat ze elkaars labels
+    niet overschrijven; zonder eigen bestand starten ze vanaf het gedeelde
+    EMBEDDING_INDEX_PATH. Zoals de near-duplicate cache hoort de index bij
+    één afval config vingerafdruk: een andere vingerafdruk geeft een miss,
+    de eerste put eronder leegt de index.
+    """
+
+    def __init__(self, config: AppConfig = AppConfig()):
+        self.enabled = config.embedding_index not in ("", "off")
+        self.k = max(1, config.embedding_index_k)
+        self.min_similarity = config.embedding_index_min_similarity
+        self.agreement = config.embedding_index_agreement
+        self.shared_path = config.embedding_index_path
+        self.path = worker_path(self.shared_path)
+        self.save_every = config.embedding_index_save_every
+        # Index hoort bij één model en feature laag
+        self.fingerprint = "|".join(
+            [config.model_name, config.feature_mode, config.feature_layer]
+        )
+        self._index: EmbeddingIndex[Classificaties] = EmbeddingIndex(
+            mode=config.embedding_index if self.enabled else "brute",
+            pq_m=config.embedding_index_pq_m,
+            nlist=config.embedding_index_nlist,
+            nprobe=config.embedding_index_nprobe,
+            train_size=config.embedding_index_train_size,
+            max_size=config.embedding_index_max_size,
+        )
+        self._lock = threading.Lock()
+        self._config: Optional[str] = None
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+
+        if self.enabled and self.path:
+            for path in (self.path, self.shared_path):
+                if os.path.exists(path):
+                    self._load(path)
+                    break
+
+    def _load(self, path: str) -> None:
+        """Laad opgeslagen index; bij ander model of andere instellingen leeg starten"""
+        try:
+            meta = self._index.load(path)
+        except Exception as e:
+            logger.warning(f"Embedding index niet geladen ({e}), start leeg")
+            return
+        if meta.get("fingerprint") != self.fingerprint:
+            logger.warning("Embedding index hoort bij ander model, start leeg")
+            self._index._reset()
+            return
+        self._config = meta.get("config")
+        logger.info(f"Embedding index geladen: {len(self._index)} meldingen")
+
+    def get(
+        self, features: Any, fingerprint: Optional[str] = None
+    ) -> Optional[Classificaties]:
+        """Classificatie waar de dichtstbijzijnde buren het over eens zijn, of None"""
+        if not self.enabled:
+            return None
+        if fingerprint is not None and fingerprint != self._config:
+            with self._lock:
+                self.misses += 1
+            return None
+        neighbours = [
+            (similarity, classificaties)
+            for similarity, classificaties in self._index.search(
+                _as_vector(features), self.k
+            )
+            if similarity >= self.min_similarity
+        ]
+
+        match = None
+        if len(neighbours) >= self.k:
+            votes: Dict[str, float] = defaultdict(float)
+            for similarity, classificaties in neighbours:
+                votes[classificaties[0]["type"]] += similarity
+            best, weight = max(votes.items(), key=lambda item: item[1])
+            if weight / sum(votes.values()) >= self.agreement:
+                match = next(c for _, c in neighbours if c[0]["type"] == best)
+
+        with self._lock:
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [dict(item) for item in match]
+
+    def put(
+        self,
+        features: Any,
+        classificaties: Classificaties,
+        fingerprint: Optional[str] = None,
+    ) -> None:
+        """Voeg gelabelde melding toe (alleen niet-lege Gemini classificaties)"""
+        if not self.enabled or not classificaties:
+            return
+        if fingerprint is not None and fingerprint != self._config:
+            with self._lock:
+                if fingerprint != self._config:
+                    # Ook een geladen index zonder vingerafdruk hoort nergens bij
+                    if len(self._index):
+                        logger.info("Afval config gewijzigd, embedding index leeg")
+                    self._index.clear()
+                    self._config = fingerprint
+        if not self._index.add(_as_vector(features), [dict(i) for i in classificaties]):
+            return
+        with self._lock:
+            self._unsaved += 1
+            due = self.save_every > 0 and self._unsaved >= self.save_every
+        if due:
+            self.save()
+
+    def save(self) -> None:
+        """Schrijf index naar schijf als er een pad is en er iets veranderd is"""
+        if not (self.enabled and self.path):
+            return
+        with self._lock:
+            if self._unsaved == 0:
+                return
+            self._unsaved = 0
+        self._index.save(
+            self.path, {"fingerprint": self.fingerprint, "config": self._config}
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistieken voor /status"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ingeschakeld": self.enabled,
+                "modus": self._index.mode,
+                "pq_bytes": self._index.pq_m,
+                "getraind": self._index.trained,
+                "grootte": len(self._index),
+                "max_grootte": self._index.max_size,
+                "verwijderd": self._index.evictions,
+                "geheugen_bytes": self._index.memory_bytes(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,347 @@
+"""Embedding Nearest-Neighbour Index"""
+
+import json
+import math
+import os
+import tempfile
+import threading
+from itertools import chain
+from typing import Any, Dict, Generic, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+V = TypeVar("V")
+
+MODI = ("brute", "ivf")
+KMEANS_ITERATIES = 12
+# Deel van max_size dat in één keer verwijderd wordt als de index vol is
+EVICT_FRACTION = 0.1
+
+
+def normalize(vector: Any) -> np.ndarray:
+    """Eén float32 vector met lengte 1 (cosine similarity = inproduct)"""
+    vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+def nearest(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index van het dichtstbijzijnde centroid (L2) per rij"""
+    distances = (centroids * centroids).sum(axis=1) - 2.0 * data @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def kmeans(
+    data: np.ndarray,
+    k: int,
+    rng: np.random.Generator,
+    iterations: int = KMEANS_ITERATIES,
+) -> np.ndarray:
+    """Lloyd k-means; lege clusters krijgen een willekeurig nieuw punt"""
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = nearest(data, centroids)
+        one_hot = (assignment[None, :] == np.arange(k)[:, None]).astype(data.dtype)
+        sums = one_hot @ data
+        counts = np.bincount(assignment, minlength=k)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+        if not filled.all():
+            centroids[~filled] = data[rng.choice(len(data), int((~filled).sum()))]
+    return centroids
+
+
+class ProductQuantizer:
+    """
+    Comprimeer vectoren tot `m` bytes
+
+    De vector wordt in `m` deelvectoren gesplitst; per deel kiest een
+    codeboek van maximaal 256 centroids de dichtstbijzijnde. Zoeken gaat
+    asymmetrisch: de query blijft exact, per deel wordt één tabel met
+    inproducten berekend en een score is de som van `m` tabel lookups.
+    """
+
+    def __init__(self, dim: int, m: int):
+        self.dim = dim
+        self.m = m
+        self.dsub = math.ceil(dim / m)
+        self.codebooks: Optional[np.ndarray] = None  # (m, ksub, dsub)
+
+    def _split(self, data: np.ndarray) -> np.ndarray:
+        padding = self.m * self.dsub - self.dim
+        if padding:
+            data = np.pad(data, ((0, 0), (0, padding)))
+        return data.reshape(len(data), self.m, self.dsub)
+
+    def train(self, data: np.ndarray, rng: np.random.Generator) -> None:
+        parts = self._split(data)
+        self.codebooks = np.stack(
+            [kmeans(parts[:, j], 256, rng) for j in range(self.m)]
+        ).astype(np.float32)
+
+    def encode(self, data: np.ndarray) -> np.ndarray:
+        parts = self._split(data)
+        codes = np.empty((len(data), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = nearest(parts[:, j], self.codebooks[j])
+        return codes
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Benaderde inproducten van de query met gecodeerde vectoren"""
+        tables = np.einsum("md,mkd->mk", self._split(query[None])[0], self.codebooks)
+        return tables[np.arange(self.m), codes].sum(axis=1)
+
+
+class EmbeddingIndex(Generic[V]):
+    """
+    In-process vector index voor cosine nearest-neighbour zoeken
+
+    "brute" vergelijkt de query met alle vectoren in één NumPy matmul.
+    "ivf" clustert de vectoren (k-means, `nlist` lijsten) en doorzoekt
+    alleen de `nprobe` dichtstbijzijnde lijsten. Met `pq_m` > 0 worden
+    vectoren product-gekwantiseerd tot `pq_m` bytes en worden de ruwe
+    float32 vectoren na training weggegooid.
+
+    IVF en PQ moeten getraind worden: tot `train_size` vectoren zoekt de
+    index brute force, daarna wordt één keer getraind en wordt elke
+    nieuwe vector direct toegewezen en gecodeerd. Is de index vol
+    (`max_size`), dan worden de oudste vectoren verwijderd (FIFO, per
+    `EVICT_FRACTION` tegelijk zodat het herbouwen zelden gebeurt); training
+    blijft staan. Payloads moeten JSON serialiseerbaar zijn voor `save`.
+    """
+
+    def __init__(
+        self,
+        mode: str = "brute",
+        pq_m: int = 0,
+        nlist: int = 64,
+        nprobe: int = 8,
+        train_size: int = 2048,
+        max_size: int = 100_000,
+        seed: int = 0,
+    ):
+        if mode not in MODI:
+            raise ValueError(f"Onbekende index modus: {mode} (kies uit {MODI})")
+        self.mode = mode
+        self.pq_m = max(0, pq_m)
+        self.nlist = max(1, nlist)
+        self.nprobe = max(1, nprobe)
+        self.train_size = max(train_size, self.nlist)
+        self.max_size = max_size
+        self.seed = seed
+
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self._reset()
+
+    def clear(self) -> None:
+        """Verwijder alle vectoren (ook training)"""
+        with self._lock:
+            self._reset()
+
+    def _reset(self) -> None:
+        self.dim: Optional[int] = None
+        self.trained = False
+        self._count = 0
+        self._payloads: List[V] = []
+        self._vectors: Optional[np.ndarray] = None  # ruwe vectoren (capaciteit, dim)
+        self._codes: Optional[np.ndarray] = None  # PQ codes (capaciteit, m)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._pq: Optional[ProductQuantizer] = None
+
+    @property
+    def needs_training(self) -> bool:
+        return self.mode == "ivf" or self.pq_m > 0
+
+    @staticmethod
+    def _append(
+        array: Optional[np.ndarray], index: int, row: np.ndarray
+    ) -> np.ndarray:
+        """Schrijf rij op `index`, verdubbel de capaciteit als dat nodig is"""
+        if array is None:
+            array = np.empty((64, row.shape[-1]), dtype=row.dtype)
+        elif index >= len(array):
+            grown = np.empty((2 * len(array), array.shape[1]), dtype=array.dtype)
+            grown[: len(array)] = array
+            array = grown
+        array[index] = row
+        return array
+
+    def add(self, vector: Any, payload: V) -> bool:
+        """Voeg vector toe (oudste eruit als de index vol is); False bij max_size 0"""
+        vector = normalize(vector)
+        with self._lock:
+            if self.max_size <= 0:
+                return False
+            if self._count >= self.max_size:
+                self._evict_oldest(max(1, int(self.max_size * EVICT_FRACTION)))
+            if self.dim is None:
+                self.dim = vector.shape[0]
+            elif vector.shape[0] != self.dim:
+                raise ValueError(
+                    f"Verwacht dimensie {self.dim}, kreeg {vector.shape[0]}"
+                )
+
+            index = self._count
+            if self._pq is not None:
+                code = self._pq.encode(vector[None])[0]
+                self._codes = self._append(self._codes, index, code)
+            else:
+                self._vectors = self._append(self._vectors, index, vector)
+            if self._centroids is not None:
+                list_id = int(nearest(vector[None], self._centroids)[0])
+                self._lists[list_id].append(index)
+            self._payloads.append(payload)
+            self._count += 1
+
+            if self.needs_training and not self.trained:
+                if self._count >= self.train_size:
+                    self._train()
+            return True
+
+    def _evict_oldest(self, n: int) -> None:
+        """Verwijder de `n` oudste vectoren en nummer de rest opnieuw (in place)"""
+        n = min(n, self._count)
+        keep = self._count - n
+        self._payloads = self._payloads[n:]
+        for array in (self._vectors, self._codes):
+            if array is not None:
+                array[:keep] = array[n : self._count]
+        self._lists = [[i - n for i in members if i >= n] for members in self._lists]
+        self._count = keep
+        self.evictions += n
+
+    def _train(self) -> None:
+        """Train IVF centroids en/of PQ codeboeken op de huidige vectoren"""
+        data = self._vectors[: self._count]
+        rng = np.random.default_rng(self.seed)
+        if self.mode == "ivf":
+            self._centroids = kmeans(data, self.nlist, rng)
+            self._lists = [[] for _ in range(len(self._centroids))]
+            for index, list_id in enumerate(nearest(data, self._centroids)):
+                self._lists[int(list_id)].append(index)
+        if self.pq_m > 0:
+            self._pq = ProductQuantizer(self.dim, self.pq_m)
+            self._pq.train(data, rng)
+            self._codes = self._pq.encode(data)
+            self._vectors = None  # ruwe vectoren niet meer nodig
+        self.trained = True
+
+    def search(self, vector: Any, k: int = 5) -> List[Tuple[float, V]]:
+        """Top-k als (cosine similarity, payload), hoogste eerst"""
+        query = normalize(vector)
+        with self._lock:
+            if self._count == 0 or query.shape[0] != self.dim:
+                return []
+
+            candidates = None
+            if self._centroids is not None:
+                centroids = self._centroids
+                distances = (centroids**2).sum(axis=1) - 2.0 * centroids @ query
+                probe = np.argsort(distances)[: self.nprobe]
+                candidates = np.fromiter(
+                    chain.from_iterable(self._lists[i] for i in probe), dtype=np.int64
+                )
+                if len(candidates) == 0:
+                    return []
+
+            if self._pq is not None:
+                codes = self._codes[: self._count]
+                scores = self._pq.scores(
+                    query, codes if candidates is None else codes[candidates]
+                )
+            else:
+                vectors = self._vectors[: self._count]
+                if candidates is not None:
+                    vectors = vectors[candidates]
+                scores = vectors @ query
+
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            ids = top if candidates is None else candidates[top]
+            return [(float(scores[t]), self._payloads[i]) for t, i in zip(top, ids)]
+
+    def memory_bytes(self) -> int:
+        """Geheugen van vectoren, codes, centroids en codeboeken"""
+        with self._lock:
+            arrays = [self._vectors, self._codes, self._centroids]
+            if self._pq is not None:
+                arrays.append(self._pq.codebooks)
+            return sum(a.nbytes for a in arrays if a is not None)
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ======================== PERSISTENTIE ========================
+
+    def save(self, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        """Schrijf de index atomair naar een .npz bestand"""
+        with self._lock:
+            header = {
+                "mode": self.mode,
+                "pq_m": self.pq_m,
+                "dim": self.dim,
+                "count": self._count,
+                "trained": self.trained,
+                "meta": meta or {},
+            }
+            arrays = {
+                "header": np.array(json.dumps(header)),
+                "payloads": np.array(json.dumps(self._payloads)),
+            }
+            if self._vectors is not None:
+                arrays["vectors"] = self._vectors[: self._count]
+            if self._codes is not None:
+                arrays["codes"] = self._codes[: self._count]
+                arrays["codebooks"] = self._pq.codebooks
+            if self._centroids is not None:
+                assignment = np.empty(self._count, dtype=np.int32)
+                for list_id, members in enumerate(self._lists):
+                    assignment[members] = list_id
+                arrays["centroids"] = self._centroids
+                arrays["assignment"] = assignment
+
+        # Uniek tijdelijk bestand: gelijktijdige schrijvers raken elkaar niet
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(
+            dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def load(self, path: str) -> Dict[str, Any]:
+        """Laad een index van schijf; geeft de opgeslagen meta terug"""
+        with np.load(path, allow_pickle=False) as data:
+            header = json.loads(str(data["header"]))
+            if header["mode"] != self.mode or header["pq_m"] != self.pq_m:
+                raise ValueError(
+                    f"Index op schijf is {header['mode']}/pq_m={header['pq_m']}, "
+                    f"verwacht {self.mode}/pq_m={self.pq_m}"
+                )
+            with self._lock:
+                self._reset()
+                self.dim = header["dim"]
+                self.trained = header["trained"]
+                self._count = header["count"]
+                self._payloads = json.loads(str(data["payloads"]))
+                if "vectors" in data:
+                    self._vectors = data["vectors"].astype(np.float32)
+                if "codes" in data:
+                    self._pq = ProductQuantizer(self.dim, self.pq_m)
+                    self._pq.codebooks = data["codebooks"]
+                    self._codes = data["codes"]
+                if "centroids" in data:
+                    self._centroids = data["centroids"]
+                    self._lists = [[] for _ in range(len(self._centroids))]
+                    for index, list_id in enumerate(data["assignment"].tolist()):
+                        self._lists[list_id].append(index)
+        return header["meta"]
@@ -0,0 +1,85 @@
+"""Near-Duplicate Classification Cache"""
+
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..config.app_config import AppConfig
+from ..decorators.singleton_decorator import singleton
+from .near_duplicate_index import NearDuplicateIndex
+
+logger = logging.getLogger(__name__)
+
+Classificaties = List[Dict[str, Any]]
+
+
+@singleton
+class NearDuplicateCache:
+    """
+    Classificaties van bijna-identieke foto's (zelfde dump locatie)
+
+    Entries horen bij de config vingerafdruk waaronder ze zijn opgeslagen.
+    Een lookup onder een andere vingerafdruk is een miss; de eerste put
+    onder een nieuwe vingerafdruk leegt de index.
+    """
+
+    def __init__(self, config: AppConfig = AppConfig()):
+        self.enabled = config.near_duplicate_size > 0
+        self._index: NearDuplicateIndex[Classificaties] = NearDuplicateIndex(
+            config.near_duplicate_max_distance,
+            config.near_duplicate_size,
+            ttl_seconds=config.near_duplicate_ttl_seconds,
+        )
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(
+        self, perceptual_hash: int, fingerprint: Optional[str] = None
+    ) -> Optional[Classificaties]:
+        """Kopie van classificatie van een bijna-duplicaat, of None"""
+        if not self.enabled:
+            return None
+        stale = fingerprint is not None and fingerprint != self._fingerprint
+        match = None if stale else self._index.search(perceptual_hash)
+        with self._lock:
+            if match is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [dict(item) for item in match[0]]
+
+    def put(
+        self,
+        perceptual_hash: int,
+        classificaties: Classificaties,
+        fingerprint: Optional[str] = None,
+    ) -> None:
+        """Onthoud niet-lege classificatie voor deze hash"""
+        if not (self.enabled and classificaties):
+            return
+        if fingerprint is not None and fingerprint != self._fingerprint:
+            with self._lock:
+                if fingerprint != self._fingerprint:
+                    if len(self._index):
+                        logger.info("Afval config gewijzigd, near-duplicate cache leeg")
+                    self._index.clear()
+                    self._fingerprint = fingerprint
+        self._index.add(perceptual_hash, [dict(item) for item in classificaties])
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistieken voor /status"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "ingeschakeld": self.enabled,
+                "grootte": len(self._index),
+                "max_grootte": self._index.max_size,
+                "ttl_seconden": self._index.ttl,
+                "max_afstand": self._index.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "verlopen": self._index.expirations,
+            }
@@ -0,0 +1,89 @@
+"""Gemini Prompt Cache op Gekwantiseerde Feature Statistieken"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..config.app_config import AppConfig
+from ..decorators.singleton_decorator import singleton
+from .ttl_cache import TTLCache
+
+Classificaties = List[Dict[str, Any]]
+
+
+def quantize_stats(stats: Dict[str, Any], precision: int) -> Dict[str, Any]:
+    """Rond float statistieken af op `precision` decimalen (overige waarden ongewijzigd)"""
+    # + 0.0 maakt van -0.0 een 0.0, anders krijgen gelijke prompts twee sleutels
+    return {
+        key: round(value, precision) + 0.0 if isinstance(value, float) else value
+        for key, value in stats.items()
+    }
+
+
+def config_fingerprint(
+    afval_types: Sequence[str],
+    prompt_template: str,
+    model_name: str,
+    batch_prompt_template: str = "",
+) -> str:
+    """Vingerafdruk van alles wat naast de stats de Gemini prompt bepaalt"""
+    payload = json.dumps(
+        [list(afval_types), prompt_template, model_name, batch_prompt_template]
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def prompt_key(quantized_stats: Dict[str, Any], fingerprint: str) -> str:
+    """Cache sleutel voor gekwantiseerde stats onder een config vingerafdruk"""
+    payload = json.dumps([fingerprint, quantized_stats], sort_keys=True)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@singleton
+class PromptCache:
+    """Gevalideerde Gemini resultaten per gekwantiseerde prompt"""
+
+    def __init__(self, config: AppConfig = AppConfig()):
+        self.enabled = config.prompt_cache_size > 0
+        self.precision = config.prompt_cache_precision
+        self._cache: TTLCache[Tuple[Classificaties, float]] = TTLCache(
+            config.prompt_cache_size, config.prompt_cache_ttl_seconds
+        )
+        self._lock = threading.Lock()
+        self.latency_saved = 0.0
+        self.gemini_calls = 0
+        self.gemini_latency = 0.0
+
+    def get(self, key: str) -> Optional[Classificaties]:
+        """Kopie van gecacht Gemini resultaat, of None"""
+        if not self.enabled:
+            return None
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        classificaties, duur = cached
+        with self._lock:
+            self.latency_saved += duur
+        return [dict(item) for item in classificaties]
+
+    def put(self, key: str, classificaties: Classificaties, duur: float) -> None:
+        """Cache resultaat met de gemeten Gemini latency van deze prompt"""
+        with self._lock:
+            self.gemini_calls += 1
+            self.gemini_latency += duur
+        if self.enabled and classificaties:
+            self._cache.put(key, ([dict(item) for item in classificaties], duur))
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistieken voor /status"""
+        with self._lock:
+            gemiddeld = self.gemini_latency / self.gemini_calls if self.gemini_calls else 0.0
+            return {
+                "ingeschakeld": self.enabled,
+                "precisie": self.precision,
+                **self._cache.stats(),
+                "gemini_calls": self.gemini_calls,
+                "gemiddelde_gemini_latency": round(gemiddeld, 4),
+                "latency_bespaard_seconden": round(self.latency_saved, 3),
+            }
@@ -0,0 +1,42 @@
+"""Content-Addressed Classification Result Cache"""
+
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from ..config.app_config import AppConfig
+from ..decorators.singleton_decorator import singleton
+from .ttl_cache import TTLCache
+
+Classificaties = List[Dict[str, Any]]
+
+
+def content_key(afbeelding_bytes: bytes) -> str:
+    """Snelle 128-bit hash van de ruwe afbeelding bytes"""
+    return hashlib.blake2b(afbeelding_bytes, digest_size=16).hexdigest()
+
+
+@singleton
+class ResultCache:
+    """Classificatie resultaten per byte-identieke afbeelding"""
+
+    def __init__(self, config: AppConfig = AppConfig()):
+        self.enabled = config.result_cache_size > 0
+        self._cache: TTLCache[Classificaties] = TTLCache(
+            config.result_cache_size, config.result_cache_ttl_seconds
+        )
+
+    def get(self, key: str) -> Optional[Classificaties]:
+        """Kopie van gecachte classificatie, of None"""
+        if not self.enabled:
+            return None
+        cached = self._cache.get(key)
+        return [dict(item) for item in cached] if cached is not None else None
+
+    def put(self, key: str, classificaties: Classificaties) -> None:
+        """Cache niet-lege classificatie resultaten"""
+        if self.enabled and classificaties:
+            self._cache.put(key, [dict(item) for item in classificaties])
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistieken voor /status"""
+        return {"ingeschakeld": self.enabled, **self._cache.stats()}
@@ -2,5 +2,12 @@
 
 from .afval_config import AfvalConfig
 from .app_config import AppConfig
+from .config_registry import ConfigRegistry, ConfigSnapshot, ReloadingConfig
 
-__all__ = ["AppConfig", "AfvalConfig"]
+__all__ = [
+    "AppConfig",
+    "AfvalConfig",
+    "ConfigRegistry",
+    "ConfigSnapshot",
+    "ReloadingConfig",
+]
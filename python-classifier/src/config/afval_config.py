@@ -3,12 +3,22 @@
 import logging
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 import yaml
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CONFIG_PATH = (
+    Path(__file__).parent.parent.parent / "config" / "afval_types.yaml"
+)
+
+DEFAULT_BATCH_PROMPT_TEMPLATE = (
+    "Classificeer elk van de {aantal} afbeeldingen.\nTypes: {afval_types}\n"
+    "{afbeeldingen}\n"
+    'Antwoord als JSON: {{"1": [{{"type": "...", "confidence": 0.XX}}], ...}}'
+)
+
 
 @dataclass
 class AfvalConfig:
@@ -16,22 +26,30 @@ class AfvalConfig:
 
     afval_types: List[str] = field(default_factory=list)
     prompt_template: str = ""
+    batch_prompt_template: str = DEFAULT_BATCH_PROMPT_TEMPLATE
+    imagenet_mapping: Dict[str, Any] = field(default_factory=dict)
 
     @classmethod
-    def from_yaml(cls, config_path: Optional[Union[str, Path]] = None) -> "AfvalConfig":
-        """Laad configuratie uit YAML bestand"""
-        if config_path is None:
-            config_path = (
-                Path(__file__).parent.parent.parent / "config" / "afval_types.yaml"
-            )
+    def load(cls, config_path: Optional[Union[str, Path]] = None) -> "AfvalConfig":
+        """Laad configuratie uit YAML bestand; fouten worden doorgegeven"""
+        with open(config_path or DEFAULT_CONFIG_PATH, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f)
+        if not isinstance(data, dict) or not data.get("afval_types"):
+            raise ValueError("Config bevat geen afval_types")
+        return cls(
+            afval_types=data.get("afval_types", []),
+            prompt_template=data.get("gemini_prompt_template", ""),
+            batch_prompt_template=data.get(
+                "gemini_batch_prompt_template", DEFAULT_BATCH_PROMPT_TEMPLATE
+            ),
+            imagenet_mapping=data.get("imagenet_mapping") or {},
+        )
 
+    @classmethod
+    def from_yaml(cls, config_path: Optional[Union[str, Path]] = None) -> "AfvalConfig":
+        """Laad configuratie uit YAML bestand, defaults als dat niet lukt"""
         try:
-            with open(config_path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
-            return cls(
-                afval_types=data.get("afval_types", []),
-                prompt_template=data.get("gemini_prompt_template", ""),
-            )
+            return cls.load(config_path)
         except Exception as e:
             logger.warning(f"Kan config niet laden: {e}, gebruik defaults")
             return cls(
@@ -2,6 +2,33 @@
 
 import os
 from dataclasses import dataclass, field
+from typing import Tuple
+
+
+def _env_int(name: str, default: int) -> int:
+    """Lees integer uit environment variabele"""
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    """Lees float uit environment variabele"""
+    return float(os.getenv(name, str(default)))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Lees boolean uit environment variabele"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "ja", "on")
+
+
+def _env_ints(name: str, default: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Lees komma-gescheiden integers uit environment variabele"""
+    value = os.getenv(name)
+    if not value:
+        return default
+    return tuple(int(part) for part in value.split(",") if part.strip())
 
 
 @dataclass
@@ -10,6 +37,266 @@ class AppConfig:
 
     gemini_api_key: str = field(default_factory=lambda: os.getenv("GEMINI_API_KEY", ""))
     model_name: str = "convnext_base_384_in22k_ft_in1k"
-    max_file_size: int = 20 * 1024 * 1024  # 20MB
+    gemini_model: str = field(
+        default_factory=lambda: os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    )
+    # "gemini" of "lokaal" (ImageNet logits via imagenet_mapping, geen externe call);
+    # per request te overschrijven met ?modus=
+    classificatie_modus: str = field(
+        default_factory=lambda: os.getenv("CLASSIFICATIE_MODUS", "gemini")
+    )
+    # Afval types config (leeg = config/afval_types.yaml); herladen bij nieuwe
+    # mtime, die hooguit eens per zoveel seconden gecontroleerd wordt
+    afval_config_path: str = field(
+        default_factory=lambda: os.getenv("AFVAL_CONFIG_PATH", "")
+    )
+    config_reload_check_seconds: float = field(
+        default_factory=lambda: _env_float("CONFIG_RELOAD_CHECK_SECONDS", 2.0)
+    )
+    max_file_size: int = field(
+        default_factory=lambda: _env_int("MAX_FILE_SIZE", 20 * 1024 * 1024)  # 20MB
+    )
+    # Maximaal aantal pixels volgens de header (decompression bomb grens)
+    max_image_pixels: int = field(
+        default_factory=lambda: _env_int("MAX_IMAGE_PIXELS", 64_000_000)
+    )
     device: str = "cpu"
     log_level: str = "INFO"
+
+    # Async Gemini REST client: één gepoolde sessie, begrensd aantal calls
+    gemini_async: bool = field(default_factory=lambda: _env_bool("GEMINI_ASYNC", True))
+    gemini_base_url: str = field(
+        default_factory=lambda: os.getenv(
+            "GEMINI_BASE_URL", "https://generativelanguage.googleapis.com"
+        )
+    )
+    gemini_max_concurrency: int = field(
+        default_factory=lambda: _env_int("GEMINI_MAX_CONCURRENCY", 256)
+    )
+    gemini_timeout_seconds: float = field(
+        default_factory=lambda: _env_float("GEMINI_TIMEOUT_SECONDS", 30.0)
+    )
+    # Meerdere afbeeldingen per Gemini prompt bundelen (1 = uitgeschakeld)
+    gemini_batch_size: int = field(
+        default_factory=lambda: _env_int("GEMINI_BATCH_SIZE", 1)
+    )
+    gemini_batch_wait_ms: float = field(
+        default_factory=lambda: _env_float("GEMINI_BATCH_WAIT_MS", 50.0)
+    )
+
+    # Deadline per classificatie request in seconden (0 = geen deadline)
+    request_deadline_seconds: float = field(
+        default_factory=lambda: _env_float("REQUEST_DEADLINE_SECONDS", 15.0)
+    )
+    # Tweede, identieke Gemini call als de eerste na zoveel seconden niet klaar is
+    # (0 = uit, alleen de async client)
+    gemini_hedge_after_seconds: float = field(
+        default_factory=lambda: _env_float("GEMINI_HEDGE_AFTER_SECONDS", 0.0)
+    )
+    # Circuit breaker rond Gemini: open bij te veel fouten of trage calls
+    circuit_failure_rate: float = field(
+        default_factory=lambda: _env_float("CIRCUIT_FAILURE_RATE", 0.5)
+    )
+    circuit_slow_call_seconds: float = field(
+        default_factory=lambda: _env_float("CIRCUIT_SLOW_CALL_SECONDS", 10.0)
+    )
+    circuit_window: int = field(default_factory=lambda: _env_int("CIRCUIT_WINDOW", 20))
+    circuit_min_calls: int = field(
+        default_factory=lambda: _env_int("CIRCUIT_MIN_CALLS", 10)
+    )
+    circuit_open_seconds: float = field(
+        default_factory=lambda: _env_float("CIRCUIT_OPEN_SECONDS", 30.0)
+    )
+    # Lokaal antwoord als Gemini faalt of te laat is, anders 503. Standaard uit:
+    # alleen de header X-Classificatie-Bron markeert het, niet de body
+    local_fallback: bool = field(
+        default_factory=lambda: _env_bool("LOCAL_FALLBACK", False)
+    )
+
+    # Inference precisie: "fp32" of "int8" (dynamische quantization, alleen CPU)
+    inference_precision: str = field(
+        default_factory=lambda: os.getenv("INFERENCE_PRECISION", "fp32")
+    )
+    quantize_conv: bool = field(
+        default_factory=lambda: _env_bool("QUANTIZE_CONV", False)
+    )
+
+    # Gereduceerde decode: JPEG draft mode / reduce() tot net boven model resolutie
+    fast_decode: bool = field(default_factory=lambda: _env_bool("FAST_DECODE", False))
+
+    # Resize per afbeelding, normalisatie gevectoriseerd per batch (uit = timm transform)
+    vectorized_preprocessing: bool = field(
+        default_factory=lambda: _env_bool("VECTORIZED_PREPROCESSING", True)
+    )
+
+    # Model output: "logits" (ImageNet head) of "embedding" (gepoolde vector)
+    feature_mode: str = field(
+        default_factory=lambda: os.getenv("FEATURE_MODE", "logits")
+    )
+    # Embedding laag: "pooled" (pre-head) of "stageN" (gepoold na stage N)
+    feature_layer: str = field(
+        default_factory=lambda: os.getenv("FEATURE_LAYER", "pooled")
+    )
+    # Output dtype: float32, float16 of bfloat16
+    feature_dtype: str = field(
+        default_factory=lambda: os.getenv("FEATURE_DTYPE", "float32")
+    )
+
+    # Inference backend: "eager", "torchscript", "compile" of "onnx"
+    inference_backend: str = field(
+        default_factory=lambda: os.getenv("INFERENCE_BACKEND", "eager")
+    )
+    # Vooraf geëxporteerd artifact (leeg = models/<model_name>-<instellingen>.<ext>)
+    model_artifact_path: str = field(
+        default_factory=lambda: os.getenv("MODEL_ARTIFACT_PATH", "")
+    )
+
+    # Micro-batching van model inference
+    batch_max_size: int = field(default_factory=lambda: _env_int("BATCH_MAX_SIZE", 8))
+    batch_max_wait_ms: float = field(
+        default_factory=lambda: _env_float("BATCH_MAX_WAIT_MS", 5.0)
+    )
+
+    # Resultaat cache op afbeelding bytes (0 = uitgeschakeld)
+    result_cache_size: int = field(
+        default_factory=lambda: _env_int("RESULT_CACHE_SIZE", 2048)
+    )
+    result_cache_ttl_seconds: float = field(
+        default_factory=lambda: _env_float("RESULT_CACHE_TTL_SECONDS", 3600.0)
+    )
+
+    # Near-duplicate cache op perceptuele hash (0 = uitgeschakeld)
+    near_duplicate_size: int = field(
+        default_factory=lambda: _env_int("NEAR_DUPLICATE_SIZE", 2048)
+    )
+    near_duplicate_ttl_seconds: float = field(
+        default_factory=lambda: _env_float("NEAR_DUPLICATE_TTL_SECONDS", 3600.0)
+    )
+    near_duplicate_max_distance: int = field(
+        default_factory=lambda: _env_int("NEAR_DUPLICATE_MAX_DISTANCE", 4)
+    )
+
+    # Gemini prompt cache op gekwantiseerde feature stats (0 = uitgeschakeld)
+    prompt_cache_size: int = field(
+        default_factory=lambda: _env_int("PROMPT_CACHE_SIZE", 4096)
+    )
+    prompt_cache_ttl_seconds: float = field(
+        default_factory=lambda: _env_float("PROMPT_CACHE_TTL_SECONDS", 86400.0)
+    )
+    # Aantal decimalen waarop stats worden afgerond voor prompt en sleutel
+    prompt_cache_precision: int = field(
+        default_factory=lambda: _env_int("PROMPT_CACHE_PRECISION", 2)
+    )
+
+    # Embedding index: Gemini overslaan als gelijkende meldingen het eens zijn
+    # "off", "brute" (exact) of "ivf" (k-means lijsten); pq_m > 0 = PQ bytes
+    embedding_index: str = field(
+        default_factory=lambda: os.getenv("EMBEDDING_INDEX", "off")
+    )
+    embedding_index_pq_m: int = field(
+        default_factory=lambda: _env_int("EMBEDDING_INDEX_PQ_M", 0)
+    )
+    embedding_index_nlist: int = field(
+        default_factory=lambda: _env_int("EMBEDDING_INDEX_NLIST", 64)
+    )
+    embedding_index_nprobe: int = field(
+        default_factory=lambda: _env_int("EMBEDDING_INDEX_NPROBE", 8)
+    )
+    embedding_index_train_size: int = field(
+        default_factory=lambda: _env_int("EMBEDDING_INDEX_TRAIN_SIZE", 2048)
+    )
+    embedding_index_max_size: int = field(
+        default_factory=lambda: _env_int("EMBEDDING_INDEX_MAX_SIZE", 100_000)
+    )
+    # Treffer: k buren boven min_similarity, gewogen eens over het type
+    embedding_index_k: int = field(
+        default_factory=lambda: _env_int("EMBEDDING_INDEX_K", 5)
+    )
+    embedding_index_min_similarity: float = field(
+        default_factory=lambda: _env_float("EMBEDDING_INDEX_MIN_SIMILARITY", 0.9)
+    )
+    embedding_index_agreement: float = field(
+        default_factory=lambda: _env_float("EMBEDDING_INDEX_AGREEMENT", 0.8)
+    )
+    # Opslag (.npz, leeg = alleen in geheugen), elke save_every toevoegingen
+    embedding_index_path: str = field(
+        default_factory=lambda: os.getenv("EMBEDDING_INDEX_PATH", "")
+    )
+    embedding_index_save_every: int = field(
+        default_factory=lambda: _env_int("EMBEDDING_INDEX_SAVE_EVERY", 500)
+    )
+
+    # Worker pools buiten de event loop
+    inference_workers: int = field(
+        default_factory=lambda: _env_int("INFERENCE_WORKERS", 8)
+    )
+    gemini_workers: int = field(default_factory=lambda: _env_int("GEMINI_WORKERS", 16))
+    worker_queue_size: int = field(
+        default_factory=lambda: _env_int("WORKER_QUEUE_SIZE", 64)
+    )
+
+    # Gestaged async pipeline: werkers per stap (inference en Gemini gebruiken de
+    # pools hierboven), stats gebundeld over requests; wachtrij = WORKER_QUEUE_SIZE
+    pipeline_decode_workers: int = field(
+        default_factory=lambda: _env_int("PIPELINE_DECODE_WORKERS", 4)
+    )
+    pipeline_stats_batch_size: int = field(
+        default_factory=lambda: _env_int("PIPELINE_STATS_BATCH_SIZE", 16)
+    )
+    pipeline_stats_wait_ms: float = field(
+        default_factory=lambda: _env_float("PIPELINE_STATS_WAIT_MS", 0.0)
+    )
+    pipeline_validation_workers: int = field(
+        default_factory=lambda: _env_int("PIPELINE_VALIDATION_WORKERS", 2)
+    )
+
+    # Server-Timing header per classificatie; resource headers (CPU tijd,
+    # geheugen piek, cache, batch) en Timing-Allow-Origin zijn optioneel
+    server_timing: bool = field(
+        default_factory=lambda: _env_bool("SERVER_TIMING", True)
+    )
+    resource_headers: bool = field(
+        default_factory=lambda: _env_bool("RESOURCE_HEADERS", False)
+    )
+    timing_allow_origin: str = field(
+        default_factory=lambda: os.getenv("TIMING_ALLOW_ORIGIN", "")
+    )
+
+    # Profiling met cProfile en torch.profiler (leeg token = uit); een fractie
+    # van het verkeer of één request met X-Profiel-Token, artifacts in de map
+    profile_token: str = field(default_factory=lambda: os.getenv("PROFILE_TOKEN", ""))
+    profile_sample_rate: float = field(
+        default_factory=lambda: _env_float("PROFILE_SAMPLE_RATE", 0.0)
+    )
+    profile_dir: str = field(default_factory=lambda: os.getenv("PROFILE_DIR", ""))
+    profile_max_count: int = field(
+        default_factory=lambda: _env_int("PROFILE_MAX_COUNT", 50)
+    )
+
+    # Pre-fork serving: processen en torch threads per proces (0 = auto)
+    server_workers: int = field(default_factory=lambda: _env_int("SERVER_WORKERS", 1))
+    torch_threads_per_worker: int = field(
+        default_factory=lambda: _env_int("TORCH_THREADS_PER_WORKER", 0)
+    )
+    # Herstart van gecrashte workers: backoff (verdubbelt per crash) en maximum
+    worker_restart_backoff_seconds: float = field(
+        default_factory=lambda: _env_float("WORKER_RESTART_BACKOFF_SECONDS", 0.5)
+    )
+    worker_max_restarts: int = field(
+        default_factory=lambda: _env_int("WORKER_MAX_RESTARTS", 5)
+    )
+
+    # Opstart warmup: laad model en draai dummy batches (leeg = 1 en batch max)
+    # voordat /ready 200 geeft; uit = lazy laden. Mislukt: herhalen, dan stoppen
+    warmup_on_startup: bool = field(
+        default_factory=lambda: _env_bool("WARMUP_ON_STARTUP", False)
+    )
+    warmup_batch_sizes: Tuple[int, ...] = field(
+        default_factory=lambda: _env_ints("WARMUP_BATCH_SIZES", ())
+    )
+    warmup_max_attempts: int = field(
+        default_factory=lambda: _env_int("WARMUP_MAX_ATTEMPTS", 5)
+    )
+    warmup_retry_seconds: float = field(
+        default_factory=lambda: _env_float("WARMUP_RETRY_SECONDS", 2.0)
+    )
@@ -0,0 +1,182 @@
+"""Config Registry - Afval config één keer laden, herladen bij nieuwe mtime"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from ..decorators.singleton_decorator import singleton
+from .afval_config import DEFAULT_CONFIG_PATH, AfvalConfig
+from .app_config import AppConfig
+
+logger = logging.getLogger(__name__)
+
+# Plaatshouders voor de per request variabele delen van een voorgerenderde prompt
+_BESCHRIJVING = "\x00beschrijving\x00"
+_AANTAL = "\x00aantal\x00"
+_AFBEELDINGEN = "\x00afbeeldingen\x00"
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    Onveranderlijke afval config met alles wat er per request van afhangt
+
+    De statische delen van de prompts (instructies, afval types) worden
+    één keer gerenderd; per afbeelding wordt alleen de feature beschrijving
+    ingevoegd.
+    """
+
+    afval_config: AfvalConfig
+    fingerprint: str
+    versie: int
+    mtime: Optional[float]
+    _prompt_delen: Tuple[str, ...]
+    _batch_prompt: str
+
+    @classmethod
+    def build(
+        cls,
+        afval_config: AfvalConfig,
+        gemini_model: str,
+        versie: int = 0,
+        mtime: Optional[float] = None,
+    ) -> "ConfigSnapshot":
+        """Vingerafdruk en voorgerenderde prompts bij een geladen config"""
+        from ..cache.prompt_cache import config_fingerprint
+
+        afval_types = ", ".join(afval_config.afval_types)
+        prompt = afval_config.prompt_template.format(
+            afval_types=afval_types, lokaal_resultaat=_BESCHRIJVING
+        )
+        batch_prompt = afval_config.batch_prompt_template.format(
+            aantal=_AANTAL, afval_types=afval_types, afbeeldingen=_AFBEELDINGEN
+        )
+        return cls(
+            afval_config=afval_config,
+            fingerprint=config_fingerprint(
+                afval_config.afval_types,
+                afval_config.prompt_template,
+                gemini_model,
+                afval_config.batch_prompt_template,
+            ),
+            versie=versie,
+            mtime=mtime,
+            _prompt_delen=tuple(prompt.split(_BESCHRIJVING)),
+            _batch_prompt=batch_prompt,
+        )
+
+    def render_prompt(self, beschrijving: str) -> str:
+        """Gemini prompt voor één afbeelding"""
+        return beschrijving.join(self._prompt_delen)
+
+    def render_batch_prompt(self, aantal: int, afbeeldingen: str) -> str:
+        """Gebundelde Gemini prompt met genummerde secties"""
+        return self._batch_prompt.replace(_AANTAL, str(aantal)).replace(
+            _AFBEELDINGEN, afbeeldingen
+        )
+
+
+class ReloadingConfig:
+    """
+    Afval config uit één YAML bestand, herladen als het bestand verandert
+
+    Het bestand wordt één keer gelezen. `current()` controleert hooguit
+    eens per `check_seconds` de mtime; is die veranderd, dan wordt een
+    nieuwe snapshot volledig opgebouwd en in één keer verwisseld. Een kapot
+    of half geschreven bestand laat de vorige snapshot staan.
+    """
+
+    def __init__(
+        self, path: Union[str, Path], gemini_model: str, check_seconds: float = 2.0
+    ):
+        self.path = Path(path)
+        self.gemini_model = gemini_model
+        self.check_seconds = check_seconds
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._seen_mtime = self._mtime()
+        self.reloads = 0
+        self.reload_errors = 0
+        self._snapshot = ConfigSnapshot.build(
+            AfvalConfig.from_yaml(self.path), self.gemini_model, 0, self._seen_mtime
+        )
+
+    def _mtime(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def current(self) -> ConfigSnapshot:
+        """Huidige snapshot; herlaadt als het bestand sinds de vorige keer veranderde"""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_seconds:
+            return self._snapshot
+
+        with self._lock:
+            if now - self._checked_at >= self.check_seconds:
+                self._checked_at = now
+                mtime = self._mtime()
+                if mtime is not None and mtime != self._seen_mtime:
+                    self._seen_mtime = mtime
+                    self._reload(mtime)
+            return self._snapshot
+
+    def reload(self) -> ConfigSnapshot:
+        """Herlaad direct, ongeacht mtime"""
+        with self._lock:
+            self._seen_mtime = self._mtime()
+            self._reload(self._seen_mtime)
+            return self._snapshot
+
+    def _reload(self, mtime: Optional[float]) -> None:
+        """Bouw en verwissel snapshot (lock wordt door de caller vastgehouden)"""
+        try:
+            snapshot = ConfigSnapshot.build(
+                AfvalConfig.load(self.path),
+                self.gemini_model,
+                self._snapshot.versie + 1,
+                mtime,
+            )
+        except Exception as e:
+            self.reload_errors += 1
+            logger.warning(f"Config niet herladen ({e}), vorige versie blijft actief")
+            return
+        self._snapshot = snapshot
+        self.reloads += 1
+        logger.info(f"Config herladen: versie {snapshot.versie}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Config versie voor /status"""
+        snapshot = self._snapshot
+        return {
+            "pad": str(self.path),
+            "versie": snapshot.versie,
+            "vingerafdruk": snapshot.fingerprint,
+            "afval_types": len(snapshot.afval_config.afval_types),
+            "herladen": self.reloads,
+            "herlaad_fouten": self.reload_errors,
+        }
+
+
+@singleton
+class ConfigRegistry(ReloadingConfig):
+    """
+    Proces-brede afval config (AFVAL_CONFIG_PATH, CONFIG_RELOAD_CHECK_SECONDS)
+
+    Houdt ook de AppConfig vast waarmee het proces gestart is: de omgeving
+    wordt één keer gelezen, niet per request, en een latere wijziging van
+    een environment variabele verandert het gedrag dus niet stilletjes.
+    """
+
+    def __init__(self, config: AppConfig = AppConfig()):
+        super().__init__(
+            config.afval_config_path or DEFAULT_CONFIG_PATH,
+            config.gemini_model,
+            config.config_reload_check_seconds,
+        )
+        self.app_config = config
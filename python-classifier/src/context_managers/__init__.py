@@ -1,6 +1,6 @@
 """Context managers module exports"""
 
-from .image_context import pil_image
+from .image_context import decoded_image, pil_image
 from .torch_context import torch_inference
 
-__all__ = ["pil_image", "torch_inference"]
+__all__ = ["decoded_image", "pil_image", "torch_inference"]
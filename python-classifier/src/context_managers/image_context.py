@@ -1,10 +1,14 @@
 """PIL Image Context Manager"""
 
 import io
+import time
 from contextlib import contextmanager
+from typing import Optional
 
 from PIL import Image
 
+from ..features.image_decoding import decode_rgb, open_image
+
 
 @contextmanager
 def pil_image(afbeelding_bytes: bytes):
@@ -15,3 +19,24 @@ def pil_image(afbeelding_bytes: bytes):
             yield afbeelding
         finally:
             afbeelding.close()
+
+
+@contextmanager
+def decoded_image(
+    afbeelding_bytes: bytes,
+    max_bytes: int,
+    min_side: Optional[int] = None,
+    max_pixels: int = 0,
+):
+    """
+    Valideer en decodeer één keer; geeft (RGB afbeelding, decode seconden)
+
+    Met `min_side` wordt gereduceerd gedecodeerd tot ongeveer die korte zijde.
+    """
+    start = time.perf_counter()
+    afbeelding = open_image(afbeelding_bytes, max_bytes, max_pixels)
+    try:
+        afbeelding = decode_rgb(afbeelding, min_side)
+        yield afbeelding, time.perf_counter() - start
+    finally:
+        afbeelding.close()
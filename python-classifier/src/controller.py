@@ -5,7 +5,7 @@ from .api.app import app
 
 # Import endpoints om routes te registreren
 print("Endpoints importeren...")
-from .api.endpoints import info, status, classification
+from .api.endpoints import info, status, classification, health
 print("Alle endpoints geïmporteerd")
 print(f"App: {app.title} v{app.version}")
 print(f"Routes: {[(r.path, list(r.methods)) for r in app.routes if not r.path.startswith('/docs')]}")
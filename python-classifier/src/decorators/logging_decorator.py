@@ -1,28 +1,63 @@
 """Logging Decorator"""
 
 import functools
+import inspect
 import logging
+import time
 from typing import Any, Callable
 
+from ..monitoring.metrics import Metrics
+
 logger = logging.getLogger(__name__)
 
 ServiceCallable = Callable[..., Any]
 
 
 def logged(func: ServiceCallable) -> ServiceCallable:
-    """Log service calls met performance tracking"""
+    """Log service calls met performance tracking (duur, in flight, fouten)"""
+    name = f"{func.__module__}.{func.__qualname__}"
+    metrics = Metrics()
+    duration = metrics.call_seconds.labels(name)
+    in_flight = metrics.calls_in_flight.labels(name)
+
+    def failed(e: Exception) -> None:
+        metrics.call_errors.labels(name, type(e).__name__).inc()
+        logger.error(f"Fout: {name} - {e}")
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            logger.info(f"Gestart: {name}")
+            in_flight.inc()
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+                logger.info(f"Voltooid: {name}")
+                return result
+            except Exception as e:
+                failed(e)
+                raise
+            finally:
+                duration.observe(time.perf_counter() - start)
+                in_flight.dec()
+
+        return async_wrapper
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        name = f"{func.__module__}.{func.__qualname__}"
         logger.info(f"Gestart: {name}")
-
+        in_flight.inc()
+        start = time.perf_counter()
         try:
             result = func(*args, **kwargs)
             logger.info(f"Voltooid: {name}")
             return result
         except Exception as e:
-            logger.error(f"Fout: {name} - {e}")
+            failed(e)
             raise
+        finally:
+            duration.observe(time.perf_counter() - start)
+            in_flight.dec()
 
     return wrapper
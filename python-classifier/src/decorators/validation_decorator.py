@@ -1,10 +1,10 @@
 """Validation Decorators"""
 
 import functools
-import io
 from typing import Any, Callable
 
-from PIL import Image
+from ..config.app_config import AppConfig
+from ..features.image_decoding import open_image
 
 ServiceCallable = Callable[..., Any]
 
@@ -14,17 +14,18 @@ def validate_image(func: ServiceCallable) -> ServiceCallable:
 
     @functools.wraps(func)
     def wrapper(afbeelding_bytes: bytes, *args, **kwargs):
-        if not afbeelding_bytes:
-            raise ValueError("Geen afbeelding data")
-        if len(afbeelding_bytes) > 20 * 1024 * 1024:
-            raise ValueError("Afbeelding te groot (>20MB)")
+        config = AppConfig()
+        afbeelding = open_image(
+            afbeelding_bytes, config.max_file_size, config.max_image_pixels
+        )
 
         # Test of PIL het kan lezen
         try:
-            with io.BytesIO(afbeelding_bytes) as buffer:
-                Image.open(buffer).verify()
+            afbeelding.verify()
         except Exception:
             raise ValueError("Ongeldige afbeelding")
+        finally:
+            afbeelding.close()
 
         return func(afbeelding_bytes, *args, **kwargs)
 
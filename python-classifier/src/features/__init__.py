@@ -1,10 +1,37 @@
 """Features module exports"""
 
-from .response_validation import validate_gemini_response
-from .tensor_processing import extract_tensor_stats, format_feature_description
+from .batch_preprocessing import BatchPreprocessor
+from .image_decoding import (
+    apply_transform,
+    check_pixels,
+    decode_rgb,
+    open_image,
+    probe_size,
+)
+from .perceptual_hash import dhash, hamming_distance
+from .prepared_image import PreparedImage
+from .response_validation import split_batch_response, validate_gemini_response
+from .tensor_processing import (
+    extract_tensor_stats,
+    extract_tensor_stats_batch,
+    format_feature_description,
+    format_feature_summary,
+)
 
 __all__ = [
+    "BatchPreprocessor",
+    "PreparedImage",
+    "apply_transform",
+    "check_pixels",
+    "decode_rgb",
+    "dhash",
     "extract_tensor_stats",
+    "extract_tensor_stats_batch",
     "format_feature_description",
+    "format_feature_summary",
+    "hamming_distance",
+    "open_image",
+    "probe_size",
+    "split_batch_response",
     "validate_gemini_response",
 ]
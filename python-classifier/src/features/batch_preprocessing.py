@@ -0,0 +1,109 @@
+"""Vectorized Batch Preprocessing"""
+
+import math
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+_RESAMPLE = {
+    "bicubic": Image.Resampling.BICUBIC,
+    "bilinear": Image.Resampling.BILINEAR,
+    "nearest": Image.Resampling.NEAREST,
+    "lanczos": Image.Resampling.LANCZOS,
+    "box": Image.Resampling.BOX,
+    "hamming": Image.Resampling.HAMMING,
+}
+
+
+class BatchPreprocessor:
+    """
+    Vervanger van timm's eval transform die op uint8 arrays in batches werkt
+
+    Per afbeelding gebeurt alleen resize en center-crop (`to_pixels`), het
+    resultaat blijft uint8 HWC. Per batch worden dtype conversie, /255 en
+    normalisatie in één `addcmul` pass direct in een vooraf gealloceerde
+    tensor geschreven (`collate`). Numeriek gelijk aan de timm transform
+    op float afrondingen na.
+    """
+
+    def __init__(
+        self,
+        input_size: Tuple[int, int, int],
+        mean: Sequence[float],
+        std: Sequence[float],
+        scale_size: int,
+        interpolation: str = "bicubic",
+    ):
+        self.input_size = tuple(input_size)
+        self.scale_size = scale_size
+        self.resample = _RESAMPLE[interpolation]
+
+        std_t = torch.tensor(std, dtype=torch.float32).view(-1, 1, 1)
+        mean_t = torch.tensor(mean, dtype=torch.float32).view(-1, 1, 1)
+        # (x / 255 - mean) / std == x * scale + shift
+        self._scale = 1.0 / (255.0 * std_t)
+        self._shift = -mean_t / std_t
+        self._buffers = threading.local()
+
+    @classmethod
+    def from_data_config(cls, config: Dict[str, Any]) -> Optional["BatchPreprocessor"]:
+        """Bouw uit een timm data config; None als de transform niet na te bootsen is"""
+        crop_pct = config.get("crop_pct") or 1.0
+        if config.get("crop_mode", "center") != "center" or crop_pct > 1.0:
+            return None
+        if config.get("interpolation", "bicubic") not in _RESAMPLE:
+            return None
+
+        input_size = tuple(config["input_size"])
+        if input_size[-1] != input_size[-2]:
+            return None
+        # Zelfde afronding als timm.data.transforms_factory (eval, vierkante input)
+        scale_size = math.floor(input_size[-1] / crop_pct)
+        return cls(
+            input_size,
+            config["mean"],
+            config["std"],
+            scale_size,
+            config.get("interpolation", "bicubic"),
+        )
+
+    def to_pixels(self, afbeelding: Image.Image) -> np.ndarray:
+        """Resize korte zijde en center-crop; uint8 array van vorm (H, W, 3)"""
+        breedte, hoogte = afbeelding.size
+        kort, lang = min(breedte, hoogte), max(breedte, hoogte)
+        # torchvision Resize(int): korte zijde exact, lange zijde afgekapt
+        nieuw_kort, nieuw_lang = self.scale_size, int(self.scale_size * lang / kort)
+        grootte = (nieuw_kort, nieuw_lang) if breedte <= hoogte else (nieuw_lang, nieuw_kort)
+        if grootte != afbeelding.size:
+            afbeelding = afbeelding.resize(grootte, self.resample)
+
+        crop_h, crop_w = self.input_size[1], self.input_size[2]
+        top = int(round((grootte[1] - crop_h) / 2.0))
+        left = int(round((grootte[0] - crop_w) / 2.0))
+        if (crop_w, crop_h) != grootte:
+            afbeelding = afbeelding.crop((left, top, left + crop_w, top + crop_h))
+        return np.array(afbeelding)
+
+    def _buffer(self, batch_size: int) -> torch.Tensor:
+        """Herbruikbare float32 batch tensor per thread"""
+        buffer = getattr(self._buffers, "tensor", None)
+        if buffer is None or buffer.shape[0] < batch_size:
+            buffer = torch.empty((batch_size, *self.input_size), dtype=torch.float32)
+            self._buffers.tensor = buffer
+        return buffer[:batch_size]
+
+    def collate(self, pixels: Sequence[np.ndarray]) -> torch.Tensor:
+        """
+        Normaliseer uint8 HWC arrays naar één (N, C, H, W) float32 batch
+
+        De teruggegeven tensor is een view op de thread-lokale buffer en is
+        alleen geldig tot de volgende `collate` in dezelfde thread.
+        """
+        out = self._buffer(len(pixels))
+        for i, array in enumerate(pixels):
+            source = torch.from_numpy(array).permute(2, 0, 1)
+            torch.addcmul(self._shift, source, self._scale, out=out[i])
+        return out
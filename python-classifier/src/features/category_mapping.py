@@ -0,0 +1,111 @@
+"""ImageNet naar Afval Type Mapping"""
+
+from collections import defaultdict
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import torch
+
+# Zelfde vorm als het Gemini antwoord: 1-3 types, hoog naar laag
+TOP_K = 3
+MIN_CONFIDENCE = 0.05
+
+
+class CategoryMapping:
+    """
+    Sparse matrix van ImageNet klassen naar afval types
+
+    Elke ImageNet klasse verdeelt zijn kans gelijk over de afval types
+    waaronder hij in de config staat; niet genoemde klassen gaan naar
+    `rest_type` (of vallen weg als die leeg is). Classificatie is één
+    softmax over de logits en één sparse matmul voor de hele batch, de
+    confidence van een type is zijn opgetelde ImageNet kans.
+    """
+
+    def __init__(
+        self,
+        afval_types: Sequence[str],
+        klassen: Mapping[str, Sequence[int]],
+        rest_type: Optional[str] = None,
+        num_classes: int = 1000,
+    ):
+        onbekend = [t for t in [*klassen, rest_type] if t and t not in afval_types]
+        if onbekend:
+            raise ValueError(f"Onbekende afval types in imagenet_mapping: {onbekend}")
+
+        self.afval_types = list(afval_types)
+        self.num_classes = num_classes
+
+        types_per_klasse: Dict[int, List[int]] = defaultdict(list)
+        for afval_type, indices in klassen.items():
+            for index in indices:
+                if not 0 <= int(index) < num_classes:
+                    raise ValueError(f"ImageNet klasse {index} buiten bereik")
+                types_per_klasse[int(index)].append(self.afval_types.index(afval_type))
+        if rest_type:
+            rest = self.afval_types.index(rest_type)
+            for index in range(num_classes):
+                types_per_klasse.setdefault(index, [rest])
+
+        rijen, kolommen, gewichten = [], [], []
+        for index, types in types_per_klasse.items():
+            for type_index in types:
+                rijen.append(type_index)
+                kolommen.append(index)
+                gewichten.append(1.0 / len(types))
+
+        # (afval types, ImageNet klassen); gewichten per klasse tellen op tot 1
+        self.matrix = torch.sparse_coo_tensor(
+            torch.tensor([rijen, kolommen], dtype=torch.long),
+            torch.tensor(gewichten, dtype=torch.float32),
+            (len(self.afval_types), num_classes),
+            check_invariants=True,
+        ).coalesce()
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Mapping[str, Any],
+        afval_types: Sequence[str],
+        num_classes: int = 1000,
+    ) -> Optional["CategoryMapping"]:
+        """Bouw uit de `imagenet_mapping` sectie; None als die ontbreekt"""
+        klassen = (config or {}).get("klassen") or {}
+        if not klassen:
+            return None
+        return cls(afval_types, klassen, config.get("rest_type"), num_classes)
+
+    def scores(self, logits: torch.Tensor) -> torch.Tensor:
+        """Kans per afval type voor een batch logits: (N, klassen) -> (N, types)"""
+        if logits.shape[-1] != self.num_classes:
+            raise ValueError(
+                f"Verwacht {self.num_classes} ImageNet logits, kreeg {logits.shape[-1]}"
+            )
+        kansen = torch.softmax(logits.reshape(-1, self.num_classes).float(), dim=-1)
+        return torch.sparse.mm(self.matrix, kansen.T).T
+
+    def classify(
+        self,
+        logits: torch.Tensor,
+        top_k: int = TOP_K,
+        min_confidence: float = MIN_CONFIDENCE,
+    ) -> List[List[Dict[str, Any]]]:
+        """Top afval types per afbeelding als [{"type": ..., "confidence": ...}]"""
+        waarden, indices = self.scores(logits).topk(min(top_k, len(self.afval_types)))
+        resultaten = []
+        for rij_waarden, rij_indices in zip(waarden.tolist(), indices.tolist()):
+            resultaat = [
+                {"type": self.afval_types[i], "confidence": round(min(w, 1.0), 4)}
+                for w, i in zip(rij_waarden, rij_indices)
+                if w >= min_confidence
+            ]
+            # Altijd minstens het meest waarschijnlijke type teruggeven
+            resultaten.append(
+                resultaat
+                or [
+                    {
+                        "type": self.afval_types[rij_indices[0]],
+                        "confidence": round(rij_waarden[0], 4),
+                    }
+                ]
+            )
+        return resultaten
@@ -0,0 +1,155 @@
+"""Single-pass Image Decoding"""
+
+import io
+import math
+import time
+import warnings
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import torch
+from PIL import Image
+
+
+def check_pixels(size: Tuple[int, int], max_pixels: int) -> None:
+    """Weiger decompression bombs op basis van de header afmetingen"""
+    breedte, hoogte = size
+    if max_pixels and breedte * hoogte > max_pixels:
+        raise ValueError(f"Afbeelding heeft te veel pixels ({breedte}x{hoogte})")
+
+
+def probe_size(header_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """Pixel afmetingen uit (het begin van) een bestand, None als de header onvolledig is"""
+    with warnings.catch_warnings():
+        # Eigen limiet via check_pixels; PIL's waarschuwing is dan ruis
+        warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+        try:
+            with Image.open(io.BytesIO(header_bytes)) as afbeelding:
+                return afbeelding.size
+        except Image.DecompressionBombError:
+            raise ValueError("Afbeelding heeft te veel pixels")
+        except Exception:
+            return None
+
+
+def open_image(
+    afbeelding_bytes: bytes, max_bytes: int, max_pixels: int = 0
+) -> Image.Image:
+    """
+    Valideer grootte, header en pixel aantal, zonder pixel data te decoderen
+
+    `Image.open` leest alleen de header; de pixels worden pas bij `load()`
+    gedecodeerd. Zo wordt elke upload precies één keer geparsed en worden
+    decompression bombs geweigerd voordat er geheugen voor pixels is.
+    """
+    if not afbeelding_bytes:
+        raise ValueError("Geen afbeelding data")
+    if len(afbeelding_bytes) > max_bytes:
+        raise ValueError(f"Afbeelding te groot (>{max_bytes // (1024 * 1024)}MB)")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+        try:
+            afbeelding = Image.open(io.BytesIO(afbeelding_bytes))
+        except Exception:
+            raise ValueError("Ongeldige afbeelding")
+    try:
+        check_pixels(afbeelding.size, max_pixels)
+    except ValueError:
+        afbeelding.close()
+        raise
+    return afbeelding
+
+
+def min_decode_side(transform: Any) -> Optional[int]:
+    """Korte zijde waar de eerste Resize stap van de transform naar schaalt"""
+    from torchvision.transforms import Resize
+
+    for step in getattr(transform, "transforms", (transform,)):
+        if isinstance(step, Resize):
+            size = step.size
+            return size if isinstance(size, int) else min(size)
+    return None
+
+
+def request_draft(afbeelding: Image.Image, min_side: int) -> None:
+    """
+    Laat de JPEG decoder via DCT schaling (1/2, 1/4, 1/8) direct kleiner decoderen
+
+    PIL kiest de kleinste schaal waarbij beide zijden nog minstens de gevraagde
+    grootte hebben, dus de korte zijde blijft >= `min_side`. Moet vóór `load()`.
+    """
+    if afbeelding.format != "JPEG":
+        return
+    breedte, hoogte = afbeelding.size
+    schaal = min_side / min(breedte, hoogte)
+    if schaal < 1:
+        afbeelding.draft(
+            "RGB", (math.ceil(breedte * schaal), math.ceil(hoogte * schaal))
+        )
+
+
+# Modes waarvoor PIL's reduce() werkt; palet, 1-bit en 16-bit gaan eerst naar RGB
+REDUCE_MODES = frozenset({"RGB", "RGBA", "L", "LA"})
+
+
+def to_rgb(afbeelding: Image.Image) -> Image.Image:
+    """Zet om naar RGB en sluit het origineel (geen kopie als het al RGB is)"""
+    if afbeelding.mode == "RGB":
+        return afbeelding
+    rgb = afbeelding.convert("RGB")
+    afbeelding.close()
+    return rgb
+
+
+def reduce_to(afbeelding: Image.Image, min_side: int) -> Image.Image:
+    """Integer box-reductie direct na decode voor formaten zonder draft mode"""
+    factor = min(afbeelding.size) // min_side
+    if factor < 2:
+        return afbeelding
+    if afbeelding.mode not in REDUCE_MODES:
+        afbeelding = to_rgb(afbeelding)
+    kleiner = afbeelding.reduce(factor)
+    afbeelding.close()
+    return kleiner
+
+
+def decode_rgb(afbeelding: Image.Image, min_side: Optional[int] = None) -> Image.Image:
+    """
+    Decodeer pixel data en zet om naar RGB (geen kopie als het al RGB is)
+
+    Met `min_side` wordt gereduceerd gedecodeerd: JPEG via draft mode, andere
+    formaten via `reduce()` vóór de RGB conversie (palet, 1-bit en 16-bit
+    beelden erna). De korte zijde blijft minstens `min_side`, zodat de resize
+    van het model nog steeds verkleint.
+    """
+    try:
+        if min_side:
+            request_draft(afbeelding, min_side)
+        afbeelding.load()
+        if min_side:
+            afbeelding = reduce_to(afbeelding, min_side)
+        return to_rgb(afbeelding)
+    except Exception:
+        raise ValueError("Ongeldige afbeelding")
+
+
+def apply_transform(
+    transform: Any, afbeelding: Image.Image
+) -> Tuple[torch.Tensor, Dict[str, float]]:
+    """
+    Draai een torchvision/timm Compose stap voor stap met timings
+
+    Stappen op de PIL afbeelding (resize, crop) tellen als "resize"; de
+    conversie naar tensor en alles daarna tellen als "normalize".
+    """
+    steps: Tuple[Callable[[Any], Any], ...] = tuple(
+        getattr(transform, "transforms", (transform,))
+    )
+    timings = {"resize": 0.0, "normalize": 0.0}
+    value: Any = afbeelding
+    for step in steps:
+        start = time.perf_counter()
+        value = step(value)
+        stage = "normalize" if isinstance(value, torch.Tensor) else "resize"
+        timings[stage] += time.perf_counter() - start
+    return value, timings
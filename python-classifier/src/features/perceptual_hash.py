@@ -0,0 +1,30 @@
+"""Perceptual Hashing (dHash)"""
+
+from PIL import Image
+
+
+def dhash(afbeelding: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: 64-bit vingerafdruk die schaal- en compressie-robuust is
+
+    Het beeld wordt verkleind naar (hash_size + 1) x hash_size grijswaarden;
+    elke bit zegt of een pixel helderder is dan zijn rechterbuur.
+    """
+    klein = afbeelding.resize(
+        (hash_size + 1, hash_size), Image.Resampling.BOX, reducing_gap=2.0
+    ).convert("L")
+    pixels = klein.tobytes()
+
+    waarde = 0
+    for rij in range(hash_size):
+        offset = rij * (hash_size + 1)
+        for kolom in range(hash_size):
+            links = pixels[offset + kolom]
+            rechts = pixels[offset + kolom + 1]
+            waarde = (waarde << 1) | (links > rechts)
+    return waarde
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Aantal verschillende bits tussen twee hashes"""
+    return bin(a ^ b).count("1")
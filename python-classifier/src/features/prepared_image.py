@@ -0,0 +1,34 @@
+"""Prepared Image"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+
+
+@dataclass
+class PreparedImage:
+    """Eén keer gedecodeerde afbeelding: model-input en vingerafdruk"""
+
+    # Genormaliseerde (1, C, H, W) input, of None als `pixels` in de batch
+    # genormaliseerd wordt
+    tensor: Optional[torch.Tensor]
+    perceptual_hash: int
+    # Seconden per preprocessing fase: decode, hash, resize, normalize; na
+    # inferentie ook forward (duur van de batch) en forward_cpu (aandeel)
+    timings: Dict[str, float] = field(default_factory=dict)
+    # Geresizede en gecropte uint8 (H, W, C) pixels voor vectorized preprocessing
+    pixels: Optional[np.ndarray] = None
+    # Grootte van de micro-batch waarin deze afbeelding door het model ging
+    batch_size: int = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Geheugen van de model input (tensor of pixels)"""
+        data = self.tensor if self.tensor is not None else self.pixels
+        if data is None:
+            return 0
+        if isinstance(data, torch.Tensor):
+            return data.element_size() * data.nelement()
+        return data.nbytes
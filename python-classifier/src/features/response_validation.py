@@ -1,6 +1,6 @@
 """Response Validation"""
 
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 
 
 def validate_gemini_response(
@@ -17,3 +17,31 @@ def validate_gemini_response(
             and 0.0 <= item["confidence"] <= 1.0
         )
     ]
+
+
+def split_batch_response(
+    response: Any, count: int, valid_types: List[str]
+) -> List[Optional[List[Dict]]]:
+    """
+    Splits een gebundeld Gemini antwoord terug naar één resultaat per afbeelding
+
+    Verwacht een object met afbeeldingsnummers (1-based) als sleutels; een
+    lijst van `count` lijsten wordt positioneel gelezen. Elk deel wordt apart
+    gevalideerd. Ontbrekende of onleesbare delen worden None, zodat de caller
+    die afbeelding los kan herhalen.
+    """
+    if isinstance(response, list) and len(response) == count:
+        sections = {str(i + 1): part for i, part in enumerate(response)}
+    elif isinstance(response, dict):
+        sections = {str(key).strip(): part for key, part in response.items()}
+    else:
+        return [None] * count
+
+    results: List[Optional[List[Dict]]] = []
+    for i in range(1, count + 1):
+        part = sections.get(str(i))
+        if not isinstance(part, list) or not all(isinstance(x, dict) for x in part):
+            results.append(None)
+        else:
+            results.append(validate_gemini_response(part, valid_types))
+    return results
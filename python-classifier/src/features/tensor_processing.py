@@ -1,12 +1,136 @@
 """Tensor Feature Processing"""
 
-from typing import Dict
+from typing import Any, Dict, List, Sequence, Tuple
 
+import numpy as np
 import torch
 
 
-def extract_tensor_stats(tensor: torch.Tensor) -> Dict[str, float]:
+def _moments(flat: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Mean, std en var per rij met dezelfde afronding als de torch reducties
+
+    Eén float64 Welford pass levert var én std; na afronding naar float32
+    gelijk aan `torch.var`/`torch.std`. Mean blijft `torch.mean` (andere
+    sommatie volgorde dan Welford, dus anders niet bit-gelijk).
+    """
+    var64, _ = torch.var_mean(flat.double(), dim=1)
+    return flat.mean(dim=1), var64.sqrt().to(flat.dtype), var64.to(flat.dtype)
+
+
+def _batch_values_numpy(flat: torch.Tensor) -> Tuple[np.ndarray, np.ndarray]:
+    """CPU pad: na de momenten alles in NumPy, met veel minder dispatch overhead"""
+    mean, std, var = (value.numpy() for value in _moments(flat))
+    array = flat.numpy()
+    n = array.shape[1]
+
+    # Eén introselect pass voor alle drie de kwartielen
+    quartiles = np.partition(array, [n // 4, n // 2, 3 * n // 4], axis=1)
+    values = np.stack(
+        [
+            mean,
+            array.max(axis=1),
+            array.min(axis=1),
+            std,
+            var,
+            quartiles[:, n // 4],
+            quartiles[:, n // 2],
+            quartiles[:, 3 * n // 4],
+        ],
+        axis=1,
+    )
+    # Drempel in float32, zoals torch een Python float tegen float32 vergelijkt
+    counts = np.stack(
+        [
+            np.count_nonzero(array > 0, axis=1),
+            np.count_nonzero(array > (mean + std)[:, None], axis=1),
+        ],
+        axis=1,
+    )
+    return values, counts
+
+
+def _batch_values_torch(flat: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Device pad (GPU, half precision): zelfde statistieken als torch reducties"""
+    mean, std, var = _moments(flat)
+    n = flat.shape[1]
+    minimum, maximum = torch.aminmax(flat, dim=1)
+    quartiles = [flat.kthvalue(k + 1, dim=1).values for k in (n // 4, n // 2, 3 * n // 4)]
+    values = torch.stack([mean, maximum, minimum, std, var, *quartiles], dim=1)
+    counts = torch.stack(
+        [(flat > 0).sum(dim=1), (flat > (mean + std).unsqueeze(1)).sum(dim=1)], dim=1
+    )
+    return values, counts
+
+
+def extract_tensor_stats_batch(tensor: torch.Tensor) -> List[Dict[str, Any]]:
+    """
+    Statistieken per sample (dim 0) met gefuseerde batch reducties
+
+    Elke statistiek is één reductie over de hele batch in plaats van één per
+    sample; kwartielen komen via selectie (O(n)) in plaats van een volledige
+    sort, en alle waarden gaan in één `tolist()` naar Python, dus één device
+    sync per batch. Resultaten zijn bit-gelijk aan `reference_tensor_stats`
+    per sample.
+    """
+    flat = tensor.detach().reshape(tensor.shape[0], -1)
+    n = flat.shape[1]
+    sample_shape = str(torch.Size((1, *tensor.shape[1:])))
+
+    if flat.device.type == "cpu" and flat.dtype in (torch.float32, torch.float64):
+        values, counts = _batch_values_numpy(flat)
+    else:
+        values, counts = _batch_values_torch(flat)
+
+    results = []
+    for (mean_v, max_v, min_v, std_v, var_v, q25_v, med_v, q75_v), (pos_n, high_n) in zip(
+        values.tolist(), counts.tolist()
+    ):
+        positive_ratio = pos_n / n
+        results.append(
+            {
+                "mean": mean_v,
+                "max": max_v,
+                "min": min_v,
+                "std": std_v,
+                "shape": sample_shape,
+                "range": max_v - min_v,
+                "variance": var_v,
+                "median": med_v,
+                "q25": q25_v,
+                "q75": q75_v,
+                "positive_ratio": positive_ratio,
+                "negative_ratio": 1.0 - positive_ratio,
+                "high_activation_ratio": high_n / n,
+            }
+        )
+    return results
+
+
+def extract_tensor_stats(tensor: torch.Tensor) -> Dict[str, Any]:
     """Extracteer uitgebreide statistieken van tensor voor betere Gemini analyse"""
+    stats = extract_tensor_stats_batch(tensor.reshape(1, -1))[0]
+    stats["shape"] = str(tensor.shape)
+    return stats
+
+
+def extract_tensor_stats_many(
+    tensors: Sequence[torch.Tensor],
+) -> List[Dict[str, Any]]:
+    """Stats per losse tensor (als extract_tensor_stats) in één batch reductie"""
+    if not tensors:
+        return []
+    if len({(t.numel(), t.dtype) for t in tensors}) != 1:
+        return [extract_tensor_stats(t) for t in tensors]
+    flat = torch.stack([t.detach().reshape(-1) for t in tensors])
+    results = extract_tensor_stats_batch(flat)
+    for stats, tensor in zip(results, tensors):
+        stats["shape"] = str(tensor.shape)
+    return results
+
+
+def reference_tensor_stats(tensor: torch.Tensor) -> Dict[str, float]:
+    """Oorspronkelijke multi-pass implementatie; referentie voor parity tests en benchmark"""
     # Basis stats
     stats = {
         "mean": float(tensor.mean()),
@@ -42,21 +166,28 @@ def extract_tensor_stats(tensor: torch.Tensor) -> Dict[str, float]:
     return stats
 
 
-def format_feature_description(stats: Dict[str, float]) -> str:
-    """Format uitgebreide tensor statistieken voor Gemini analyse"""
-    return f"""
-CONVNEXT BASE MODEL ANALYSE RESULTAAT:
-- Tensor vorm: {stats['shape']}
+FEATURE_INTERPRETATIE = """INTERPRETATIE HULP:
+- Hoge spreiding + veel positieve features = complexe objecten (mogelijk afval)
+- Lage spreiding + weinig hoge activatie = simpele achtergronden (mogelijk geen afval)
+- Mediaan ver van gemiddelde = object met contrasten (mogelijk afval items)
+"""
+
+
+def format_feature_summary(stats: Dict[str, float]) -> str:
+    """Compacte feature regels voor één afbeelding, zonder kop en interpretatie"""
+    return f"""- Tensor vorm: {stats['shape']}
 - Gemiddelde activatie: {stats['mean']:.3f}
 - Activatie bereik: {stats['min']:.3f} tot {stats['max']:.3f} (spreiding: {stats['range']:.3f})
 - Standaard deviatie: {stats['std']:.3f}
 - Mediaan: {stats['median']:.3f}
 - Kwartiel verdeling: Q25={stats['q25']:.3f}, Q75={stats['q75']:.3f}
 - Positieve features: {stats['positive_ratio']:.1%}
-- Hoge activatie patronen: {stats['high_activation_ratio']:.1%}
+- Hoge activatie patronen: {stats['high_activation_ratio']:.1%}"""
 
-INTERPRETATIE HULP:
-- Hoge spreiding + veel positieve features = complexe objecten (mogelijk afval)
-- Lage spreiding + weinig hoge activatie = simpele achtergronden (mogelijk geen afval)
-- Mediaan ver van gemiddelde = object met contrasten (mogelijk afval items)
-"""
+
+def format_feature_description(stats: Dict[str, float]) -> str:
+    """Format uitgebreide tensor statistieken voor Gemini analyse"""
+    return (
+        "\nCONVNEXT BASE MODEL ANALYSE RESULTAAT:\n"
+        f"{format_feature_summary(stats)}\n\n{FEATURE_INTERPRETATIE}"
+    )
@@ -0,0 +1,25 @@
+"""Monitoring module exports"""
+
+from .metrics import (
+    CONTENT_TYPE,
+    Counter,
+    Gauge,
+    Histogram,
+    Metrics,
+    MetricsRegistry,
+)
+from .profiling import Profiler, Profiling, ProfileStore
+from .request_timing import RequestTiming
+
+__all__ = [
+    "CONTENT_TYPE",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "Metrics",
+    "MetricsRegistry",
+    "ProfileStore",
+    "Profiler",
+    "Profiling",
+    "RequestTiming",
+]
@@ -0,0 +1,338 @@
+"""Metrics - Counters, gauges en histogrammen in Prometheus tekst formaat"""
+
+import bisect
+import math
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ..decorators.singleton_decorator import singleton
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconden; van een snelle decode tot een trage Gemini call
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _pairs(names: Iterable[str], values: Iterable[str]) -> List[str]:
+    return [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+
+
+def _labels(names: Sequence[str], values: Sequence[str], *extra: str) -> str:
+    parts = _pairs(names, values)
+    parts.extend(part for part in extra if part)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    """Metric met optionele labels; één child per combinatie van label waarden"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values, **kwargs):
+        """Child voor deze label waarden (positioneel of op naam)"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} verwacht labels {self.labelnames}")
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self, const: str = "") -> List[str]:
+        """HELP, TYPE en samples; `const` zijn vaste labels voor elke sample"""
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for values, child in self._samples():
+            lines.extend(self._render_child(values, child, const))
+        return lines
+
+    def _render_child(self, values, child, const: str = "") -> Iterable[str]:
+        labels = _labels(self.labelnames, values, const)
+        yield f"{self.name}{labels} {_format_value(child.value)}"
+
+
+class Counter(_Metric):
+    """Alleen oplopende teller"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """Waarde die op en neer kan (in flight, wachtrij diepte)"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    """Verdeling over vaste, cumulatief gerapporteerde buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, values, child, const: str = "") -> Iterable[str]:
+        with child._lock:
+            counts, total, count = list(child.counts), child.sum, child.count
+        cumulative = 0
+        for bound, bucket_count in zip((*self.buckets, math.inf), counts):
+            cumulative += bucket_count
+            le = f'le="{_format_value(bound)}"'
+            labels = _labels(self.labelnames, values, const, le)
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _labels(self.labelnames, values, const)
+        yield f"{self.name}_sum{labels} {_format_value(total)}"
+        yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """
+    Verzameling metrics van dit proces
+
+    Registreren is idempotent: dezelfde naam geeft dezelfde metric terug.
+    Collectors worden vlak voor het renderen aangeroepen om gauges bij te
+    werken die uit bestaande stats komen (wachtrij diepte, pool bezetting).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} bestaat al als {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames=(),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """Functie die bij elke scrape gauges bijwerkt"""
+        with self._lock:
+            if collector not in self._collectors:
+                self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self, const_labels: Optional[Dict[str, str]] = None) -> str:
+        """Alle metrics in Prometheus tekst formaat (versie 0.0.4)"""
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics.values())
+        for collector in collectors:
+            collector()
+        const_labels = const_labels or {}
+        const = ",".join(_pairs(const_labels, const_labels.values()))
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render(const))
+        return "\n".join(lines) + "\n"
+
+
+@singleton
+class Metrics(MetricsRegistry):
+    """
+    Proces-brede metrics voor /metrics
+
+    Gemini latency, model inferentie en wachtrij tijd zijn aparte series,
+    zodat een dashboard kan zien waar de tijd van een request heen gaat.
+    Bij SERVER_WORKERS > 1 telt elk proces voor zich en komt een scrape bij
+    een willekeurige worker uit; elke sample krijgt daarom een `worker`
+    label (pid). Zo blijft elke serie monotoon en telt een herstarte worker
+    als nieuwe serie; aggregeer met sum without (worker).
+    """
+
+    def __init__(self):
+        super().__init__()
+        # @logged service calls
+        self.call_seconds = self.histogram(
+            "afvalalert_call_seconds", "Duur van @logged calls", ["functie"]
+        )
+        self.calls_in_flight = self.gauge(
+            "afvalalert_calls_in_flight", "Lopende @logged calls", ["functie"]
+        )
+        self.call_errors = self.counter(
+            "afvalalert_call_errors_total",
+            "Mislukte @logged calls",
+            ["functie", "fout"],
+        )
+
+        # Stappen van de gestagede pipeline
+        stage_labels = ["pipeline", "stap"]
+        self.stage_seconds = self.histogram(
+            "afvalalert_stage_seconds", "Verwerkingstijd per stap", stage_labels
+        )
+        self.stage_queue_wait_seconds = self.histogram(
+            "afvalalert_stage_queue_wait_seconds",
+            "Tijd in de wachtrij voor een stap",
+            stage_labels,
+        )
+        self.stage_in_flight = self.gauge(
+            "afvalalert_stage_in_flight", "Items in verwerking per stap", stage_labels
+        )
+        self.stage_queue_depth = self.gauge(
+            "afvalalert_stage_queue_depth", "Items in wachtrij per stap", stage_labels
+        )
+        self.stage_errors = self.counter(
+            "afvalalert_stage_errors_total", "Mislukte items per stap", stage_labels
+        )
+        self.stage_batch_size = self.histogram(
+            "afvalalert_stage_batch_size",
+            "Items per uitvoering van een stap",
+            stage_labels,
+            BATCH_BUCKETS,
+        )
+
+        # Externe call en model
+        self.gemini_call_seconds = self.histogram(
+            "afvalalert_gemini_call_seconds",
+            "Duur van één Gemini call over het netwerk",
+            ["client", "uitkomst"],
+        )
+        self.inference_seconds = self.histogram(
+            "afvalalert_inference_seconds",
+            "Duur van één forward pass",
+            ["backend"],
+        )
+        self.batch_size = self.histogram(
+            "afvalalert_batch_size",
+            "Items per micro-batch",
+            ["scheduler"],
+            BATCH_BUCKETS,
+        )
+
+    def render(self, const_labels: Optional[Dict[str, str]] = None) -> str:
+        """Prometheus tekst met het worker label van dit proces"""
+        return super().render({"worker": str(os.getpid()), **(const_labels or {})})
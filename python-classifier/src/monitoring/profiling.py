@@ -0,0 +1,189 @@
+"""Profiling - cProfile en torch.profiler opnames als downloadbare artifacts"""
+
+import cProfile
+import hmac
+import logging
+import os
+import pstats
+import random
+import re
+import secrets
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from ..config.app_config import AppConfig
+from ..decorators.singleton_decorator import singleton
+from ..exceptions.service_exceptions import ServiceNotAvailableError
+
+logger = logging.getLogger(__name__)
+
+PSTATS_SUFFIX = ".pstats"
+TRACE_SUFFIX = ".trace.json"
+# Alleen zelf aangemaakte bestandsnamen zijn downloadbaar (geen paden)
+_ARTIFACT_NAME = re.compile(r"^\d{8}-\d{6}-[0-9a-f]{8}(\.pstats|\.trace\.json)$")
+
+
+class ProfileStore:
+    """Profiel artifacts in één map; boven `max_profiles` gaan de oudste weg"""
+
+    def __init__(self, directory: Union[str, Path], max_profiles: int = 50):
+        self.directory = Path(directory)
+        self.max_profiles = max(1, max_profiles)
+
+    @staticmethod
+    def new_id() -> str:
+        """Sorteerbaar, niet te raden profiel id"""
+        return f"{time.strftime('%Y%m%d-%H%M%S')}-{secrets.token_hex(4)}"
+
+    def paths(self, profile_id: str) -> Tuple[Path, Path]:
+        """pstats en Chrome trace pad voor een profiel"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return (
+            self.directory / f"{profile_id}{PSTATS_SUFFIX}",
+            self.directory / f"{profile_id}{TRACE_SUFFIX}",
+        )
+
+    def path(self, name: str) -> Optional[Path]:
+        """Pad van een bestaand artifact, of None bij een onbekende naam"""
+        if not _ARTIFACT_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def artifacts(self) -> List[Dict[str, Any]]:
+        """Alle artifacts, nieuwste eerst"""
+        if not self.directory.is_dir():
+            return []
+        files = [
+            (p.stat(), p.name)
+            for p in self.directory.iterdir()
+            if _ARTIFACT_NAME.match(p.name)
+        ]
+        files.sort(key=lambda item: (item[0].st_mtime, item[1]), reverse=True)
+        return [
+            {"bestand": name, "bytes": stat.st_size, "mtime": stat.st_mtime}
+            for stat, name in files
+        ]
+
+    def prune(self) -> None:
+        """Verwijder de oudste profielen boven `max_profiles`"""
+        ids = list(dict.fromkeys(a["bestand"].split(".")[0] for a in self.artifacts()))
+        for profile_id in ids[self.max_profiles :]:
+            for path in self.paths(profile_id):
+                path.unlink(missing_ok=True)
+
+
+class Profiler:
+    """
+    Opname van één functie met cProfile en torch.profiler
+
+    Eén opname tegelijk: beide profilers zijn proces-breed en laten zich
+    niet nesten. cProfile ziet alleen de thread waarin de functie draait,
+    dus de functie moet zijn werk zelf doen (geen micro-batch scheduler).
+    Zonder token staat profiling uit.
+    """
+
+    def __init__(self, store: ProfileStore, token: str = "", sample_rate: float = 0.0):
+        self.store = store
+        self.token = token
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self.captured = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.token)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """Token uit de request gelijk aan het geconfigureerde token"""
+        return (
+            self.enabled
+            and token is not None
+            and hmac.compare_digest(token.encode(), self.token.encode())
+        )
+
+    def sample(self) -> bool:
+        """Deze request profileren volgens de sample rate"""
+        return self.enabled and random.random() < self.sample_rate
+
+    def busy(self) -> bool:
+        return self._lock.locked()
+
+    def capture(
+        self, profile_id: str, func: Callable[..., Any], *args, **kwargs
+    ) -> Tuple[Any, Dict[str, Any]]:
+        """Voer func uit onder beide profilers; resultaat en samenvatting"""
+        from torch.profiler import ProfilerActivity, profile
+
+        if not self._lock.acquire(blocking=False):
+            raise ServiceNotAvailableError("Er loopt al een profiel opname")
+        try:
+            pstats_path, trace_path = self.store.paths(profile_id)
+            python_profile = cProfile.Profile()
+            start = time.perf_counter()
+            activities = [ProfilerActivity.CPU]
+            with profile(activities=activities, record_shapes=True) as trace:
+                python_profile.enable()
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    python_profile.disable()
+            duur = time.perf_counter() - start
+
+            python_profile.dump_stats(str(pstats_path))
+            trace.export_chrome_trace(str(trace_path))
+            self.store.prune()
+            self.captured += 1
+        finally:
+            self._lock.release()
+
+        logger.info(f"Profiel {profile_id} opgeslagen in {self.store.directory}")
+        return result, {
+            "id": profile_id,
+            "duration": round(duur, 6),
+            "bestanden": [pstats_path.name, trace_path.name],
+            "top": top_functions(python_profile),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Profiling status voor /status"""
+        return {
+            "actief": self.enabled,
+            "sample_rate": self.sample_rate,
+            "opnames": self.captured,
+            "bezig": self.busy(),
+            "map": str(self.store.directory),
+        }
+
+
+def top_functions(python_profile: cProfile.Profile, limit: int = 15) -> List[Dict]:
+    """Duurste functies op cumulatieve tijd"""
+    stats = pstats.Stats(python_profile).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    return [
+        {
+            "functie": f"{func} ({os.path.basename(filename)}:{line})",
+            "calls": calls,
+            "eigen_ms": round(own * 1000, 3),
+            "cumulatief_ms": round(cumulative * 1000, 3),
+        }
+        for (filename, line, func), (_, calls, own, cumulative, _) in rows[:limit]
+    ]
+
+
+@singleton
+class Profiling(Profiler):
+    """Proces-brede profiler (PROFILE_TOKEN, PROFILE_SAMPLE_RATE, PROFILE_DIR)"""
+
+    def __init__(self, config: AppConfig = AppConfig()):
+        directory = config.profile_dir or os.path.join(
+            tempfile.gettempdir(), "afvalalert-profielen"
+        )
+        super().__init__(
+            ProfileStore(directory, config.profile_max_count),
+            config.profile_token,
+            config.profile_sample_rate,
+        )
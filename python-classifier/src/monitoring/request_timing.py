@@ -0,0 +1,71 @@
+"""Request Timing - Stap duur en resource gebruik per request (Server-Timing)"""
+
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Volgorde in de header; onbekende namen volgen in volgorde van toevoegen
+_ORDER = (
+    "upload",
+    "wachtrij",
+    "decode",
+    "inferentie",
+    "forward",
+    "stats",
+    "gemini",
+    "validatie",
+)
+
+
+class RequestTiming:
+    """
+    Tijden en resources van één classificatie request
+
+    Stappen van één request lopen na elkaar (ook als ze op verschillende
+    werkers draaien), dus schrijven gebeurt nooit gelijktijdig. Een naam
+    die vaker voorkomt (wachtrij per stap) telt op.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations: Dict[str, float] = {}
+        self.cpu = 0.0
+        self.memory_peak = 0
+        self.batch_size: Optional[int] = None
+        self.cache: Optional[str] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        """Tel duur op bij een stap"""
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def add_cpu(self, seconds: float) -> None:
+        """CPU tijd van threads die aan deze request werkten"""
+        self.cpu += seconds
+
+    def note_memory(self, nbytes: int) -> None:
+        """Buffers die de request op dit moment vasthoudt; onthoudt de piek"""
+        self.memory_peak = max(self.memory_peak, int(nbytes))
+
+    def _entries(self) -> List[Tuple[str, float]]:
+        known = [name for name in _ORDER if name in self.durations]
+        rest = [name for name in self.durations if name not in _ORDER]
+        return [(name, self.durations[name]) for name in known + rest]
+
+    def server_timing(self) -> str:
+        """Server-Timing header waarde, duur in milliseconden"""
+        parts = [f"{name};dur={sec * 1000:.2f}" for name, sec in self._entries()]
+        if self.cache is not None:
+            parts.append(f'cache;desc="{self.cache}"')
+        parts.append(f"totaal;dur={(time.perf_counter() - self.start) * 1000:.2f}")
+        return ", ".join(parts)
+
+    def resource_headers(self) -> Dict[str, str]:
+        """Optionele headers met CPU tijd, geheugen piek, cache status en batch"""
+        headers = {
+            "X-Cpu-Tijd-Ms": f"{self.cpu * 1000:.2f}",
+            "X-Geheugen-Piek-Bytes": str(self.memory_peak),
+        }
+        if self.cache is not None:
+            headers["X-Cache-Status"] = self.cache
+        if self.batch_size is not None:
+            headers["X-Batch-Grootte"] = str(self.batch_size)
+        return headers
@@ -1,38 +1,97 @@
 """Functional Pipeline - Compose classificatie als pure functies"""
 
-from typing import Any, Callable, Dict, List, TypeVar
-
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+from .cache.embedding_cache import EmbeddingCache
+from .cache.near_duplicate_cache import NearDuplicateCache
+from .cache.result_cache import ResultCache, content_key
+from .config.app_config import AppConfig
+from .config.config_registry import ConfigRegistry
 from .decorators.logging_decorator import logged
+from .decorators.singleton_decorator import singleton
 from .exceptions.service_exceptions import ServiceNotAvailableError
+from .exceptions.validation_exceptions import ValidationError
+from .features.response_validation import validate_gemini_response
+from .features.tensor_processing import extract_tensor_stats_many
+from .monitoring.metrics import Metrics
+from .monitoring.profiling import Profiling
+from .monitoring.request_timing import RequestTiming
+from .services.pipeline_engine import Done, Stage, StagedPipeline
 from .services.service_factory import ServiceFactory
+from .services.worker_pools import WorkerPools
+
+logger = logging.getLogger(__name__)
 
 # Type voor pipeline functies
 T = TypeVar("T")
 PipelineFunc = Callable[[T], T]
 
+# Classificatie modus: Gemini, of volledig offline via de ImageNet mapping
+MODUS_GEMINI = "gemini"
+MODUS_LOKAAL = "lokaal"
+MODI = (MODUS_GEMINI, MODUS_LOKAAL)
+
+# Herkomst van het laatste resultaat in deze request (header X-Classificatie-Bron)
+BRON_GEMINI = "gemini"
+BRON_LOKAAL = "lokaal"
+BRON_CACHE = "cache"
+BRON_INDEX = "index"
+BRON_FALLBACK = "lokaal-fallback"
+classificatie_bron: contextvars.ContextVar[str] = contextvars.ContextVar(
+    "classificatie_bron", default=BRON_GEMINI
+)
+
+# Conservatief antwoord als Gemini faalt en lokale classificatie niet kan
+LOKALE_FALLBACK: List[Dict[str, Any]] = [{"type": "Overig", "confidence": 0.1}]
+
 # ======================== PIPELINE FUNCTIES ========================
 
 
-def validate_services() -> None:
-    """Controleer of alle services beschikbaar zijn"""
+def validate_services(gemini_nodig: bool = True) -> None:
+    """Controleer of alle (voor deze modus benodigde) services beschikbaar zijn"""
     factory = ServiceFactory()
     services = factory.create_all_services()
 
     if not services["lokaal"].is_ready():
         raise ServiceNotAvailableError("Lokale service niet beschikbaar")
 
-    if not services["gemini"].is_ready():
+    if gemini_nodig and not services["gemini"].is_ready():
         raise ServiceNotAvailableError("Gemini service niet beschikbaar")
 
 
 @logged
-def extract_swin_features(afbeelding_bytes: bytes) -> dict:
-    """Stap 1: Extract Swin Tiny features"""
+def prepare_image(afbeelding_bytes: bytes) -> dict:
+    """Stap 0: Decodeer afbeelding en bereken perceptuele hash"""
     factory = ServiceFactory()
     lokale_service = factory.create_lokale_service()
-    features = lokale_service.extract_features(afbeelding_bytes)
+    afbeelding = lokale_service.prepare(afbeelding_bytes)
 
-    return {"afbeelding_bytes": afbeelding_bytes, "swin_features": features}
+    return {"afbeelding_bytes": afbeelding_bytes, "afbeelding": afbeelding}
+
+
+@logged
+def extract_swin_features(pipeline_data: Union[bytes, dict]) -> dict:
+    """Stap 1: Extract Swin Tiny features (uit ruwe bytes of voorbereide data)"""
+    factory = ServiceFactory()
+    lokale_service = factory.create_lokale_service()
+
+    if isinstance(pipeline_data, bytes):
+        features = lokale_service.extract_features(pipeline_data)
+        return {"afbeelding_bytes": pipeline_data, "swin_features": features}
+
+    features = lokale_service.extract_prepared(pipeline_data["afbeelding"])
+    return {**pipeline_data, "swin_features": features}
+
+
+def _precomputed_stats(pipeline_data: dict) -> Dict[str, Any]:
+    """Door de stats stap berekende feature stats, als die er zijn"""
+    if "tensor_stats" in pipeline_data:
+        return {"tensor_stats": pipeline_data["tensor_stats"]}
+    return {}
 
 
 @logged
@@ -40,7 +99,35 @@ def classify_with_gemini(pipeline_data: dict) -> List[Dict[str, Any]]:
     """Stap 2: Classificeer met Gemini"""
     factory = ServiceFactory()
     gemini_service = factory.create_gemini_service()
-    return gemini_service.classify(pipeline_data["swin_features"])
+    return gemini_service.classify(
+        pipeline_data["swin_features"], **_precomputed_stats(pipeline_data)
+    )
+
+
+@logged
+async def classify_with_gemini_async(pipeline_data: dict) -> List[Dict[str, Any]]:
+    """Stap 2 (async): Classificeer met Gemini zonder een thread vast te houden"""
+    factory = ServiceFactory()
+    gemini_service = factory.create_gemini_service()
+    return await gemini_service.classify_async(
+        pipeline_data["swin_features"], **_precomputed_stats(pipeline_data)
+    )
+
+
+@logged
+def classify_locally(pipeline_data: dict) -> List[Dict[str, Any]]:
+    """Stap 2 (lokaal): Afval types uit de ImageNet logits, zonder externe call"""
+    factory = ServiceFactory()
+    lokale_service = factory.create_lokale_service()
+    return lokale_service.classify_categories(pipeline_data["swin_features"])
+
+
+def local_fallback(pipeline_data: dict) -> List[Dict[str, Any]]:
+    """Stap 2 (fallback): Lokaal antwoord zonder Gemini"""
+    try:
+        return classify_locally(pipeline_data)
+    except (ServiceNotAvailableError, ValueError):
+        return [dict(item) for item in LOKALE_FALLBACK]
 
 
 # ======================== PIPELINE COMPOSITION ========================
@@ -62,18 +149,120 @@ def compose(*functions: PipelineFunc) -> PipelineFunc:
 # Minimal pipeline: always to service first, then to Gemini
 classification_pipeline = compose(extract_swin_features, classify_with_gemini)
 
+# ======================== CACHING ========================
+
+
+def resolve_modus(modus: Optional[str]) -> str:
+    """Modus van deze request, standaard CLASSIFICATIE_MODUS"""
+    modus = modus or ConfigRegistry().app_config.classificatie_modus
+    if modus not in MODI:
+        raise ValidationError(f"Onbekende classificatie modus: {modus}")
+    return modus
+
+
+def result_key(afbeelding_bytes: bytes, modus: str, fingerprint: str) -> str:
+    """Resultaat cache sleutel per afval config; lokaal los van Gemini antwoorden"""
+    key = f"{content_key(afbeelding_bytes)}:{fingerprint}"
+    return key if modus == MODUS_GEMINI else f"{key}:{modus}"
+
+
+def lookup_near_duplicate(
+    pipeline_data: dict, gebruik_cache: bool = True
+) -> Optional[List[Dict[str, Any]]]:
+    """Gemini classificatie van een eerder geziene, bijna-identieke foto"""
+    # Alleen Gemini antwoorden staan erin; modus lokaal krijgt die niet terug
+    if not gebruik_cache or pipeline_data["modus"] != MODUS_GEMINI:
+        return None
+    return NearDuplicateCache().get(
+        pipeline_data["afbeelding"].perceptual_hash, pipeline_data["fingerprint"]
+    )
+
+
+def remember_result(
+    key: str, pipeline_data: dict, resultaat: List[Dict[str, Any]]
+) -> None:
+    """Sla resultaat op in de exacte en de near-duplicate cache"""
+    ResultCache().put(key, resultaat)
+    NearDuplicateCache().put(
+        pipeline_data["afbeelding"].perceptual_hash,
+        resultaat,
+        pipeline_data["fingerprint"],
+    )
+
+
+def lookup_embedding(
+    pipeline_data: dict, gebruik_cache: bool = True
+) -> Optional[List[Dict[str, Any]]]:
+    """Classificatie waar visueel gelijkende, gelabelde meldingen het over eens zijn"""
+    if not gebruik_cache:
+        return None
+    return EmbeddingCache().get(
+        pipeline_data["swin_features"], pipeline_data["fingerprint"]
+    )
+
+
+def remember_embedding(pipeline_data: dict, resultaat: List[Dict[str, Any]]) -> None:
+    """Voeg Gemini resultaat toe aan de embedding index"""
+    EmbeddingCache().put(
+        pipeline_data["swin_features"], resultaat, pipeline_data["fingerprint"]
+    )
+
+
+def classify_offline(key: str, pipeline_data: dict) -> List[Dict[str, Any]]:
+    """Lokale classificatie; alleen in de resultaat cache onder de lokale sleutel"""
+    resultaat = classify_locally(pipeline_data)
+    classificatie_bron.set(BRON_LOKAAL)
+    ResultCache().put(key, resultaat)
+    return resultaat
+
+
+# ======================== DEGRADATIE ========================
+
+
+async def within_deadline(call: Awaitable[T], deadline: Optional[float]) -> T:
+    """Await call tot de absolute loop tijd `deadline` (None = onbegrensd)"""
+    if deadline is None:
+        return await call
+    remaining = deadline - asyncio.get_running_loop().time()
+    return await asyncio.wait_for(call, timeout=max(0.0, remaining))
+
+
+def fallback_or_raise(pipeline_data: dict, error: Exception) -> List[Dict[str, Any]]:
+    """Lokaal fallback antwoord na een Gemini fout, of 503 als fallback uit staat"""
+    if not ConfigRegistry().app_config.local_fallback:
+        if isinstance(error, ServiceNotAvailableError):
+            raise error
+        raise ServiceNotAvailableError("Gemini antwoordde niet binnen de deadline")
+
+    reden = str(error) or type(error).__name__
+    logger.warning(f"Gemini niet beschikbaar ({reden}), lokaal fallback antwoord")
+    classificatie_bron.set(BRON_FALLBACK)
+    return local_fallback(pipeline_data)
+
+
 # ======================== MAIN PIPELINE EXECUTOR ========================
 
 
 @logged
-def execute_classification(afbeelding_bytes: bytes) -> List[Dict[str, Any]]:
+def execute_classification(
+    afbeelding_bytes: bytes, gebruik_cache: bool = True, modus: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
     Voer volledige classificatie pipeline uit
 
-    Minimale pipeline: altijd eerst naar de service, daarna naar Gemini
+    Minimale pipeline: altijd eerst naar de service, daarna naar Gemini.
+    Byte-identieke afbeeldingen worden uit de resultaat cache beantwoord,
+    bijna-identieke foto's (perceptuele hash) zonder ConvNeXt en Gemini en
+    visueel gelijkende meldingen (EMBEDDING_INDEX) zonder Gemini.
+    Faalt Gemini (of staat de circuit breaker open), dan volgt met
+    LOCAL_FALLBACK het lokale fallback antwoord (niet gecacht), anders 503. In modus "lokaal" komt het
+    antwoord zonder externe call uit de ImageNet logits. Alle caches gelden
+    per afval config vingerafdruk, dus na herladen geen oude antwoorden.
 
     Args:
         afbeelding_bytes: Raw afbeelding data
+        gebruik_cache: False om de resultaat cache over te slaan
+        modus: "gemini" of "lokaal" (None = CLASSIFICATIE_MODUS)
 
     Returns:
         List[Dict]: [{"type": "...", "confidence": 0.xx}]
@@ -82,40 +271,373 @@ def execute_classification(afbeelding_bytes: bytes) -> List[Dict[str, Any]]:
         ValidationError: Ongeldige input
         ServiceNotAvailableError: Service problemen
     """
+    modus = resolve_modus(modus)
+    classificatie_bron.set(BRON_GEMINI)
+    fingerprint = ConfigRegistry().current().fingerprint
+    cache, key = ResultCache(), result_key(afbeelding_bytes, modus, fingerprint)
+    if gebruik_cache and (cached := cache.get(key)) is not None:
+        classificatie_bron.set(BRON_CACHE)
+        return cached
+
     # Pre-validatie
-    validate_services()
+    validate_services(gemini_nodig=modus == MODUS_GEMINI)
+
+    pipeline_data = {
+        **prepare_image(afbeelding_bytes),
+        "fingerprint": fingerprint,
+        "modus": modus,
+    }
+    if (near := lookup_near_duplicate(pipeline_data, gebruik_cache)) is not None:
+        classificatie_bron.set(BRON_CACHE)
+        cache.put(key, near)
+        return near
 
     # Voer pipeline uit - altijd eerst naar service, dan naar Gemini
-    return classification_pipeline(afbeelding_bytes)
+    features = extract_swin_features(pipeline_data)
+    if modus == MODUS_LOKAAL:
+        return classify_offline(key, features)
+    if (similar := lookup_embedding(features, gebruik_cache)) is not None:
+        classificatie_bron.set(BRON_INDEX)
+        cache.put(key, similar)
+        return similar
+    try:
+        resultaat = classify_with_gemini(features)
+    except ServiceNotAvailableError as e:
+        return fallback_or_raise(features, e)
+    remember_result(key, pipeline_data, resultaat)
+    remember_embedding(features, resultaat)
+    return resultaat
+
+
+@logged
+async def execute_classification_async(
+    afbeelding_bytes: bytes,
+    gebruik_cache: bool = True,
+    modus: Optional[str] = None,
+    timing: Optional[RequestTiming] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Voer classificatie uit via de gestagede pipeline
+
+    Decode, ConvNeXt inference, feature stats, Gemini en validatie zijn
+    losse stappen met eigen wachtrij en werkers (ClassificationStages), dus
+    CPU werk voor de ene upload overlapt met het wachten op Gemini voor een
+    andere en de event loop blijft vrij. Gemini gaat via de async client
+    (GEMINI_ASYNC) of als blocking call in de Gemini pool. De hele request
+    heeft een deadline (REQUEST_DEADLINE_SECONDS); Gemini krijgt de
+    resterende tijd. Bij een fout, open circuit of verlopen deadline volgt
+    een 503, of met LOCAL_FALLBACK het lokale fallback antwoord. In modus "lokaal" wordt
+    Gemini helemaal overgeslagen. Een meegegeven `timing` krijgt duur,
+    wachtrij en CPU tijd per stap, de forward pass, micro-batch grootte en
+    geheugen piek van deze request (Server-Timing).
+
+    Raises:
+        ValidationError: Ongeldige input
+        ServiceNotAvailableError: Service problemen of volle pipeline
+    """
+    config = ConfigRegistry().app_config
+    deadline = (
+        asyncio.get_running_loop().time() + config.request_deadline_seconds
+        if config.request_deadline_seconds > 0
+        else None
+    )
+    modus = resolve_modus(modus)
+    classificatie_bron.set(BRON_GEMINI)
+    fingerprint = ConfigRegistry().current().fingerprint
+    key = result_key(afbeelding_bytes, modus, fingerprint)
+    if gebruik_cache and (cached := ResultCache().get(key)) is not None:
+        classificatie_bron.set(BRON_CACHE)
+        return cached
+
+    validate_services(gemini_nodig=modus == MODUS_GEMINI)
+
+    resultaat, bron = await ClassificationStages().submit(
+        {
+            "afbeelding_bytes": afbeelding_bytes,
+            "key": key,
+            "fingerprint": fingerprint,
+            "modus": modus,
+            "gebruik_cache": gebruik_cache,
+            "deadline": deadline,
+            "timing": timing,
+        },
+        timing=timing,
+    )
+    classificatie_bron.set(bron)
+    return resultaat
+
+
+# ======================== GESTAGEDE PIPELINE ========================
+# Stappen werken op een request dict; Done((resultaat, bron)) slaat de rest over
+
+Uitkomst = Tuple[List[Dict[str, Any]], str]
+
+
+def account_request(pipeline_data: dict) -> None:
+    """Forward pass, micro-batch en geheugen piek in de RequestTiming, als die er is"""
+    timing = pipeline_data.get("timing")
+    if timing is None:
+        return
+    afbeelding = pipeline_data["afbeelding"]
+    if "forward" in afbeelding.timings:
+        timing.add("forward", afbeelding.timings["forward"])
+        timing.add_cpu(afbeelding.timings.get("forward_cpu", 0.0))
+        timing.batch_size = afbeelding.batch_size
+    # Upload, model input en features leven tegelijk in de request data
+    features = pipeline_data.get("swin_features")
+    nbytes = len(pipeline_data["afbeelding_bytes"]) + afbeelding.nbytes
+    if features is not None:
+        nbytes += features.element_size() * features.nelement()
+    timing.note_memory(nbytes)
+
+
+def decode_stage(request: dict) -> Union[dict, Done]:
+    """Decode: afbeelding voorbereiden; een bijna-duplicaat is direct klaar"""
+    pipeline_data = {**request, **prepare_image(request["afbeelding_bytes"])}
+    account_request(pipeline_data)
+    near = lookup_near_duplicate(pipeline_data, request["gebruik_cache"])
+    if near is not None:
+        ResultCache().put(request["key"], near)
+        return Done((near, BRON_CACHE))
+    return pipeline_data
+
+
+def inference_stage(pipeline_data: dict) -> Union[dict, Done]:
+    """Inferentie: ConvNeXt features; lokale modus en embedding index zijn klaar"""
+    features = extract_swin_features(pipeline_data)
+    account_request(features)
+    if features["modus"] == MODUS_LOKAAL:
+        return Done((classify_offline(features["key"], features), BRON_LOKAAL))
+    similar = lookup_embedding(features, features["gebruik_cache"])
+    if similar is not None:
+        ResultCache().put(features["key"], similar)
+        return Done((similar, BRON_INDEX))
+    return features
+
+
+def stats_stage(batch: List[dict]) -> List[dict]:
+    """Stats: feature statistieken voor de Gemini prompt, gebundeld over requests"""
+    stats = extract_tensor_stats_many([data["swin_features"].float() for data in batch])
+    return [{**data, "tensor_stats": s} for data, s in zip(batch, stats)]
+
+
+async def gemini_stage(pipeline_data: dict) -> Union[dict, Done]:
+    """Gemini: classificatie binnen de request deadline, anders lokale fallback"""
+    if ConfigRegistry().app_config.gemini_async:
+        gemini_call = classify_with_gemini_async(pipeline_data)
+    else:
+        gemini_call = WorkerPools().gemini.run(classify_with_gemini, pipeline_data)
+    try:
+        resultaat = await within_deadline(gemini_call, pipeline_data["deadline"])
+    except (ServiceNotAvailableError, asyncio.TimeoutError) as e:
+        return Done((fallback_or_raise(pipeline_data, e), BRON_FALLBACK))
+    return {**pipeline_data, "resultaat": resultaat}
+
+
+def validation_stage(pipeline_data: dict) -> Uitkomst:
+    """Validatie: check tegen de actuele afval types en onthoud het resultaat"""
+    afval_types = ConfigRegistry().current().afval_config.afval_types
+    resultaat = validate_gemini_response(pipeline_data["resultaat"], afval_types)
+    remember_result(pipeline_data["key"], pipeline_data, resultaat)
+    remember_embedding(pipeline_data, resultaat)
+    return resultaat, BRON_GEMINI
+
+
+@singleton
+class ClassificationStages(StagedPipeline):
+    """Gestagede classificatie: decode, inferentie, stats, gemini, validatie"""
+
+    def __init__(self, config: AppConfig = AppConfig()):
+        pools = WorkerPools()
+        queue_size = config.worker_queue_size
+        super().__init__(
+            [
+                Stage(
+                    "decode",
+                    decode_stage,
+                    workers=config.pipeline_decode_workers,
+                    queue_size=queue_size,
+                ),
+                Stage(
+                    "inferentie",
+                    inference_stage,
+                    queue_size=queue_size,
+                    executor=pools.inference,
+                ),
+                Stage(
+                    "stats",
+                    stats_stage,
+                    queue_size=queue_size,
+                    batch_size=config.pipeline_stats_batch_size,
+                    max_wait_ms=config.pipeline_stats_wait_ms,
+                ),
+                Stage(
+                    "gemini",
+                    gemini_stage,
+                    workers=(
+                        config.gemini_max_concurrency
+                        if config.gemini_async
+                        else config.gemini_workers
+                    ),
+                    queue_size=queue_size,
+                    blocking=False,
+                ),
+                Stage(
+                    "validatie",
+                    validation_stage,
+                    workers=config.pipeline_validation_workers,
+                    queue_size=queue_size,
+                ),
+            ],
+            name="classificatie",
+        )
+        Metrics().add_collector(self.collect_metrics)
 
 
 # ======================== PIPELINE UTILITIES ========================
 
 
-def create_custom_pipeline(*steps: PipelineFunc) -> PipelineFunc:
-    """Maak custom pipeline met eigen stappen"""
-    return compose(*steps)
+def create_custom_pipeline(*steps: Union[PipelineFunc, Stage]) -> StagedPipeline:
+    """
+    Maak custom pipeline met eigen stappen
+
+    Aanroepen voert de stappen na elkaar uit zoals `compose`; `await
+    pipeline.submit(data)` laat stappen van gelijktijdige requests overlappen.
+    Geef een Stage mee voor eigen werkers, wachtrij of batching.
+    """
+    return StagedPipeline(steps, name="custom")
 
 
-def add_pipeline_step(pipeline: PipelineFunc, step: PipelineFunc) -> PipelineFunc:
+def add_pipeline_step(
+    pipeline: PipelineFunc, step: Union[PipelineFunc, Stage]
+) -> PipelineFunc:
     """Voeg stap toe aan bestaande pipeline"""
-    return compose(pipeline, step)
+    if isinstance(pipeline, StagedPipeline):
+        return pipeline.then(step)
+    return compose(pipeline, Stage.of(step).func)
+
+
+# ======================== DEBUG & PROFILING ========================
+
+
+def _debug_step(start: float, **details) -> Dict[str, Any]:
+    """Duur en status van een debug stap, met details"""
+    duur = round(time.perf_counter() - start, 6)
+    return {"duration": duur, "status": "completed", **details}
+
+
+def _fases_ms(timings: Dict[str, float]) -> Dict[str, float]:
+    return {fase: round(duur * 1000, 3) for fase, duur in timings.items()}
+
+
+def extract_unbatched(afbeelding_bytes: bytes, steps: Dict[str, Any]) -> dict:
+    """
+    Decode en inferentie van één afbeelding, volledig in deze thread
+
+    Hetzelfde werk als LokaleService.extract_features, maar zonder micro-batch
+    scheduler, zodat een profiler in deze thread de forward pass ook ziet.
+    Duur en details per stap komen in `steps`.
+    """
+    lokale_service = ServiceFactory().create_lokale_service()
+
+    start = time.perf_counter()
+    afbeelding = lokale_service.prepare(afbeelding_bytes)
+    decode_fases = dict(afbeelding.timings)
+    steps["decode"] = _debug_step(
+        start,
+        perceptuele_hash=f"{afbeelding.perceptual_hash:016x}",
+        fases_ms=_fases_ms(decode_fases),
+    )
+
+    start = time.perf_counter()
+    features = lokale_service.extract_prepared(afbeelding, batched=False)
+    steps["inferentie"] = _debug_step(
+        start,
+        shape=list(features.shape),
+        dtype=str(features.dtype),
+        backend=lokale_service.backend.name,
+        fases_ms=_fases_ms(
+            {
+                fase: duur
+                for fase, duur in afbeelding.timings.items()
+                if fase not in decode_fases and fase != "forward_cpu"
+            }
+        ),
+    )
+    return {
+        "afbeelding_bytes": afbeelding_bytes,
+        "afbeelding": afbeelding,
+        "swin_features": features,
+    }
 
 
-# Voor debugging/monitoring
 @logged
-def debug_pipeline(afbeelding_bytes: bytes) -> Dict[str, Any]:
-    """Pipeline met debug informatie"""
+def debug_pipeline(
+    afbeelding_bytes: bytes, modus: Optional[str] = None, profiel: bool = False
+) -> Dict[str, Any]:
+    """
+    Pipeline met debug informatie (DebugResponse)
+
+    Stappen draaien na elkaar in deze thread, zonder caches en zonder
+    fallback; per stap duur, status en details. Met `profiel` worden decode
+    en inferentie opgenomen met cProfile en torch.profiler: de samenvatting
+    staat onder pipeline_steps["profiel"], de artifacts onder /profielen.
+
+    Raises:
+        ValidationError: Ongeldige input
+        ServiceNotAvailableError: Service problemen of al lopende opname
+    """
+    start = time.perf_counter()
+    modus = resolve_modus(modus)
+    validate_services(gemini_nodig=modus == MODUS_GEMINI)
+
+    steps: Dict[str, Any] = {}
+    if profiel:
+        profiler = Profiling()
+        features, samenvatting = profiler.capture(
+            profiler.store.new_id(), extract_unbatched, afbeelding_bytes, steps
+        )
+        steps["profiel"] = {**samenvatting, "status": "completed"}
+    else:
+        features = extract_unbatched(afbeelding_bytes, steps)
+
+    step_start = time.perf_counter()
+    if modus == MODUS_LOKAAL:
+        ruw = classify_locally(features)
+    else:
+        ruw = classify_with_gemini(features)
+    steps[modus] = _debug_step(step_start, resultaten=len(ruw))
+
+    step_start = time.perf_counter()
+    afval_types = ConfigRegistry().current().afval_config.afval_types
+    resultaat = validate_gemini_response(ruw, afval_types)
+    steps["validatie"] = _debug_step(
+        step_start, geldig=len(resultaat), afgewezen=len(ruw) - len(resultaat)
+    )
+
+    return {
+        "pipeline_steps": steps,
+        "classification": resultaat,
+        "processing_time": round(time.perf_counter() - start, 6),
+    }
+
+
+async def profile_request(afbeelding_bytes: bytes, profile_id: str) -> None:
+    """
+    Profiel van LokaleService.extract_features voor een beantwoorde request
+
+    Draait na de response (BackgroundTasks) in de inference pool, zonder
+    micro-batching, dus het antwoord zelf blijft op het gewone pad. Een
+    volle pool of lopende opname kost alleen dit profiel.
+    """
+    lokale_service = ServiceFactory().create_lokale_service()
     try:
-        validate_services()
-        step1_result = extract_swin_features(afbeelding_bytes)
-        step2_result = classify_with_gemini(step1_result)
-
-        return {
-            "success": True,
-            "swin_shape": str(step1_result["swin_features"].shape),
-            "classifications": step2_result,
-            "count": len(step2_result),
-        }
+        await WorkerPools().inference.run(
+            Profiling().capture,
+            profile_id,
+            lokale_service.extract_features,
+            afbeelding_bytes,
+            batched=False,
+        )
     except Exception as e:
-        return {"success": False, "error": str(e), "error_type": type(e).__name__}
+        logger.warning(f"Profiel {profile_id} niet opgenomen: {e}")
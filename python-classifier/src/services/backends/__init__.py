@@ -0,0 +1,12 @@
+"""Inference backends module exports"""
+
+from .backend_factory import create_backend
+from .base import InferenceBackend
+from .model_loader import build_torch_model, resolve_model_data_config
+
+__all__ = [
+    "InferenceBackend",
+    "build_torch_model",
+    "create_backend",
+    "resolve_model_data_config",
+]
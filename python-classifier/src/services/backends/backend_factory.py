@@ -0,0 +1,137 @@
+"""Inference Backend Factory"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import torch
+from torch import nn
+
+from ...config.app_config import AppConfig
+from ...exceptions.service_exceptions import ServiceNotAvailableError
+from .base import InferenceBackend
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("eager", "torchscript", "compile", "onnx")
+ARTIFACT_EXTENSIONS = {"torchscript": "pt", "onnx": "onnx"}
+MODELS_DIR = Path(__file__).parent.parent.parent.parent / "models"
+
+
+def artifact_settings(config: AppConfig) -> Dict[str, Any]:
+    """Instellingen die vastliggen in een geëxporteerd artifact"""
+    return {
+        "model_name": config.model_name,
+        "feature_mode": config.feature_mode,
+        "feature_layer": config.feature_layer,
+        "feature_dtype": config.feature_dtype,
+        "inference_precision": config.inference_precision,
+        "quantize_conv": config.quantize_conv,
+    }
+
+
+def artifact_path(config: AppConfig) -> Optional[Path]:
+    """
+    Pad naar vooraf geëxporteerd artifact
+
+    Geconfigureerd (MODEL_ARTIFACT_PATH) of models/<naam>-<mode>[-<laag>]-
+    <dtype>-<precisie>[-conv].<ext>, zodat elke combinatie een eigen bestand
+    heeft.
+    """
+    if config.model_artifact_path:
+        return Path(config.model_artifact_path)
+    extension = ARTIFACT_EXTENSIONS.get(config.inference_backend)
+    if extension is None:
+        return None
+    parts = [config.model_name, config.feature_mode]
+    if config.feature_mode == "embedding":
+        parts.append(config.feature_layer)
+    parts += [config.feature_dtype, config.inference_precision]
+    if config.inference_precision == "int8" and config.quantize_conv:
+        parts.append("conv")
+    return MODELS_DIR / f"{'-'.join(parts)}.{extension}"
+
+
+def settings_path(path: Path) -> Path:
+    """Sidecar met de export instellingen naast het artifact"""
+    return path.with_name(f"{path.name}.json")
+
+
+def write_artifact_settings(path: Path, config: AppConfig) -> None:
+    """Leg de instellingen vast waarmee het artifact geëxporteerd is"""
+    settings_path(path).write_text(json.dumps(artifact_settings(config), indent=2))
+
+
+def artifact_matches(path: Optional[Path], config: AppConfig) -> bool:
+    """Artifact bestaat en is met precies deze instellingen geëxporteerd"""
+    if path is None or not path.exists():
+        return False
+    try:
+        settings = json.loads(settings_path(path).read_text())
+    except (OSError, ValueError):
+        return False
+    return settings == artifact_settings(config)
+
+
+def needs_torch_model(config: AppConfig) -> bool:
+    """Of de backend het timm model in Python nodig heeft"""
+    if config.inference_backend in ("eager", "compile"):
+        return True
+    return config.inference_backend == "torchscript" and not artifact_matches(
+        artifact_path(config), config
+    )
+
+
+def _checked_artifact(config: AppConfig) -> Optional[Path]:
+    """Artifact pad als het bij de huidige instellingen hoort, anders None"""
+    path = artifact_path(config)
+    if artifact_matches(path, config):
+        return path
+    if path.exists():
+        logger.warning(
+            f"Artifact {path} hoort bij andere instellingen of mist "
+            f"{settings_path(path).name}; niet gebruikt"
+        )
+    return None
+
+
+def create_backend(
+    config: AppConfig,
+    model: Optional[nn.Module],
+    input_size: Tuple[int, ...],
+) -> InferenceBackend:
+    """Maak de in AppConfig gekozen inference backend"""
+    name = config.inference_backend
+
+    if name == "eager":
+        from .eager_backend import EagerBackend
+
+        return EagerBackend(model)
+    if name == "compile":
+        from .compile_backend import CompileBackend
+
+        return CompileBackend(model)
+    if name == "torchscript":
+        from .torchscript_backend import TorchScriptBackend
+
+        # Zonder passend artifact opnieuw tracen vanuit het Python model
+        path = _checked_artifact(config)
+        if path is None and model is None:
+            raise ServiceNotAvailableError(
+                f"Geen TorchScript artifact bij deze instellingen: "
+                f"{artifact_path(config)}"
+            )
+        return TorchScriptBackend(path, model, input_size, torch.device(config.device))
+    if name == "onnx":
+        from .onnx_backend import OnnxBackend
+
+        path = artifact_path(config)
+        if path.exists() and _checked_artifact(config) is None:
+            raise ServiceNotAvailableError(
+                f"ONNX artifact {path} is met andere instellingen geëxporteerd "
+                "(draai de export opnieuw)"
+            )
+        # Volg de (per worker gepinde) torch thread count
+        return OnnxBackend(path, torch.get_num_threads())
+    raise ValueError(f"Onbekende inference backend: {name} (kies uit {BACKENDS})")
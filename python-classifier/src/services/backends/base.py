@@ -0,0 +1,16 @@
+"""Inference Backend Interface"""
+
+from abc import ABC, abstractmethod
+
+import torch
+
+
+class InferenceBackend(ABC):
+    """Voert een forward pass uit op een genormaliseerde batch [N, 3, H, W]"""
+
+    name: str = "base"
+
+    @abstractmethod
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        """Forward pass, geeft output per sample in de batch"""
+        raise NotImplementedError
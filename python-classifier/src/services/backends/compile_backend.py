@@ -0,0 +1,20 @@
+"""torch.compile Backend"""
+
+import torch
+from torch import nn
+
+from ...context_managers.torch_context import torch_inference
+from .base import InferenceBackend
+
+
+class CompileBackend(InferenceBackend):
+    """Graph-geoptimaliseerde module via torch.compile (Inductor)"""
+
+    name = "compile"
+
+    def __init__(self, model: nn.Module):
+        self.model = torch.compile(model, dynamic=True)
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch_inference():
+            return self.model(batch)
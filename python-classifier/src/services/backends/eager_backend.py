@@ -0,0 +1,20 @@
+"""Eager PyTorch Backend"""
+
+import torch
+from torch import nn
+
+from ...context_managers.torch_context import torch_inference
+from .base import InferenceBackend
+
+
+class EagerBackend(InferenceBackend):
+    """Standaard PyTorch module, Python per forward"""
+
+    name = "eager"
+
+    def __init__(self, model: nn.Module):
+        self.model = model
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch_inference():
+            return self.model(batch)
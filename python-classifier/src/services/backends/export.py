@@ -0,0 +1,87 @@
+"""Ahead-of-time Model Export
+
+Gebruik:
+    python -m src.services.backends.export --format onnx
+    python -m src.services.backends.export --format torchscript --output models/x.pt
+
+Naast het artifact komt <artifact>.json met FEATURE_MODE, FEATURE_LAYER,
+FEATURE_DTYPE en INFERENCE_PRECISION; een backend gebruikt het artifact
+alleen als die overeenkomen met de huidige config.
+"""
+
+import argparse
+import dataclasses
+from pathlib import Path
+from typing import Optional, Tuple
+
+import torch
+from torch import nn
+
+from ...config.app_config import AppConfig
+from .backend_factory import artifact_path, write_artifact_settings
+from .model_loader import build_torch_model, resolve_model_data_config
+from .torchscript_backend import trace_model
+
+
+def export_onnx(model: nn.Module, input_size: Tuple[int, ...], output: Path) -> None:
+    """Exporteer naar ONNX met dynamische batch dimensie"""
+    example = torch.zeros(1, *input_size)
+    torch.onnx.export(
+        model,
+        (example,),
+        str(output),
+        input_names=["input"],
+        output_names=["output"],
+        dynamic_axes={"input": {0: "batch"}, "output": {0: "batch"}},
+        opset_version=17,
+        dynamo=False,
+    )
+
+
+def export_torchscript(
+    model: nn.Module, input_size: Tuple[int, ...], output: Path
+) -> None:
+    """Trace, freeze en sla TorchScript graph op"""
+    torch.jit.save(trace_model(model, input_size), str(output))
+
+
+def export_model(
+    config: AppConfig,
+    fmt: str,
+    output: Optional[Path] = None,
+    model: Optional[nn.Module] = None,
+) -> Path:
+    """Bouw het geconfigureerde model en schrijf het artifact weg"""
+    if fmt == "onnx" and config.inference_precision == "int8":
+        raise ValueError("INT8 dynamische quantization is niet exporteerbaar naar ONNX")
+
+    config = dataclasses.replace(config, inference_backend=fmt)
+    output = output or artifact_path(config)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    model = model if model is not None else build_torch_model(config)
+    input_size = tuple(resolve_model_data_config(config, model)["input_size"])
+
+    with torch.no_grad():
+        if fmt == "onnx":
+            export_onnx(model, input_size, output)
+        elif fmt == "torchscript":
+            export_torchscript(model, input_size, output)
+        else:
+            raise ValueError(f"Onbekend export formaat: {fmt}")
+    write_artifact_settings(output, config)
+    return output
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Exporteer ConvNeXt model artifact")
+    parser.add_argument("--format", choices=["onnx", "torchscript"], default="onnx")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    output = export_model(AppConfig(), args.format, args.output)
+    print(f"✅ Model geëxporteerd naar {output}")
+
+
+if __name__ == "__main__":
+    main()
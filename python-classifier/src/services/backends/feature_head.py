@@ -0,0 +1,65 @@
+"""Feature Output Head"""
+
+import torch
+from torch import nn
+
+FEATURE_MODES = ("logits", "embedding")
+FEATURE_DTYPES = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+}
+
+
+class FeatureExtractor(nn.Module):
+    """
+    Kies welke output het timm model teruggeeft
+
+    - logits: de 1000-klassen ImageNet head (oude gedrag)
+    - embedding + "pooled": gepoolde pre-head vector, zonder classifier
+    - embedding + "stageN": global average pool na stage N, latere stages
+      worden niet berekend
+    """
+
+    def __init__(
+        self,
+        model: nn.Module,
+        mode: str = "logits",
+        layer: str = "pooled",
+        dtype: str = "float32",
+    ):
+        super().__init__()
+        if mode not in FEATURE_MODES:
+            raise ValueError(f"Onbekende feature mode: {mode} (kies uit {FEATURE_MODES})")
+        if dtype not in FEATURE_DTYPES:
+            raise ValueError(f"Onbekend feature dtype: {dtype}")
+
+        self.model = model
+        self.mode = mode
+        self.layer = layer
+        self.stage = self._parse_stage(layer) if mode == "embedding" else None
+        self.dtype = FEATURE_DTYPES[dtype]
+        self.pretrained_cfg = getattr(model, "pretrained_cfg", {})
+
+    @staticmethod
+    def _parse_stage(layer: str):
+        """'pooled' -> None, 'stage2' -> 2"""
+        if layer == "pooled":
+            return None
+        if layer.startswith("stage") and layer[5:].isdigit():
+            return int(layer[5:])
+        raise ValueError(f"Onbekende feature layer: {layer} (gebruik 'pooled' of 'stageN')")
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        if self.mode == "logits":
+            output = self.model(x)
+        elif self.stage is None:
+            output = self.model.forward_head(
+                self.model.forward_features(x), pre_logits=True
+            )
+        else:
+            (feature_map,) = self.model.forward_intermediates(
+                x, indices=[self.stage], intermediates_only=True, stop_early=True
+            )
+            output = feature_map.mean(dim=(2, 3))
+        return output.to(self.dtype)
@@ -0,0 +1,45 @@
+"""Torch Model Loader"""
+
+from typing import Any, Dict
+
+import torch
+from torch import nn
+
+from ...config.app_config import AppConfig
+
+
+def build_torch_model(config: AppConfig, pretrained: bool = True) -> nn.Module:
+    """Bouw timm model met gekozen feature output, optioneel INT8 gekwantiseerd"""
+    import timm
+
+    from .feature_head import FeatureExtractor
+
+    device = torch.device(config.device)
+    model = timm.create_model(config.model_name, pretrained=pretrained)
+    model = FeatureExtractor(
+        model, config.feature_mode, config.feature_layer, config.feature_dtype
+    )
+    model = model.to(device).eval()
+
+    if config.inference_precision == "int8":
+        if device.type != "cpu":
+            print(f"INT8 quantization niet ondersteund op {device}, fp32 gebruikt")
+            return model
+        from ..quantization import quantize_int8
+
+        print("ConvNeXt model kwantiseren naar INT8")
+        model = quantize_int8(model, include_conv=config.quantize_conv)
+    return model
+
+
+def resolve_model_data_config(config: AppConfig, model: nn.Module = None) -> Dict[str, Any]:
+    """Preprocessing config uit model of (zonder model) uit timm pretrained cfg"""
+    from timm.data import resolve_data_config
+    from timm.models import get_pretrained_cfg
+
+    if model is not None:
+        return resolve_data_config({}, model=model)
+    pretrained_cfg = get_pretrained_cfg(config.model_name)
+    if pretrained_cfg is None:
+        raise ValueError(f"Onbekend model: {config.model_name}")
+    return resolve_data_config({}, pretrained_cfg=pretrained_cfg.to_dict())
@@ -0,0 +1,41 @@
+"""ONNX Runtime Backend"""
+
+from pathlib import Path
+
+import numpy as np
+import torch
+
+from ...exceptions.service_exceptions import ServiceNotAvailableError
+from .base import InferenceBackend
+
+
+class OnnxBackend(InferenceBackend):
+    """ONNX Runtime CPU sessie met volledige graph optimalisatie"""
+
+    name = "onnx"
+
+    def __init__(self, artifact_path: Path, intra_op_threads: int = 0):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ServiceNotAvailableError("onnxruntime niet geïnstalleerd") from e
+
+        if not artifact_path.exists():
+            raise ServiceNotAvailableError(
+                f"ONNX artifact niet gevonden: {artifact_path} (draai eerst de export)"
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+
+        self.session = ort.InferenceSession(
+            str(artifact_path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        inputs = {self.input_name: batch.detach().cpu().numpy().astype(np.float32)}
+        output = self.session.run(None, inputs)[0]
+        return torch.from_numpy(output)
@@ -0,0 +1,44 @@
+"""TorchScript Backend"""
+
+from pathlib import Path
+from typing import Optional, Tuple
+
+import torch
+from torch import nn
+
+from ...context_managers.torch_context import torch_inference
+from .base import InferenceBackend
+
+
+def trace_model(model: nn.Module, input_size: Tuple[int, ...]) -> torch.jit.ScriptModule:
+    """Trace en freeze module (gewichten als constanten, serialiseerbaar)"""
+    example = torch.zeros(1, *input_size)
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+    return torch.jit.freeze(traced.eval())
+
+
+class TorchScriptBackend(InferenceBackend):
+    """Bevroren TorchScript graph, uit artifact of eenmalig getraced bij laden"""
+
+    name = "torchscript"
+
+    def __init__(
+        self,
+        artifact_path: Optional[Path] = None,
+        model: Optional[nn.Module] = None,
+        input_size: Tuple[int, ...] = (3, 384, 384),
+        device: torch.device = torch.device("cpu"),
+    ):
+        if artifact_path is not None and artifact_path.exists():
+            frozen = torch.jit.load(str(artifact_path), map_location=device).eval()
+        elif model is not None:
+            frozen = trace_model(model, input_size)
+        else:
+            raise FileNotFoundError(f"TorchScript artifact niet gevonden: {artifact_path}")
+        # Operator fusie is device-specifiek en niet serialiseerbaar: pas na laden
+        self.model = torch.jit.optimize_for_inference(frozen)
+
+    def __call__(self, batch: torch.Tensor) -> torch.Tensor:
+        with torch_inference():
+            return self.model(batch)
@@ -0,0 +1,303 @@
+"""Dynamic Micro-Batching Scheduler"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from ..monitoring.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+BatchFunc = Callable[[List[T]], Sequence[R]]
+AsyncBatchFunc = Callable[[List[T]], Awaitable[Sequence[R]]]
+
+
+class BatchScheduler(Generic[T, R]):
+    """
+    Verzamel gelijktijdige requests tot één batch
+
+    Callers roepen `submit` aan vanuit hun eigen thread. Een achtergrond
+    thread wacht maximaal `max_wait_ms` op extra requests (of tot
+    `max_batch_size` bereikt is), voert `process_batch` één keer uit en geeft
+    elke caller zijn eigen element van de output terug.
+
+    Met `max_in_flight` > 1 verwerkt de achtergrond thread batches niet zelf
+    maar geeft ze door aan zoveel eigen threads; terwijl een batch op I/O
+    wacht (Gemini) wordt de volgende al verzameld en verstuurd. Zijn alle
+    plekken bezet, dan groeit de volgende batch tot er één vrijkomt.
+    """
+
+    def __init__(
+        self,
+        process_batch: BatchFunc,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        name: str = "batch",
+        max_in_flight: int = 1,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[T, Future]]" = queue.Queue()
+        self._worker = None
+        self._pid = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._local = threading.local()
+        self._in_flight = 0
+
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._batch_size = Metrics().batch_size.labels(name)
+
+    def submit(self, item: T) -> R:
+        """Voeg item toe aan de volgende batch en wacht op het resultaat"""
+        if self.max_batch_size == 1:
+            result = self.process_batch([item])[0]
+            self._record(1)
+            return result
+
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching statistieken voor monitoring"""
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "gemiddelde_batch": (
+                    round(self._items / self._batches, 2) if self._batches else 0.0
+                ),
+                "grootste_batch": self._largest_batch,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_in_flight": self.max_in_flight,
+                "batches_in_flight": self._in_flight,
+            }
+
+    def in_worker(self) -> bool:
+        """Draait de aanroeper op een scheduler thread (niet inline in submit)"""
+        return getattr(self._local, "active", False)
+
+    def _ensure_worker(self) -> None:
+        """Start worker thread (opnieuw na fork, threads overleven fork niet)"""
+        pid = os.getpid()
+        if self._worker is not None and self._pid == pid:
+            return
+        with self._lock:
+            if self._worker is None or self._pid != pid:
+                self._queue = queue.Queue()
+                self._pid = pid
+                self._slots = threading.BoundedSemaphore(self.max_in_flight)
+                self._in_flight = 0
+                self._executor = (
+                    ThreadPoolExecutor(
+                        max_workers=self.max_in_flight,
+                        thread_name_prefix=f"{self.name}-batch",
+                    )
+                    if self.max_in_flight > 1
+                    else None
+                )
+                self._worker = threading.Thread(
+                    target=self._run, name=f"{self.name}-scheduler", daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[T, Future]]:
+        """Wacht op eerste item en vul batch tot limiet of deadline"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        """Worker loop: verzamel batches en verwerk ze zelf of in de batch threads"""
+        while True:
+            if self._executor is None:
+                self._process(self._collect())
+                continue
+            # Pas verzamelen als er een plek vrij is, anders groeit de batch
+            self._slots.acquire()
+            batch = self._collect()
+            with self._lock:
+                self._in_flight += 1
+            self._executor.submit(self._process, batch, True)
+
+    def _process(self, batch: List[Tuple[T, Future]], release: bool = False) -> None:
+        """Verwerk één batch en verdeel resultaten over de wachtende callers"""
+        items = [item for item, _ in batch]
+        self._local.active = True
+        try:
+            results = self.process_batch(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Batch gaf {len(results)} resultaten voor {len(items)} items"
+                )
+        except Exception as e:
+            logger.error(f"Batch fout in {self.name}: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self._local.active = False
+            if release:
+                with self._lock:
+                    self._in_flight -= 1
+                self._slots.release()
+
+        self._record(len(items))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _record(self, size: int) -> None:
+        """Registreer verwerkte batch"""
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._largest_batch = max(self._largest_batch, size)
+        self._batch_size.observe(size)
+
+
+class AsyncBatchScheduler(Generic[T, R]):
+    """
+    Event loop tegenhanger van BatchScheduler voor async batch functies
+
+    Callers awaiten `submit`; de eerste request in een lege batch start een
+    timer van `max_wait_ms`. Bij een volle batch of afgelopen timer draait
+    `process_batch` als task op dezelfde loop, zonder extra threads. De
+    wachtrij hoort bij de loop waarop hij gevuld werd.
+    """
+
+    def __init__(
+        self,
+        process_batch: AsyncBatchFunc,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 5.0,
+        name: str = "batch",
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._batch_size = Metrics().batch_size.labels(name)
+
+    async def submit(self, item: T) -> R:
+        """Voeg item toe aan de volgende batch en wacht op het resultaat"""
+        if self.max_batch_size == 1:
+            result = (await self.process_batch([item]))[0]
+            self._record(1)
+            return result
+
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._pending, self._timer = loop, [], None
+
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching statistieken voor monitoring"""
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "items": self._items,
+                "gemiddelde_batch": (
+                    round(self._items / self._batches, 2) if self._batches else 0.0
+                ),
+                "grootste_batch": self._largest_batch,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+    def _flush(self) -> None:
+        """Start verwerking van de huidige batch als task"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = self._loop.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[T, asyncio.Future]]) -> None:
+        """Verwerk één batch en verdeel resultaten over de wachtende callers"""
+        items = [item for item, _ in batch]
+        try:
+            results = await self.process_batch(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Batch gaf {len(results)} resultaten voor {len(items)} items"
+                )
+        except Exception as e:
+            logger.error(f"Batch fout in {self.name}: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self._record(len(items))
+        for (_, future), result in zip(batch, results):
+            # Een caller kan intussen geannuleerd zijn (timeout)
+            if not future.done():
+                future.set_result(result)
+
+    def _record(self, size: int) -> None:
+        """Registreer verwerkte batch"""
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            self._largest_batch = max(self._largest_batch, size)
+        self._batch_size.observe(size)
@@ -0,0 +1,142 @@
+"""Circuit Breaker voor externe calls"""
+
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict
+
+from ..exceptions.service_exceptions import ServiceNotAvailableError
+
+logger = logging.getLogger(__name__)
+
+DICHT = "dicht"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+@dataclass(frozen=True)
+class CallToken:
+    """Toelating van `before_call`: proefcall of gewone call, en in welke generatie"""
+
+    probe: bool
+    generation: int
+
+
+class CircuitBreaker:
+    """
+    Stop calls naar een haperende dienst en probeer later voorzichtig opnieuw
+
+    Houdt de uitkomst van de laatste `window` calls bij; een call telt als
+    slecht bij een fout of als hij langer duurde dan `slow_call_seconds`.
+    Vanaf `min_calls` calls en een aandeel slecht van minstens
+    `failure_rate` gaat de breaker open en worden calls direct geweigerd.
+    Na `open_seconds` mag één proefcall door (half open); slaagt die dan
+    sluit de breaker weer, anders blijft hij nog een periode open.
+
+    Elke toestandswissel begint een nieuwe generatie; uitkomsten van calls
+    die in een eerdere generatie werden toegelaten (bijv. een trage call van
+    vóór het openen) worden genegeerd, zodat alleen de proefcall beslist.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        window: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.window = max(1, window)
+        self.min_calls = max(1, min(min_calls, self.window))
+        self.open_seconds = open_seconds
+
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=self.window)
+        self._state = DICHT
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._generation = 0
+
+        self._rejected = 0
+        self._stale = 0
+        self._times_opened = 0
+
+    def before_call(self) -> CallToken:
+        """Reserveer een call; ServiceNotAvailableError als de breaker open is"""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self._rejected += 1
+                    raise ServiceNotAvailableError(f"{self.name} circuit open")
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    self._rejected += 1
+                    raise ServiceNotAvailableError(f"{self.name} circuit half open")
+                self._probe_in_flight = True
+                return CallToken(probe=True, generation=self._generation)
+            return CallToken(probe=False, generation=self._generation)
+
+    def record(self, token: CallToken, success: bool, duration: float) -> None:
+        """Registreer uitkomst van een call die door `before_call` kwam"""
+        slecht = not success or duration > self.slow_call_seconds
+        with self._lock:
+            if token.generation != self._generation:
+                self._stale += 1
+                return
+
+            if token.probe:
+                self._probe_in_flight = False
+                if slecht:
+                    self._open()
+                else:
+                    logger.info(f"{self.name} circuit weer dicht")
+                    self._state = DICHT
+                    self._generation += 1
+                    self._outcomes.clear()
+                return
+
+            self._outcomes.append(slecht)
+            if (
+                self._state == DICHT
+                and len(self._outcomes) >= self.min_calls
+                and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate
+            ):
+                self._open()
+
+    def _open(self) -> None:
+        """Open de breaker (lock wordt door de caller vastgehouden)"""
+        logger.warning(f"{self.name} circuit open voor {self.open_seconds}s")
+        self._state = OPEN
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self._times_opened += 1
+        self._outcomes.clear()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def stats(self) -> Dict[str, Any]:
+        """Toestand van de breaker voor /status"""
+        with self._lock:
+            slecht = sum(self._outcomes)
+            return {
+                "toestand": self._state,
+                "foutpercentage": (
+                    round(slecht / len(self._outcomes), 4) if self._outcomes else 0.0
+                ),
+                "venster": len(self._outcomes),
+                "geweigerd": self._rejected,
+                "keren_geopend": self._times_opened,
+                "verouderd_genegeerd": self._stale,
+            }
@@ -0,0 +1,164 @@
+"""Async Gemini REST Client"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from ...exceptions.service_exceptions import ServiceNotAvailableError
+from ...monitoring.metrics import Metrics
+
+
+class AsyncGeminiClient:
+    """
+    Gemini generateContent over één gedeelde, gepoolde HTTP/1.1 sessie
+
+    Een semaphore begrenst het aantal gelijktijdige calls; wachten op een
+    plek en de call zelf vallen samen onder `timeout_seconds`. Honderden
+    calls kunnen tegelijk openstaan op één event loop zonder extra threads.
+    De sessie hoort bij de event loop waarop hij gemaakt is en wordt na
+    fork of bij een nieuwe loop opnieuw opgebouwd.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        base_url: str = "https://generativelanguage.googleapis.com",
+        max_concurrency: int = 256,
+        timeout_seconds: float = 30.0,
+    ):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout_seconds
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self._in_flight = 0
+        self._calls = 0
+        self._timeouts = 0
+        self._errors = 0
+
+    def _session(self):
+        """HTTP sessie en semaphore voor de huidige event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._loop is not loop:
+                self._loop = loop
+                self._client = httpx.AsyncClient(
+                    base_url=self.base_url,
+                    headers={"x-goog-api-key": self.api_key},
+                    timeout=httpx.Timeout(self.timeout, connect=min(5.0, self.timeout)),
+                    limits=httpx.Limits(
+                        max_connections=self.max_concurrency,
+                        max_keepalive_connections=self.max_concurrency,
+                    ),
+                )
+                self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            return self._client, self._semaphore
+
+    async def generate(self, prompt: str) -> str:
+        """Stuur één prompt en geef de tekst van de eerste kandidaat terug"""
+        client, semaphore = self._session()
+        try:
+            return await asyncio.wait_for(
+                self._call(client, semaphore, prompt), timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            self._count("_timeouts")
+            raise ServiceNotAvailableError(f"Gemini timeout na {self.timeout}s")
+
+    async def connect(self) -> None:
+        """Open alvast een pooled verbinding (TLS) met een lichte model lookup"""
+        client, _ = self._session()
+        try:
+            response = await asyncio.wait_for(
+                client.get(f"/v1beta/models/{self.model}"), timeout=self.timeout
+            )
+            response.raise_for_status()
+        except asyncio.TimeoutError:
+            raise ServiceNotAvailableError(f"Gemini timeout na {self.timeout}s")
+        except httpx.HTTPStatusError as e:
+            raise ServiceNotAvailableError(
+                f"Gemini HTTP {e.response.status_code}"
+            ) from e
+        except httpx.HTTPError as e:
+            raise ServiceNotAvailableError(f"Gemini verbinding mislukt: {e}") from e
+
+    async def _call(
+        self, client: httpx.AsyncClient, semaphore: asyncio.Semaphore, prompt: str
+    ) -> str:
+        async with semaphore:
+            self._count("_in_flight")
+            # Alleen de call zelf; wachten op de semaphore valt er buiten
+            start, uitkomst = time.perf_counter(), "fout"
+            try:
+                response = await client.post(
+                    f"/v1beta/models/{self.model}:generateContent",
+                    json={"contents": [{"role": "user", "parts": [{"text": prompt}]}]},
+                )
+                response.raise_for_status()
+                text = self._extract_text(response.json())
+                uitkomst = "ok"
+                return text
+            except ServiceNotAvailableError:
+                self._count("_errors")
+                raise
+            except httpx.TimeoutException:
+                raise asyncio.TimeoutError()
+            except httpx.HTTPStatusError as e:
+                self._count("_errors")
+                raise ServiceNotAvailableError(
+                    f"Gemini HTTP {e.response.status_code}"
+                ) from e
+            except httpx.HTTPError as e:
+                self._count("_errors")
+                raise ServiceNotAvailableError(f"Gemini verbinding mislukt: {e}") from e
+            except ValueError as e:
+                self._count("_errors")
+                raise ServiceNotAvailableError("Gemini response is geen JSON") from e
+            finally:
+                Metrics().gemini_call_seconds.labels("rest", uitkomst).observe(
+                    time.perf_counter() - start
+                )
+                self._count("_in_flight", -1)
+                self._count("_calls")
+
+    @staticmethod
+    def _extract_text(payload: Dict[str, Any]) -> str:
+        """Tekst uit de eerste kandidaat van een generateContent response"""
+        try:
+            parts = payload["candidates"][0]["content"]["parts"]
+            return "".join(part.get("text", "") for part in parts)
+        except (KeyError, IndexError, TypeError):
+            raise ServiceNotAvailableError("Gemini gaf geen bruikbaar antwoord")
+
+    def _count(self, name: str, delta: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + delta)
+
+    async def aclose(self) -> None:
+        """Sluit de sessie als die bij de huidige loop hoort"""
+        with self._lock:
+            client, loop = self._client, self._loop
+            self._client, self._loop, self._semaphore = None, None, None
+        if client is not None and loop is asyncio.get_running_loop():
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Client statistieken voor /status"""
+        with self._lock:
+            return {
+                "max_gelijktijdig": self.max_concurrency,
+                "actief": self._in_flight,
+                "calls": self._calls,
+                "timeouts": self._timeouts,
+                "fouten": self._errors,
+            }
@@ -1,13 +1,25 @@
 """Gemini Service Implementation"""
 
+import asyncio
 import json
-from typing import Any, Dict, List
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
+from ...cache.prompt_cache import PromptCache, prompt_key, quantize_stats
 from ...config.afval_config import AfvalConfig
 from ...config.app_config import AppConfig
+from ...config.config_registry import ConfigRegistry, ConfigSnapshot
 from ...decorators.logging_decorator import logged
 from ...decorators.singleton_decorator import singleton
 from ...exceptions.service_exceptions import ServiceNotAvailableError
+from ...monitoring.metrics import Metrics
+from ..batch_scheduler import AsyncBatchScheduler, BatchScheduler
+from ..circuit_breaker import CircuitBreaker
+from .gemini_client import AsyncGeminiClient
+
+logger = logging.getLogger(__name__)
 
 
 @singleton
@@ -18,51 +30,311 @@ class GeminiService:
         self, app_config: AppConfig = AppConfig(), afval_config: AfvalConfig = None
     ):
         self.app_config = app_config
-        self.config = afval_config or AfvalConfig.from_yaml()
+        # Vaste config als die expliciet is meegegeven, anders live uit de registry
+        self._fixed_config = (
+            ConfigSnapshot.build(afval_config, app_config.gemini_model)
+            if afval_config is not None
+            else None
+        )
         self.model = None
+        self.async_client = None
         self._initialized = False
+        self._init_lock = threading.Lock()
+        self.prompt_cache = PromptCache()
+
+        # Gebundelde prompts: één Gemini call voor meerdere afbeeldingen; net
+        # als de Gemini pool zoveel calls tegelijk als er GEMINI_WORKERS zijn
+        batch_size = max(1, self.app_config.gemini_batch_size)
+        wait_ms = self.app_config.gemini_batch_wait_ms
+        self.batcher = BatchScheduler(
+            self._generate_batch,
+            batch_size,
+            wait_ms,
+            name="gemini",
+            max_in_flight=self.app_config.gemini_workers,
+        )
+        self.async_batcher = AsyncBatchScheduler(
+            self._generate_batch_async, batch_size, wait_ms, name="gemini-async"
+        )
+
+        # Circuit breaker rond de echte Gemini calls (cache hits tellen niet mee)
+        self.breaker = CircuitBreaker(
+            "Gemini",
+            failure_rate=self.app_config.circuit_failure_rate,
+            slow_call_seconds=self.app_config.circuit_slow_call_seconds,
+            window=self.app_config.circuit_window,
+            min_calls=self.app_config.circuit_min_calls,
+            open_seconds=self.app_config.circuit_open_seconds,
+        )
+        self.hedged_calls = 0
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        """Config met voorgerenderde prompts en vingerafdruk"""
+        return self._fixed_config or ConfigRegistry().current()
+
+    @property
+    def config(self) -> AfvalConfig:
+        return self.snapshot.afval_config
+
+    @property
+    def fingerprint(self) -> str:
+        return self.snapshot.fingerprint
 
     def _lazy_init(self):
         """Lazy initialization - alleen bij eerste gebruik"""
-        if not self._initialized:
-            if not self.app_config.gemini_api_key:
-                raise ServiceNotAvailableError("GEMINI_API_KEY niet gevonden")
+        with self._init_lock:
+            if not self._initialized:
+                if not self.app_config.gemini_api_key:
+                    raise ServiceNotAvailableError("GEMINI_API_KEY niet gevonden")
 
-            # Import only when needed
-            import google.generativeai as genai
-            
-            genai.configure(api_key=self.app_config.gemini_api_key)
-            self.model = genai.GenerativeModel("gemini-1.5-flash")
-            self._initialized = True
+                # Import only when needed
+                import google.generativeai as genai
 
-    @logged
-    def classify(self, features) -> List[Dict[str, Any]]:
-        """Classificeer features via Gemini - super compact"""
-        self._lazy_init()  # Initialiseer alleen bij eerste gebruik
-        
+                genai.configure(api_key=self.app_config.gemini_api_key)
+                self.model = genai.GenerativeModel(self.app_config.gemini_model)
+                self._initialized = True
+
+    def _prompt_key(
+        self, features, tensor_stats: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Afgeronde feature stats en de prompt cache sleutel die ze bepalen"""
         # Import tensor processing only when needed
-        from ...features.tensor_processing import (
-            extract_tensor_stats,
-            format_feature_description,
+        from ...features.tensor_processing import extract_tensor_stats
+
+        if tensor_stats is None:
+            tensor_stats = extract_tensor_stats(features.float())
+        stats = quantize_stats(tensor_stats, self.prompt_cache.precision)
+        return prompt_key(stats, self.fingerprint), stats
+
+    def _render_prompt(self, stats: Dict[str, Any]) -> str:
+        """Vul de prompt template met afval types en feature beschrijving"""
+        from ...features.tensor_processing import format_feature_description
+
+        return self.snapshot.render_prompt(format_feature_description(stats))
+
+    def _render_batch_prompt(self, stats_list: List[Dict[str, Any]]) -> str:
+        """Eén prompt met een genummerde feature sectie per afbeelding"""
+        from ...features.tensor_processing import format_feature_summary
+
+        secties = "\n\n".join(
+            f"AFBEELDING {i}:\n{format_feature_summary(stats)}"
+            for i, stats in enumerate(stats_list, start=1)
         )
+        return self.snapshot.render_batch_prompt(len(stats_list), secties)
+
+    def _parse(self, text: str) -> List[Dict[str, Any]]:
+        """Parse en valideer Gemini JSON antwoord; onleesbaar telt als mislukte call"""
         from ...features.response_validation import validate_gemini_response
-        
-        # Feature stats naar prompt
-        stats = extract_tensor_stats(features)
-        feature_text = format_feature_description(stats)
-
-        # Maak prompt
-        prompt = self.config.prompt_template.format(
-            afval_types=", ".join(self.config.afval_types),
-            lokaal_resultaat=feature_text,
+
+        try:
+            result = json.loads(text.strip())
+        except (AttributeError, ValueError) as e:
+            raise ServiceNotAvailableError("Gemini antwoord is geen geldige JSON") from e
+        if not isinstance(result, list) or not all(isinstance(x, dict) for x in result):
+            raise ServiceNotAvailableError("Gemini antwoord is geen lijst classificaties")
+        return validate_gemini_response(result, self.config.afval_types)
+
+    def _split(self, text: str, count: int) -> List[Any]:
+        """Parse gebundeld antwoord; None voor afbeeldingen zonder bruikbaar deel"""
+        from ...features.response_validation import split_batch_response
+
+        try:
+            result = json.loads(text.strip())
+        except ValueError:
+            logger.warning("Gebundeld Gemini antwoord is geen JSON, los herhalen")
+            return [None] * count
+        return split_batch_response(result, count, self.config.afval_types)
+
+    def _generate_batch(
+        self, stats_list: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Batch functie voor de scheduler: één call, gesplitst per afbeelding"""
+        if len(stats_list) == 1:
+            return [self._parse(self._generate(self._render_prompt(stats_list[0])))]
+
+        parts = self._split(
+            self._generate(self._render_batch_prompt(stats_list)), len(stats_list)
         )
+        # Ontbrekende secties los opvragen in plaats van een leeg resultaat
+        return [
+            part
+            if part is not None
+            else self._parse(self._generate(self._render_prompt(stats)))
+            for part, stats in zip(parts, stats_list)
+        ]
 
-        # Gemini call & parse
-        response = self.model.generate_content([prompt])
-        result = json.loads(response.text.strip())
+    async def _generate_batch_async(
+        self, stats_list: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        """Async batch functie: één REST call, gesplitst per afbeelding"""
+        client = self._get_async_client()
 
-        # Valideer & return
-        return validate_gemini_response(result, self.config.afval_types)
+        async def single(stats):
+            return self._parse(await client.generate(self._render_prompt(stats)))
+
+        if len(stats_list) == 1:
+            return [await single(stats_list[0])]
+
+        text = await client.generate(self._render_batch_prompt(stats_list))
+        parts = self._split(text, len(stats_list))
+
+        missing = [i for i, part in enumerate(parts) if part is None]
+        herhaald = await asyncio.gather(*(single(stats_list[i]) for i in missing))
+        for i, part in zip(missing, herhaald):
+            parts[i] = part
+        return parts
+
+    def _generate(self, prompt: str) -> str:
+        """Blocking Gemini SDK call; SDK fouten worden ServiceNotAvailableError"""
+        start, uitkomst = time.perf_counter(), "fout"
+        try:
+            text = self.model.generate_content([prompt]).text
+            uitkomst = "ok"
+            return text
+        except ServiceNotAvailableError:
+            raise
+        except Exception as e:
+            # google-generativeai heeft geen gedeelde basis klasse voor API fouten
+            raise ServiceNotAvailableError(
+                f"Gemini call mislukt: {type(e).__name__}: {e}"
+            ) from e
+        finally:
+            Metrics().gemini_call_seconds.labels("sdk", uitkomst).observe(
+                time.perf_counter() - start
+            )
+
+    @logged
+    def classify(
+        self, features, tensor_stats: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Classificeer features via Gemini (tensor_stats: vooraf berekende stats)"""
+        self._lazy_init()  # Initialiseer alleen bij eerste gebruik
+
+        # Feature stats naar prompt; afgeronde stats bepalen prompt én cache sleutel
+        key, stats = self._prompt_key(features, tensor_stats)
+        cached = self.prompt_cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Gemini call (eventueel gebundeld met andere uploads), parse & valideer
+        token = self.breaker.before_call()
+        start = time.perf_counter()
+        try:
+            classificaties = self.batcher.submit(stats)
+        except BaseException:
+            self.breaker.record(token, False, time.perf_counter() - start)
+            raise
+        duur = time.perf_counter() - start
+        self.breaker.record(token, True, duur)
+
+        self.prompt_cache.put(key, classificaties, duur)
+        return classificaties
+
+    @logged
+    async def classify_async(
+        self, features, tensor_stats: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Classificeer via de async REST client, zonder thread per call"""
+        self._get_async_client()
+
+        key, stats = self._prompt_key(features, tensor_stats)
+        cached = self.prompt_cache.get(key)
+        if cached is not None:
+            return cached
+
+        token = self.breaker.before_call()
+        start = time.perf_counter()
+        try:
+            classificaties = await self._hedged(stats)
+        except BaseException:
+            # Ook annulering door de request deadline telt als mislukte call
+            self.breaker.record(token, False, time.perf_counter() - start)
+            raise
+        duur = time.perf_counter() - start
+        self.breaker.record(token, True, duur)
+
+        self.prompt_cache.put(key, classificaties, duur)
+        return classificaties
+
+    async def _hedged(self, stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Gemini call met optionele hedge
+
+        Is de eerste call na `gemini_hedge_after_seconds` niet klaar, dan
+        gaat een tweede identieke call de deur uit; het eerste geslaagde
+        antwoord wint en de andere call wordt geannuleerd.
+        """
+        hedge_after = self.app_config.gemini_hedge_after_seconds
+        if hedge_after <= 0:
+            return await self.async_batcher.submit(stats)
+
+        tasks = [asyncio.ensure_future(self.async_batcher.submit(stats))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self.hedged_calls += 1
+                tasks.append(asyncio.ensure_future(self.async_batcher.submit(stats)))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # Alle calls mislukt: eerste fout doorgeven
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _get_async_client(self) -> AsyncGeminiClient:
+        """Gedeelde async client, gemaakt bij eerste gebruik"""
+        with self._init_lock:
+            if self.async_client is None:
+                if not self.app_config.gemini_api_key:
+                    raise ServiceNotAvailableError("GEMINI_API_KEY niet gevonden")
+                self.async_client = AsyncGeminiClient(
+                    api_key=self.app_config.gemini_api_key,
+                    model=self.app_config.gemini_model,
+                    base_url=self.app_config.gemini_base_url,
+                    max_concurrency=self.app_config.gemini_max_concurrency,
+                    timeout_seconds=self.app_config.gemini_timeout_seconds,
+                )
+            return self.async_client
+
+    def batch_stats(self) -> Dict[str, Any]:
+        """Bundeling statistieken voor /status"""
+        return {
+            "blocking": self.batcher.stats(),
+            "async": self.async_batcher.stats(),
+        }
+
+    def circuit_stats(self) -> Dict[str, Any]:
+        """Circuit breaker en hedge statistieken voor /status"""
+        return {**self.breaker.stats(), "hedged_calls": self.hedged_calls}
+
+    async def aclose(self) -> None:
+        """Sluit de async HTTP sessie (bij afsluiten van de worker)"""
+        if self.async_client is not None:
+            await self.async_client.aclose()
+
+    def warmup(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        Initialiseer de Gemini client die requests gebruiken vooraf
+
+        Met GEMINI_ASYNC is dat de async REST client; zijn sessie hoort bij
+        de event loop van de worker, dus de verbinding wordt via `loop`
+        geopend (zonder loop alleen de client zelf). Anders de SDK.
+        """
+        if not self.app_config.gemini_async:
+            self._lazy_init()
+            return
+        client = self._get_async_client()
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(client.connect(), loop).result()
 
     def is_ready(self) -> bool:
         """Quick check zonder API connectie te maken"""
@@ -1,60 +1,245 @@
 """Lokale Service Implementation"""
 
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
 import torch
+from ...config.afval_config import AfvalConfig
 from ...config.app_config import AppConfig
+from ...config.config_registry import ConfigRegistry
 from ...decorators.logging_decorator import logged
 from ...decorators.singleton_decorator import singleton
-from ...decorators.validation_decorator import validate_image
+from ...exceptions.service_exceptions import ServiceNotAvailableError
+from ...features.category_mapping import CategoryMapping
+from ...features.prepared_image import PreparedImage
+from ...monitoring.metrics import Metrics
+from ..batch_scheduler import BatchScheduler
 
 
 @singleton
 class LokaleService:
     """ConvNeXt Base service voor afbeelding feature extractie"""
 
-    def __init__(self, config: AppConfig = AppConfig()):
+    def __init__(
+        self, config: AppConfig = AppConfig(), afval_config: AfvalConfig = None
+    ):
         self.config = config
+        self.afval_config = afval_config
+        self.category_mapping: Optional[CategoryMapping] = None
+        self._mapping_versie: Optional[int] = None
         self.device = torch.device(config.device)
         self.model = None
         self.transform = None
+        self.backend = None
+        self.scheduler = None
+        self.input_size = None
+        self.decode_min_side = None
+        self.preprocessor = None
+        self.warmed = False
         self._initialized = False
+        self._init_lock = threading.Lock()
+        self._timing_lock = threading.Lock()
+        self._timing_totals: Dict[str, float] = {}
+        self._prepared = 0
+
+    def load_model(self):
+        """Laad gewichten en preprocessing config, zonder forward pass (fork-safe)"""
+        with self._init_lock:
+            if self.transform is None:
+                # Import only when needed
+                from timm.data import create_transform
+
+                from ...features.batch_preprocessing import BatchPreprocessor
+                from ...features.image_decoding import min_decode_side
+                from ..backends import build_torch_model, resolve_model_data_config
+                from ..backends.backend_factory import needs_torch_model
+
+                print(
+                    f"Laden van ConvNeXt model: {self.config.model_name} "
+                    f"({self.config.inference_backend})"
+                )
+                self.device = torch.device(self.config.device)
+                if needs_torch_model(self.config):
+                    self.model = build_torch_model(self.config)
+
+                config = resolve_model_data_config(self.config, self.model)
+                self.transform = create_transform(**config)
+                self.input_size = tuple(config["input_size"])
+                if self.config.fast_decode:
+                    self.decode_min_side = min_decode_side(self.transform)
+                if self.config.vectorized_preprocessing:
+                    self.preprocessor = BatchPreprocessor.from_data_config(config)
 
     def _lazy_init(self):
-        """Lazy initialization - ConvNeXt model laden bij eerste gebruik"""
-        if not self._initialized:
-            # Import only when needed
-            import timm
-            import torch
-            from timm.data import create_transform, resolve_data_config
-
-            print(f"Laden van ConvNeXt model: {self.config.model_name}")
-            self.device = torch.device(self.config.device)
-            self.model = (
-                timm.create_model(self.config.model_name, pretrained=True)
-                .to(self.device)
-                .eval()
-            )
+        """Lazy initialization - ConvNeXt model en backend bij eerste gebruik"""
+        self.load_model()
+        with self._init_lock:
+            if not self._initialized:
+                from ..backends import create_backend
 
-            config = resolve_data_config({}, model=self.model)
-            self.transform = create_transform(**config)
-            self._initialized = True
-            print("✅ ConvNeXt model succesvol geladen")
+                self.backend = create_backend(self.config, self.model, self.input_size)
+                self.scheduler = BatchScheduler(
+                    self._forward_batch,
+                    max_batch_size=self.config.batch_max_size,
+                    max_wait_ms=self.config.batch_max_wait_ms,
+                    name="convnext",
+                )
+                self._initialized = True
+                print("✅ ConvNeXt model succesvol geladen")
 
     @logged
-    @validate_image
-    def extract_features(self, afbeelding_bytes: bytes):
+    def extract_features(self, afbeelding_bytes: bytes, batched: bool = True):
         """Extract features met PIL en torch context managers"""
+        return self.extract_prepared(self.prepare(afbeelding_bytes), batched)
+
+    def prepare(self, afbeelding_bytes: bytes) -> PreparedImage:
+        """Valideer en decodeer afbeelding één keer: model tensor en perceptuele hash"""
         self._lazy_init()  # Initialiseer alleen bij eerste gebruik
-        
-        # Import context managers only when needed
-        from ...context_managers.image_context import pil_image
-        from ...context_managers.torch_context import torch_inference
-        
-        with pil_image(afbeelding_bytes) as img:
-            tensor = self.transform(img).unsqueeze(0).to(self.device)
 
-        with torch_inference():
-            return self.model(tensor)
+        # Import only when needed
+        from ...context_managers.image_context import decoded_image
+        from ...features.image_decoding import apply_transform
+        from ...features.perceptual_hash import dhash
+
+        with decoded_image(
+            afbeelding_bytes,
+            self.config.max_file_size,
+            self.decode_min_side,
+            self.config.max_image_pixels,
+        ) as (img, decode_duur):
+            start = time.perf_counter()
+            perceptual_hash = dhash(img)
+            resize_start = time.perf_counter()
+
+            if self.preprocessor is not None:
+                # Alleen resize/crop hier; normalisatie gebeurt per batch
+                pixels = self.preprocessor.to_pixels(img)
+                timings = {"resize": time.perf_counter() - resize_start}
+                tensor = None
+            else:
+                pixels = None
+                tensor, timings = apply_transform(self.transform, img)
+                tensor = tensor.unsqueeze(0)
+
+        timings = {"decode": decode_duur, "hash": resize_start - start, **timings}
+        self._record_timings(timings)
+        return PreparedImage(
+            tensor=tensor,
+            perceptual_hash=perceptual_hash,
+            timings=timings,
+            pixels=pixels,
+        )
+
+    def _record_timings(self, timings: Dict[str, float], images: int = 1) -> None:
+        """Tel preprocessing timings op voor gemiddelden in /status"""
+        with self._timing_lock:
+            self._prepared += images
+            for stage, duur in timings.items():
+                self._timing_totals[stage] = self._timing_totals.get(stage, 0.0) + duur
+
+    def preprocess_stats(self) -> Dict[str, Any]:
+        """Gemiddelde preprocessing tijd per fase in milliseconden"""
+        with self._timing_lock:
+            count = self._prepared
+            return {
+                "afbeeldingen": count,
+                **{
+                    f"gemiddeld_{stage}_ms": round(total / count * 1000, 3)
+                    for stage, total in self._timing_totals.items()
+                },
+            }
+
+    def extract_prepared(self, prepared: PreparedImage, batched: bool = True):
+        """Features van een voorbereide afbeelding (batched=False: in deze thread)"""
+        self._lazy_init()
+
+        if not batched:
+            return self._forward_batch([prepared])[0]
+        # Gelijktijdige requests delen één forward pass
+        return self.scheduler.submit(prepared)
+
+    def _collate(self, items: List[PreparedImage], record: bool = True) -> torch.Tensor:
+        """Stel de batch samen; uint8 pixels worden in één pass genormaliseerd"""
+        if self.preprocessor is None:
+            return torch.cat([item.tensor for item in items])
+
+        start = time.perf_counter()
+        batch = self.preprocessor.collate([item.pixels for item in items])
+        share = (time.perf_counter() - start) / len(items)
+        if record:
+            for item in items:
+                item.timings["normalize"] = share
+            self._record_timings({"normalize": share * len(items)}, images=0)
+        return batch
+
+    def _forward_batch(self, items: List[PreparedImage]) -> List[torch.Tensor]:
+        """Eén forward pass voor een batch, gesplitst per caller"""
+        batch = self._collate(items).to(self.device)
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        output = self.backend(batch)
+        duur = time.perf_counter() - start
+        Metrics().inference_seconds.labels(self.backend.name).observe(duur)
+
+        # Inline (batch size 1) telt de CPU al mee bij de thread van de caller
+        cpu = time.thread_time() - cpu_start if self.scheduler.in_worker() else 0.0
+        for item in items:
+            item.timings["forward"] = duur
+            item.timings["forward_cpu"] = cpu / len(items)
+            item.batch_size = len(items)
+        return list(output.split(1))
+
+    def _get_category_mapping(self) -> Optional[CategoryMapping]:
+        """ImageNet -> afval type matrix, opnieuw gebouwd na een config reload"""
+        if self.afval_config is not None:
+            afval_config, versie = self.afval_config, -1
+        else:
+            snapshot = ConfigRegistry().current()
+            afval_config, versie = snapshot.afval_config, snapshot.versie
+        with self._init_lock:
+            if self._mapping_versie != versie:
+                self.category_mapping = CategoryMapping.from_config(
+                    afval_config.imagenet_mapping, afval_config.afval_types
+                )
+                self._mapping_versie = versie
+            return self.category_mapping
+
+    def can_classify_locally(self) -> bool:
+        """Offline classificatie mogelijk: ImageNet logits en een mapping"""
+        return (
+            self.config.feature_mode == "logits"
+            and self._get_category_mapping() is not None
+        )
+
+    def classify_categories(self, features: torch.Tensor) -> List[Dict[str, Any]]:
+        """Afval types direct uit de ImageNet logits, zonder externe call"""
+        if not self.can_classify_locally():
+            raise ServiceNotAvailableError(
+                "Lokale classificatie vereist FEATURE_MODE=logits en imagenet_mapping"
+            )
+        return self.category_mapping.classify(features)[0]
+
+    def warmup(self, batch_sizes: Iterable[int]) -> None:
+        """Laad model en draai dummy forward passes per batch grootte"""
+        self._lazy_init()
+        channels, height, width = self.input_size
+        for size in batch_sizes:
+            dummy = [
+                PreparedImage(
+                    tensor=torch.zeros(1, channels, height, width),
+                    perceptual_hash=0,
+                    pixels=np.zeros((height, width, channels), dtype=np.uint8),
+                )
+                for _ in range(size)
+            ]
+            self.backend(self._collate(dummy, record=False).to(self.device))
+            self.warmed = True
 
     def is_ready(self) -> bool:
         """Quick check zonder model te laden"""
         return True  # Service is altijd 'ready', model wordt lazy geladen
+
+    def is_loaded(self) -> bool:
+        """Model, preprocessing en backend zijn opgebouwd (geen koude eerste call)"""
+        return self._initialized and self.transform is not None
@@ -0,0 +1,323 @@
+"""Staged Pipeline Engine - Stappen met eigen wachtrij, werkers en batching"""
+
+import asyncio
+import inspect
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from ..exceptions.service_exceptions import ServiceNotAvailableError
+from ..monitoring.metrics import Metrics
+from ..monitoring.request_timing import RequestTiming
+from .worker_pools import BoundedExecutor
+
+
+class Done:
+    """Stap resultaat dat de rest van de pipeline overslaat (cache hit, fallback)"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+@dataclass
+class Stage:
+    """
+    Eén pipeline stap
+
+    `func` krijgt één item, of bij `batch_size` > 1 een lijst items en geeft
+    dan een lijst met evenveel resultaten terug (een Exception als element
+    laat alleen dat item falen). Blocking stappen draaien in `executor`
+    (standaard een eigen pool met `workers` threads), niet-blocking stappen
+    op de event loop; een coroutine resultaat wordt afgewacht.
+    """
+
+    name: str
+    func: Callable[[Any], Any]
+    workers: int = 1
+    queue_size: int = 64
+    batch_size: int = 1
+    max_wait_ms: float = 0.0
+    blocking: bool = True
+    executor: Optional[BoundedExecutor] = None
+
+    @classmethod
+    def of(cls, step: Union["Stage", Callable[[Any], Any]]) -> "Stage":
+        """Stage van een gewone pipeline functie (async functies op de loop)"""
+        if isinstance(step, Stage):
+            return step
+        return cls(
+            name=getattr(step, "__name__", type(step).__name__),
+            func=step,
+            blocking=not inspect.iscoroutinefunction(step),
+        )
+
+
+class _Job:
+    """Eén request op weg door de stappen"""
+
+    __slots__ = ("data", "future", "enqueued", "timing")
+
+    def __init__(
+        self, data: Any, future: asyncio.Future, timing: Optional[RequestTiming]
+    ):
+        self.data = data
+        self.future = future
+        self.enqueued = time.perf_counter()
+        self.timing = timing
+
+
+def _timed(func: Callable[[Any], Any], argument: Any) -> Tuple[Any, float]:
+    """Resultaat en CPU tijd van de aanroepende thread"""
+    start = time.thread_time()
+    result = func(argument)
+    return result, time.thread_time() - start
+
+
+class _StageStats:
+    """Tellers per stap, plus de bijbehorende Prometheus series"""
+
+    def __init__(self, pipeline: str, stage: str):
+        self.items = 0
+        self.batches = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.largest_batch = 0
+
+        metrics = Metrics()
+        self.seconds = metrics.stage_seconds.labels(pipeline, stage)
+        self.queue_wait = metrics.stage_queue_wait_seconds.labels(pipeline, stage)
+        self.in_flight = metrics.stage_in_flight.labels(pipeline, stage)
+        self.failed = metrics.stage_errors.labels(pipeline, stage)
+        self.batch_size = metrics.stage_batch_size.labels(pipeline, stage)
+        self.queue_depth = metrics.stage_queue_depth.labels(pipeline, stage)
+
+
+class StagedPipeline:
+    """
+    Pipeline waarin stappen van verschillende requests overlappen
+
+    Elke stap heeft een begrensde wachtrij en eigen werkers; een request gaat
+    na een stap door naar de wachtrij van de volgende. Zo draait ConvNeXt
+    inference voor de ene upload terwijl een andere op Gemini wacht, en kan
+    een stap items van meerdere requests bundelen. Een volle eerste wachtrij
+    geeft ServiceNotAvailableError (503); verderop wachten stappen op ruimte
+    (backpressure). Wachtrijen en werkers horen bij de event loop waarop
+    `submit` ze aanmaakte.
+
+    Synchroon aanroepen (`pipeline(data)`) voert de stappen na elkaar uit,
+    net als `compose`.
+    """
+
+    def __init__(
+        self, stages: Sequence[Union[Stage, Callable]], name: str = "pipeline"
+    ):
+        self.stages: List[Stage] = [Stage.of(stage) for stage in stages]
+        self.name = name
+
+        self._lock = threading.Lock()
+        self._executors: Dict[int, BoundedExecutor] = {}
+        self._stats = [_StageStats(name, stage.name) for stage in self.stages]
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queues: List[asyncio.Queue] = []
+        self._workers: List[asyncio.Task] = []
+
+    def then(self, step: Union[Stage, Callable]) -> "StagedPipeline":
+        """Nieuwe pipeline met een extra stap aan het eind"""
+        return StagedPipeline([*self.stages, Stage.of(step)], self.name)
+
+    # ======================== SYNCHROON ========================
+
+    def __call__(self, data: Any) -> Any:
+        """Voer alle stappen na elkaar uit in de huidige thread"""
+        for stage in self.stages:
+            result = stage.func([data])[0] if stage.batch_size > 1 else stage.func(data)
+            if inspect.isawaitable(result):
+                result = asyncio.run(result)
+            if isinstance(result, BaseException):
+                raise result
+            if isinstance(result, Done):
+                return result.value
+            data = result
+        return data
+
+    # ======================== GESTAGED ========================
+
+    async def submit(self, data: Any, timing: Optional[RequestTiming] = None) -> Any:
+        """
+        Stuur data door alle stappen en wacht op het eindresultaat
+
+        Met `timing` worden wachtrij tijd, duur en thread CPU tijd van elke
+        stap voor deze request bijgehouden (CPU van een batch stap naar rato).
+        """
+        if not self.stages:
+            return data
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._start(loop)
+
+        job = _Job(data, loop.create_future(), timing)
+        try:
+            self._queues[0].put_nowait(job)
+        except asyncio.QueueFull:
+            raise ServiceNotAvailableError(f"{self.name} pipeline overbelast")
+        return await job.future
+
+    def _start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Wachtrijen en werker tasks voor deze event loop"""
+        self._loop = loop
+        self._queues = [asyncio.Queue(max(1, s.queue_size)) for s in self.stages]
+        self._workers = [
+            loop.create_task(self._work(index))
+            for index, stage in enumerate(self.stages)
+            for _ in range(self._worker_count(stage))
+        ]
+
+    def _worker_count(self, stage: Stage) -> int:
+        if stage.blocking and stage.executor is not None:
+            return stage.executor.max_workers
+        return max(1, stage.workers)
+
+    def _executor(self, index: int) -> BoundedExecutor:
+        """Pool voor een blocking stap: meegegeven of eigen pool per stap"""
+        stage = self.stages[index]
+        if stage.executor is not None:
+            return stage.executor
+        with self._lock:
+            if index not in self._executors:
+                self._executors[index] = BoundedExecutor(
+                    f"{self.name}-{stage.name}", stage.workers, 0
+                )
+            return self._executors[index]
+
+    async def _work(self, index: int) -> None:
+        """Werker: haal (batch van) jobs, voer stap uit, geef door"""
+        stage, queue = self.stages[index], self._queues[index]
+        last = index == len(self.stages) - 1
+        while True:
+            jobs = await self._take(queue, stage)
+            # Callers kunnen intussen afgehaakt zijn (deadline, disconnect)
+            jobs = [job for job in jobs if not job.future.done()]
+            if not jobs:
+                continue
+            now = time.perf_counter()
+            for job in jobs:
+                self._stats[index].queue_wait.observe(now - job.enqueued)
+                if job.timing is not None:
+                    job.timing.add("wachtrij", now - job.enqueued)
+
+            try:
+                outputs, duration, cpu = await self._execute(
+                    index, [job.data for job in jobs]
+                )
+            except Exception as e:
+                outputs, duration, cpu = [e] * len(jobs), 0.0, 0.0
+
+            for job, output in zip(jobs, outputs):
+                if job.future.done():
+                    continue
+                if job.timing is not None:
+                    job.timing.add(stage.name, duration)
+                    job.timing.add_cpu(cpu / len(jobs))
+                if isinstance(output, BaseException):
+                    with self._lock:
+                        self._stats[index].errors += 1
+                    self._stats[index].failed.inc()
+                    job.future.set_exception(output)
+                elif isinstance(output, Done):
+                    job.future.set_result(output.value)
+                elif last:
+                    job.future.set_result(output)
+                else:
+                    job.data = output
+                    job.enqueued = time.perf_counter()
+                    await self._queues[index + 1].put(job)
+
+    async def _take(self, queue: asyncio.Queue, stage: Stage) -> List[_Job]:
+        """Eén job, aangevuld tot `batch_size` binnen `max_wait_ms`"""
+        jobs = [await queue.get()]
+        if stage.batch_size > 1:
+            deadline = time.monotonic() + stage.max_wait_ms / 1000.0
+            while len(jobs) < stage.batch_size:
+                if not queue.empty():
+                    jobs.append(queue.get_nowait())
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    jobs.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+        return jobs
+
+    async def _execute(
+        self, index: int, items: List[Any]
+    ) -> Tuple[List[Any], float, float]:
+        """Voer de stap uit voor een batch items: resultaten, duur en CPU tijd"""
+        stage = self.stages[index]
+        batched = stage.batch_size > 1
+        argument = items if batched else items[0]
+        in_flight = self._stats[index].in_flight
+        in_flight.inc(len(items))
+        start = time.perf_counter()
+        try:
+            if stage.blocking:
+                result, cpu = await self._executor(index).run(
+                    _timed, stage.func, argument
+                )
+            else:
+                result, cpu = _timed(stage.func, argument)
+            if inspect.isawaitable(result):
+                result = await result
+        finally:
+            duration = time.perf_counter() - start
+            in_flight.dec(len(items))
+            self._record(index, len(items), duration)
+
+        if not batched:
+            return [result], duration, cpu
+        if len(result) != len(items):
+            raise RuntimeError(
+                f"Stap {stage.name} gaf {len(result)} resultaten "
+                f"voor {len(items)} items"
+            )
+        return list(result), duration, cpu
+
+    def _record(self, index: int, size: int, duration: float) -> None:
+        with self._lock:
+            stats = self._stats[index]
+            stats.items += size
+            stats.batches += 1
+            stats.busy += duration
+            stats.largest_batch = max(stats.largest_batch, size)
+        stats.seconds.observe(duration)
+        stats.batch_size.observe(size)
+
+    def collect_metrics(self) -> None:
+        """Wachtrij diepte per stap bijwerken (collector voor /metrics)"""
+        for queue, stats in zip(self._queues, self._stats):
+            stats.queue_depth.set(queue.qsize())
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Wachtrij, werkers en doorvoer per stap"""
+        result: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for i, (stage, stats) in enumerate(zip(self.stages, self._stats)):
+                name = stage.name if stage.name not in result else f"{stage.name}_{i}"
+                result[name] = {
+                    "werkers": self._worker_count(stage),
+                    "blocking": stage.blocking,
+                    "wachtrij": self._queues[i].qsize() if self._queues else 0,
+                    "max_wachtrij": max(1, stage.queue_size),
+                    "batch_size": stage.batch_size,
+                    "items": stats.items,
+                    "batches": stats.batches,
+                    "grootste_batch": stats.largest_batch,
+                    "fouten": stats.errors,
+                    "bezig_seconden": round(stats.busy, 4),
+                }
+        return result
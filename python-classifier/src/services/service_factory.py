@@ -2,18 +2,21 @@
 
 from typing import Any, Dict
 
-from ..config.afval_config import AfvalConfig
-from ..config.app_config import AppConfig
+from ..config.config_registry import ConfigRegistry
 from .implementations.gemini_service import GeminiService
 from .implementations.lokale_service import LokaleService
 
 
 class ServiceFactory:
-    """Factory voor het maken van services met shared configuratie"""
+    """
+    Factory voor het maken van services met shared configuratie
+
+    Goedkoop om per call te maken: app en afval config komen uit de
+    ConfigRegistry en worden niet opnieuw uit de omgeving of van schijf gelezen.
+    """
 
     def __init__(self):
-        self._app_config = AppConfig()
-        self._afval_config = AfvalConfig.from_yaml()
+        self._app_config = ConfigRegistry().app_config
 
     def create_lokale_service(self) -> LokaleService:
         """Maak lokale classificatie service"""
@@ -21,7 +24,7 @@ class ServiceFactory:
 
     def create_gemini_service(self) -> GeminiService:
         """Maak Gemini service"""
-        return GeminiService(self._app_config, self._afval_config)
+        return GeminiService(self._app_config)
 
     def create_all_services(self) -> Dict[str, Any]:
         """Maak alle services in één keer"""
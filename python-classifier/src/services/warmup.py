@@ -0,0 +1,137 @@
+"""Startup Warmup"""
+
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from ..config.app_config import AppConfig
+from ..decorators.singleton_decorator import singleton
+from ..exceptions.service_exceptions import ServiceNotAvailableError
+from .service_factory import ServiceFactory
+
+logger = logging.getLogger(__name__)
+
+
+@singleton
+@dataclass
+class WarmupStatus:
+    """Voortgang van de opstart warmup in dit proces"""
+
+    status: str = "niet_gestart"
+    duur: Optional[float] = None
+    fout: Optional[str] = None
+    pogingen: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Status als dict voor endpoints"""
+        return {
+            "status": self.status,
+            "duur": self.duur,
+            "fout": self.fout,
+            "pogingen": self.pogingen,
+        }
+
+
+def warmup_batch_sizes(config: AppConfig) -> Tuple[int, ...]:
+    """Batch groottes voor dummy forward passes (standaard 1 en de batch max)"""
+    if config.warmup_batch_sizes:
+        return config.warmup_batch_sizes
+    return tuple(sorted({1, max(1, config.batch_max_size)}))
+
+
+def warmup_services(
+    config: AppConfig = AppConfig(),
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+) -> bool:
+    """
+    Laad model en backend, draai dummy batches en initialiseer Gemini client
+
+    `loop` is de event loop van de worker; daarop opent de async Gemini
+    client alvast zijn verbinding.
+    """
+    state = WarmupStatus()
+    state.status = "bezig"
+    state.pogingen += 1
+    start = time.perf_counter()
+
+    try:
+        factory = ServiceFactory()
+        factory.create_lokale_service().warmup(warmup_batch_sizes(config))
+
+        try:
+            factory.create_gemini_service().warmup(loop)
+        except ServiceNotAvailableError as e:
+            # Geen Gemini key: lokaal model is wel warm, classificatie geeft 503
+            logger.warning(f"Gemini warmup overgeslagen: {e}")
+
+        state.status = "klaar"
+        state.fout = None
+    except Exception as e:
+        logger.error(f"Warmup mislukt: {e}")
+        state.status = "mislukt"
+        state.fout = str(e)
+    finally:
+        state.duur = round(time.perf_counter() - start, 3)
+        logger.info(f"Warmup {state.status} na {state.duur}s")
+    return state.status == "klaar"
+
+
+def run_warmup(
+    config: AppConfig = AppConfig(),
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+) -> None:
+    """
+    Warmup met herhaling; blijft die mislukken, dan stopt het proces
+
+    Tussen pogingen zit een verdubbelende wachttijd (WARMUP_RETRY_SECONDS,
+    max 30s). Na WARMUP_MAX_ATTEMPTS pogingen krijgt het proces SIGTERM:
+    een worker die nooit klaar wordt, wordt zo herstart in plaats van
+    eeuwig unready te blijven.
+    """
+    attempts = max(1, config.warmup_max_attempts)
+    for attempt in range(1, attempts + 1):
+        if warmup_services(config, loop):
+            return
+        if attempt < attempts:
+            delay = min(30.0, config.warmup_retry_seconds * 2 ** (attempt - 1))
+            logger.warning(f"Warmup poging {attempt} mislukt, opnieuw over {delay}s")
+            time.sleep(delay)
+
+    logger.error(f"Warmup {attempts} keer mislukt, proces stopt")
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def start_warmup(config: AppConfig = AppConfig()) -> threading.Thread:
+    """Start warmup op de achtergrond zodat /health direct antwoordt"""
+    # Vanaf nu wacht /ready op het geladen model
+    WarmupStatus().status = "gepland"
+    try:
+        loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    thread = threading.Thread(
+        target=run_warmup, args=(config, loop), name="warmup", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    """
+    Klaar voor verkeer
+
+    Zonder warmup (WARMUP_ON_STARTUP=false) wordt het model lazy geladen bij
+    de eerste request en is het proces direct klaar. Met warmup pas als die
+    voltooid is en het model met backend geladen is.
+    """
+    status = WarmupStatus().status
+    if status == "niet_gestart":
+        return True
+    if status != "klaar":
+        return False
+    return ServiceFactory().create_lokale_service().is_loaded()
@@ -0,0 +1,103 @@
+"""Bounded Worker Pools"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ..config.app_config import AppConfig
+from ..decorators.singleton_decorator import singleton
+from ..exceptions.service_exceptions import ServiceNotAvailableError
+
+
+class BoundedExecutor:
+    """Thread pool met vaste capaciteit en zichtbare verzadiging"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Voer blocking functie uit in de pool zonder de event loop te blokkeren
+
+        De plek komt pas vrij als de thread klaar is, niet als de wachtende
+        coroutine wordt geannuleerd (deadline): een nog lopende call bezet
+        dan nog steeds een werker en mag de limiet niet omzeilen.
+        """
+        self._acquire()
+        try:
+            call = functools.partial(func, *args, **kwargs)
+            context = contextvars.copy_context()
+            future = self._get_executor().submit(context.run, call)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Capaciteit en bezetting van de pool"""
+        with self._lock:
+            return {
+                "max_werkers": self.max_workers,
+                "max_wachtrij": self.max_queue,
+                "actief": min(self._in_flight, self.max_workers),
+                "wachtend": max(0, self._in_flight - self.max_workers),
+                "voltooid": self._completed,
+                "afgewezen": self._rejected,
+                "verzadigd": self._in_flight >= self.max_workers + self.max_queue,
+            }
+
+    def _acquire(self) -> None:
+        """Reserveer plek of weiger bij volle pool en wachtrij"""
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                raise ServiceNotAvailableError(f"{self.name} pool overbelast")
+            self._in_flight += 1
+
+    def _release(self) -> None:
+        """Geef plek vrij"""
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Maak executor per proces aan (threads overleven fork niet)"""
+        pid = os.getpid()
+        with self._lock:
+            if self._executor is None or self._pid != pid:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.name
+                )
+                self._pid = pid
+            return self._executor
+
+
+@singleton
+class WorkerPools:
+    """Gescheiden pools voor CPU inference en Gemini I/O"""
+
+    def __init__(self, config: AppConfig = AppConfig()):
+        self.inference = BoundedExecutor(
+            "inference", config.inference_workers, config.worker_queue_size
+        )
+        self.gemini = BoundedExecutor(
+            "gemini", config.gemini_workers, config.worker_queue_size
+        )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Bezetting van alle pools"""
+        return {"inference": self.inference.stats(), "gemini": self.gemini.stats()}
@@ -0,0 +1,141 @@
+"""Lokale Gemini Stub Server
+
+Beantwoordt generateContent requests met een vaste classificatie, met
+instelbare vertraging en statuscode. Houdt bij hoeveel requests er tegelijk
+openstaan, zodat tests concurrency limieten kunnen controleren.
+
+Handmatig draaien tegen de echte service:
+    python -m tests.gemini_stub --port 8089 --delay 0.5
+    GEMINI_BASE_URL=http://127.0.0.1:8089 GEMINI_API_KEY=stub make serve
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CLASSIFICATIES = [{"type": "Grofvuil", "confidence": 0.8}]
+
+
+class _Server(ThreadingHTTPServer):
+    # Ruime accept backlog voor honderden gelijktijdige verbindingen
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+class GeminiStub:
+    """Stub server in een achtergrond thread"""
+
+    def __init__(
+        self,
+        delay: float = 0.0,
+        status: int = 200,
+        classificaties: Optional[List[Dict[str, Any]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.delay = delay
+        self.status = status
+        self.classificaties = classificaties or DEFAULT_CLASSIFICATIES
+        self.requests: List[Dict[str, Any]] = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):  # noqa: N802
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    stub.requests.append(
+                        {
+                            "path": self.path,
+                            "api_key": self.headers.get("x-goog-api-key"),
+                            "body": json.loads(body or b"{}"),
+                        }
+                    )
+                try:
+                    time.sleep(stub.delay)
+                    text = json.dumps(stub.classificaties)
+                    payload = json.dumps(
+                        {"candidates": [{"content": {"parts": [{"text": text}]}}]}
+                    ).encode("utf-8")
+                    self.send_response(stub.status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with stub._lock:
+                        stub.active -= 1
+
+            def do_GET(self):  # noqa: N802
+                # Model lookup, zoals de warmup van de async client
+                with stub._lock:
+                    stub.requests.append(
+                        {
+                            "path": self.path,
+                            "api_key": self.headers.get("x-goog-api-key"),
+                            "body": None,
+                        }
+                    )
+                name = self.path.split("/v1beta/")[-1]
+                payload = json.dumps({"name": name}).encode("utf-8")
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "GeminiStub":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="gemini-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "GeminiStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Lokale Gemini stub server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--status", type=int, default=200)
+    args = parser.parse_args()
+
+    stub = GeminiStub(delay=args.delay, status=args.status, port=args.port)
+    print(f"Gemini stub op {stub.url}")
+    stub._server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
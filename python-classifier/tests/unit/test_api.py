@@ -1,8 +1,27 @@
 """Unit tests for API endpoints"""
 
+import asyncio
+import dataclasses
+import gc
+import io
+import os
+import signal
+from unittest.mock import patch
+
 import pytest
+from fastapi import HTTPException, UploadFile
 from fastapi.testclient import TestClient
+from PIL import Image
+
+from src.api import prefork
+from src.api.prefork import RestartPolicy, pin_torch_threads, threads_per_worker
+from src.api.uploads import read_upload
+from src.config.app_config import AppConfig
+from src.config.config_registry import ConfigRegistry
 from src.controller import app
+from src.pipeline import BRON_FALLBACK, LOKALE_FALLBACK, classificatie_bron
+from src.services.implementations.lokale_service import LokaleService
+from src.services.warmup import WarmupStatus
 
 # Test client
 client = TestClient(app)
@@ -27,11 +46,260 @@ class TestAPIEndpoints:
         assert "gemini_ai" in data
         assert "overall_status" in data
     
+    def test_health_endpoint(self):
+        """Test liveness endpoint"""
+        response = client.get("/health")
+        assert response.status_code == 200
+        assert response.json() == {"status": "ok"}
+
+    def test_metrics_endpoint(self):
+        """Test Prometheus scrape endpoint"""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE afvalalert_gemini_call_seconds histogram" in response.text
+        worker = f'worker="{os.getpid()}"'
+        assert (
+            'afvalalert_stage_queue_depth{pipeline="classificatie",stap="decode",'
+            f"{worker}}}" in response.text
+        )
+
+    def test_profiling_is_off_without_token(self):
+        """Profiling endpoints are hidden unless PROFILE_TOKEN is configured"""
+        assert client.get("/profielen").status_code == 404
+        response = client.post(
+            "/debug?profiel=true",
+            files={"afbeelding": ("foto.png", b"png", "image/png")},
+            headers={"X-Profiel-Token": ""},
+        )
+        assert response.status_code == 404
+
+    def test_ready_endpoint_waits_for_loaded_model(self):
+        """Test readiness waits for the startup warmup only when one was started"""
+        state = WarmupStatus()
+        lokale = LokaleService()
+        # Geen warmup: model wordt lazy geladen, dus direct klaar
+        with patch.object(state, "status", "niet_gestart"):
+            assert client.get("/ready").status_code == 200
+
+        with patch.object(state, "status", "gepland"):
+            response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["klaar"] is False
+
+        with patch.object(state, "status", "klaar"), patch.object(
+            lokale, "is_loaded", return_value=False
+        ):
+            assert client.get("/ready").status_code == 503
+
+        with patch.object(state, "status", "klaar"), patch.object(
+            lokale, "is_loaded", return_value=True
+        ):
+            response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["klaar"] is True
+
     def test_debug_endpoint_without_file(self):
         """Test debug endpoint without file"""
         response = client.post("/debug")
         # Should fail because no file was provided
         assert response.status_code == 422
 
+class TestUploadIngestion:
+    """Unit tests for streaming, size-capped uploads"""
+
+    @staticmethod
+    def png_bytes(size):
+        buffer = io.BytesIO()
+        Image.new("1", size).save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def test_oversized_body_rejected_before_parsing(self):
+        """Content-Length above the limit is answered with 413"""
+        body = b"x" * (AppConfig().max_file_size + 256 * 1024)
+        response = client.post(
+            "/classificeer", files={"afbeelding": ("groot.jpg", body, "image/jpeg")}
+        )
+        assert response.status_code == 413
+
+    def test_decompression_bomb_rejected_from_header(self):
+        """A tiny PNG that declares 100 MP is refused before decoding"""
+        bomb = self.png_bytes((10_000, 10_000))
+        assert len(bomb) < 1024 * 1024
+        response = client.post(
+            "/classificeer", files={"afbeelding": ("bom.png", bomb, "image/png")}
+        )
+        assert response.status_code == 400
+        assert "te veel pixels" in response.json()["detail"]
+
+    def test_read_upload_stops_at_limit(self):
+        """Chunked reading aborts as soon as the cap is exceeded"""
+        config = dataclasses.replace(AppConfig(), max_file_size=100_000)
+        upload = UploadFile(io.BytesIO(b"x" * 200_000))
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(read_upload(upload, config, chunk_size=16_384))
+        assert exc_info.value.status_code == 413
+        assert upload.file.tell() <= 100_000 + 16_384
+
+    def test_read_upload_returns_image_bytes(self):
+        """Uploads within limits are returned unchanged"""
+        data = self.png_bytes((64, 48))
+        upload = UploadFile(io.BytesIO(data))
+        assert asyncio.run(read_upload(upload, chunk_size=16)) == data
+
+    def test_fallback_answer_is_flagged_in_header(self):
+        """The local fallback keeps the response schema and sets the source header"""
+
+        async def degraded(afbeelding_bytes, gebruik_cache, modus=None, timing=None):
+            classificatie_bron.set(BRON_FALLBACK)
+            return LOKALE_FALLBACK
+
+        with patch(
+            "src.api.endpoints.classification.execute_classification_async", degraded
+        ):
+            response = client.post(
+                "/classificeer",
+                files={"afbeelding": ("foto.png", self.png_bytes((64, 48)), "image/png")},
+            )
+
+        assert response.status_code == 200
+        assert response.json() == LOKALE_FALLBACK
+        assert response.headers["X-Classificatie-Bron"] == BRON_FALLBACK
+
+    def test_server_timing_and_resource_headers(self):
+        """Per-stage durations and resource usage are reported in headers"""
+
+        async def staged(afbeelding_bytes, gebruik_cache, modus=None, timing=None):
+            classificatie_bron.set(BRON_FALLBACK)
+            timing.add("decode", 0.002)
+            timing.add("gemini", 0.5)
+            timing.add("inferentie", 0.04)
+            timing.add_cpu(0.03)
+            timing.note_memory(1234)
+            timing.batch_size = 4
+            return LOKALE_FALLBACK
+
+        config = dataclasses.replace(AppConfig(), resource_headers=True)
+        with patch(
+            "src.api.endpoints.classification.execute_classification_async", staged
+        ), patch.object(ConfigRegistry(), "app_config", config):
+            response = client.post(
+                "/classificeer",
+                files={"afbeelding": ("foto.png", self.png_bytes((64, 48)), "image/png")},
+            )
+
+        timing = response.headers["Server-Timing"]
+        names = [entry.split(";")[0] for entry in timing.split(", ")]
+        assert names == ["upload", "decode", "inferentie", "gemini", "cache", "totaal"]
+        assert "gemini;dur=500.00" in timing
+        assert 'cache;desc="miss"' in timing
+        assert response.headers["X-Cpu-Tijd-Ms"] == "30.00"
+        assert response.headers["X-Geheugen-Piek-Bytes"] == "1234"
+        assert response.headers["X-Cache-Status"] == "miss"
+        assert response.headers["X-Batch-Grootte"] == "4"
+
+
+class FakeClock:
+    """Manually advanced clock for restart backoff tests"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPrefork:
+    """Unit tests for the pre-fork thread split and worker restarts"""
+
+    def test_threads_per_worker_splits_cores(self):
+        """Cores are divided over workers, at least one thread each"""
+        with patch("src.api.prefork.os.cpu_count", return_value=8):
+            assert threads_per_worker(4) == 2
+            assert threads_per_worker(3) == 2
+            assert threads_per_worker(16) == 1
+            assert threads_per_worker(0) == 8
+            assert threads_per_worker(4, configured=3) == 3
+        with patch("src.api.prefork.os.cpu_count", return_value=None):
+            assert threads_per_worker(2) == 1
+
+    def test_pin_torch_threads(self):
+        """Intra-op threads are pinned; a second inter-op call is tolerated"""
+        import torch
+
+        before = torch.get_num_threads()
+        try:
+            pin_torch_threads(1)
+            assert torch.get_num_threads() == 1
+            pin_torch_threads(2)
+            assert torch.get_num_threads() == 2
+        finally:
+            torch.set_num_threads(before)
+
+    def test_restart_backoff_doubles_and_gives_up(self):
+        """Quick crashes back off exponentially until the restart limit"""
+        clock = FakeClock()
+        policy = RestartPolicy(4, base_delay=0.5, max_delay=2.0, clock=clock)
+        delays = []
+        for _ in range(5):
+            policy.started(0)
+            clock.now += 0.1
+            delays.append(policy.next_delay(0))
+
+        assert delays == [0.5, 1.0, 2.0, 2.0, None]
+
+    def test_stable_worker_resets_backoff(self):
+        """A worker that ran long enough restarts without accumulated backoff"""
+        clock = FakeClock()
+        policy = RestartPolicy(
+            max_restarts=2, base_delay=1.0, stable_seconds=60, clock=clock
+        )
+        policy.started(0)
+        assert policy.next_delay(0) == 1.0
+        policy.started(0)
+        assert policy.next_delay(0) == 2.0
+
+        policy.started(0)
+        clock.now += 60
+        assert policy.next_delay(0) == 1.0
+        # Andere slots tellen los
+        policy.started(1)
+        assert policy.next_delay(1) == 1.0
+
+    def test_crash_looping_worker_stops_server(self):
+        """A worker that dies at startup is retried with backoff, then exit 1"""
+        starts = []
+
+        class Recording(RestartPolicy):
+            def started(self, slot):
+                starts.append(slot)
+                super().started(slot)
+
+        def crash(*args):
+            raise ImportError("kapotte worker")
+
+        signals = (signal.SIGTERM, signal.SIGINT)
+        handlers = {sig: signal.getsignal(sig) for sig in signals}
+        try:
+            with patch.object(prefork, "preload_model"), patch.object(
+                prefork, "_run_worker", side_effect=crash
+            ):
+                with pytest.raises(SystemExit) as exc:
+                    prefork.serve_prefork(
+                        "127.0.0.1",
+                        0,
+                        workers=1,
+                        torch_threads=1,
+                        restarts=Recording(max_restarts=2, base_delay=0.01),
+                    )
+        finally:
+            gc.unfreeze()
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+
+        assert exc.value.code == 1
+        assert starts == [0, 0, 0]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file
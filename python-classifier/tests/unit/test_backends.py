@@ -0,0 +1,175 @@
+"""Unit tests for pluggable inference backends"""
+
+import dataclasses
+
+import pytest
+import torch
+from torch import nn
+
+from src.config.app_config import AppConfig
+from src.exceptions.service_exceptions import ServiceNotAvailableError
+from src.services.backends import create_backend
+from src.services.backends.backend_factory import (
+    artifact_path,
+    needs_torch_model,
+    write_artifact_settings,
+)
+from src.services.backends.export import export_onnx, export_torchscript
+from src.services.backends.feature_head import FeatureExtractor
+
+INPUT_SIZE = (3, 16, 16)
+
+
+def make_model() -> nn.Module:
+    """Small conv net as ConvNeXt stand-in"""
+    torch.manual_seed(0)
+    return nn.Sequential(
+        nn.Conv2d(3, 4, 3, padding=1),
+        nn.AdaptiveAvgPool2d(1),
+        nn.Flatten(),
+        nn.Linear(4, 10),
+    ).eval()
+
+
+def config_for(backend: str, path: str = "") -> AppConfig:
+    """AppConfig with a specific backend and artifact path"""
+    return dataclasses.replace(
+        AppConfig(), inference_backend=backend, model_artifact_path=path
+    )
+
+
+class TestInferenceBackends:
+    """Unit tests for backend selection and parity"""
+
+    def setup_method(self):
+        self.model = make_model()
+        self.batch = torch.randn(3, *INPUT_SIZE)
+        with torch.no_grad():
+            self.expected = self.model(self.batch)
+
+    def test_eager_backend(self):
+        """Eager backend returns the module output"""
+        backend = create_backend(config_for("eager"), self.model, INPUT_SIZE)
+        assert backend.name == "eager"
+        assert torch.allclose(backend(self.batch), self.expected)
+
+    def test_torchscript_backend_traces_without_artifact(self, tmp_path):
+        """Without an artifact the module is traced once at load"""
+        config = config_for("torchscript", str(tmp_path / "missing.pt"))
+        backend = create_backend(config, self.model, INPUT_SIZE)
+        assert torch.allclose(backend(self.batch), self.expected, atol=1e-5)
+
+    def test_torchscript_backend_loads_exported_artifact(self, tmp_path):
+        """Exported TorchScript artifact loads without the Python module"""
+        path = tmp_path / "model.pt"
+        config = config_for("torchscript", str(path))
+        export_torchscript(self.model, INPUT_SIZE, path)
+        write_artifact_settings(path, config)
+        assert not needs_torch_model(config)
+        backend = create_backend(config, None, INPUT_SIZE)
+        assert torch.allclose(backend(self.batch), self.expected, atol=1e-5)
+
+    def test_stale_torchscript_artifact_is_retraced(self, tmp_path):
+        """An artifact exported with other feature settings is not loaded"""
+        path = tmp_path / "model.pt"
+        export_torchscript(nn.Sequential(nn.Flatten()).eval(), INPUT_SIZE, path)
+        write_artifact_settings(path, config_for("torchscript", str(path)))
+        config = dataclasses.replace(
+            config_for("torchscript", str(path)), feature_mode="embedding"
+        )
+
+        assert needs_torch_model(config)
+        backend = create_backend(config, self.model, INPUT_SIZE)
+        assert torch.allclose(backend(self.batch), self.expected, atol=1e-5)
+        with pytest.raises(ServiceNotAvailableError, match="Geen TorchScript"):
+            create_backend(config, None, INPUT_SIZE)
+
+    def test_onnx_backend_matches_eager(self, tmp_path):
+        """ONNX Runtime session handles dynamic batch sizes"""
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("onnx")
+        path = tmp_path / "model.onnx"
+        export_onnx(self.model, INPUT_SIZE, path)
+        write_artifact_settings(path, config_for("onnx", str(path)))
+        backend = create_backend(config_for("onnx", str(path)), None, INPUT_SIZE)
+        assert torch.allclose(backend(self.batch), self.expected, atol=1e-5)
+
+    def test_onnx_artifact_without_matching_settings_is_refused(self, tmp_path):
+        """A missing or different sidecar refuses the ONNX artifact"""
+        path = tmp_path / "model.onnx"
+        path.write_bytes(b"oud artifact")
+        config = config_for("onnx", str(path))
+        with pytest.raises(ServiceNotAvailableError, match="andere instellingen"):
+            create_backend(config, None, INPUT_SIZE)
+
+        write_artifact_settings(path, config)
+        int8 = dataclasses.replace(config, inference_precision="int8")
+        with pytest.raises(ServiceNotAvailableError, match="andere instellingen"):
+            create_backend(int8, None, INPUT_SIZE)
+
+    def test_default_artifact_name_encodes_settings(self):
+        """Each feature/precision combination gets its own default artifact"""
+        config = dataclasses.replace(
+            config_for("onnx"), model_name="convnext_tiny", feature_mode="logits"
+        )
+        embedding = dataclasses.replace(
+            config, feature_mode="embedding", feature_layer="stage2"
+        )
+        int8 = dataclasses.replace(
+            config_for("torchscript"),
+            model_name="convnext_tiny",
+            feature_mode="logits",
+            inference_precision="int8",
+            quantize_conv=True,
+        )
+
+        assert artifact_path(config).name == "convnext_tiny-logits-float32-fp32.onnx"
+        assert artifact_path(embedding).name == (
+            "convnext_tiny-embedding-stage2-float32-fp32.onnx"
+        )
+        assert artifact_path(int8).name == "convnext_tiny-logits-float32-int8-conv.pt"
+
+    def test_unknown_backend(self):
+        """Unknown backend names are rejected"""
+        with pytest.raises(ValueError, match="Onbekende inference backend"):
+            create_backend(config_for("tensorrt"), self.model, INPUT_SIZE)
+
+
+class TestFeatureExtractor:
+    """Unit tests for pooled embedding output"""
+
+    def setup_method(self):
+        timm = pytest.importorskip("timm")
+        torch.manual_seed(0)
+        self.model = timm.create_model("convnext_atto", pretrained=False).eval()
+        self.batch = torch.randn(2, 3, 64, 64)
+
+    def test_logits_mode_matches_model(self):
+        """Logits mode keeps the classifier output"""
+        extractor = FeatureExtractor(self.model, "logits").eval()
+        with torch.no_grad():
+            assert torch.equal(extractor(self.batch), self.model(self.batch))
+
+    def test_pooled_embedding_skips_head(self):
+        """Pooled embedding has num_features dims and requested dtype"""
+        extractor = FeatureExtractor(self.model, "embedding", dtype="float16").eval()
+        with torch.no_grad():
+            output = extractor(self.batch)
+        assert output.shape == (2, self.model.num_features)
+        assert output.dtype == torch.float16
+
+    def test_stage_embedding(self):
+        """stageN pools the feature map of an earlier stage"""
+        extractor = FeatureExtractor(self.model, "embedding", layer="stage1").eval()
+        with torch.no_grad():
+            output = extractor(self.batch)
+        assert output.shape == (2, self.model.feature_info[1]["num_chs"])
+
+    def test_invalid_layer(self):
+        """Unknown layer names are rejected"""
+        with pytest.raises(ValueError, match="feature layer"):
+            FeatureExtractor(self.model, "embedding", layer="head")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,152 @@
+"""Unit tests for the micro-batching scheduler"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+import torch
+
+from src.services.batch_scheduler import AsyncBatchScheduler, BatchScheduler
+
+
+class TestBatchScheduler:
+    """Unit tests for BatchScheduler"""
+
+    def test_concurrent_requests_share_one_batch(self):
+        """Concurrent submits are combined and each caller gets its own slice"""
+        batch_sizes = []
+
+        def forward(tensors):
+            batch = torch.cat(tensors)
+            batch_sizes.append(batch.shape[0])
+            return list((batch * 2).split(1))
+
+        scheduler = BatchScheduler(forward, max_batch_size=4, max_wait_ms=200)
+        results = {}
+
+        def caller(i):
+            results[i] = scheduler.submit(torch.full((1, 3), float(i)))
+
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert batch_sizes == [4]
+        for i in range(4):
+            assert torch.equal(results[i], torch.full((1, 3), float(i * 2)))
+        assert scheduler.stats()["grootste_batch"] == 4
+
+    def test_single_request_flushes_after_max_wait(self):
+        """A lone request is processed once the wait window expires"""
+        scheduler = BatchScheduler(lambda items: [x + 1 for x in items], max_wait_ms=1)
+        assert scheduler.submit(1) == 2
+        assert scheduler.stats()["batches"] == 1
+
+    def test_batch_size_one_runs_inline(self):
+        """max_batch_size=1 bypasses the worker thread"""
+        scheduler = BatchScheduler(lambda items: items, max_batch_size=1)
+        assert scheduler.submit("x") == "x"
+        assert scheduler._worker is None
+
+    def test_errors_propagate_to_every_caller(self):
+        """A failing batch raises in the submitting thread"""
+
+        def broken(items):
+            raise RuntimeError("model kapot")
+
+        scheduler = BatchScheduler(broken, max_wait_ms=1)
+        with pytest.raises(RuntimeError, match="model kapot"):
+            scheduler.submit(1)
+
+    def test_batches_overlap_with_max_in_flight(self):
+        """Slow I/O batches run side by side instead of one after another"""
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def slow_call(items):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.3)
+            with lock:
+                active[0] -= 1
+            return [item * 2 for item in items]
+
+        scheduler = BatchScheduler(
+            slow_call, max_batch_size=2, max_wait_ms=1, max_in_flight=4
+        )
+        results = {}
+
+        def caller(i):
+            results[i] = scheduler.submit(i)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        assert results == {i: i * 2 for i in range(8)}
+        assert peak[0] > 1
+        assert elapsed < 4 * 0.3
+        assert scheduler.stats()["batches_in_flight"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
+
+
+class TestAsyncBatchScheduler:
+    """Unit tests for AsyncBatchScheduler"""
+
+    def test_concurrent_submits_share_one_batch(self):
+        """Tasks on one loop are combined and demultiplexed in order"""
+        batches = []
+
+        async def process(items):
+            batches.append(list(items))
+            return [item * 10 for item in items]
+
+        scheduler = AsyncBatchScheduler(process, max_batch_size=4, max_wait_ms=200)
+
+        async def run():
+            return await asyncio.gather(*(scheduler.submit(i) for i in range(4)))
+
+        assert asyncio.run(run()) == [0, 10, 20, 30]
+        assert batches == [[0, 1, 2, 3]]
+        assert scheduler.stats()["grootste_batch"] == 4
+
+    def test_partial_batch_flushes_after_max_wait(self):
+        """Fewer items than the batch size are sent once the linger expires"""
+        scheduler = AsyncBatchScheduler(
+            lambda items: asyncio.sleep(0, [x + 1 for x in items]),
+            max_batch_size=8,
+            max_wait_ms=5,
+        )
+
+        async def run():
+            return await asyncio.gather(scheduler.submit(1), scheduler.submit(2))
+
+        assert asyncio.run(run()) == [2, 3]
+        assert scheduler.stats()["batches"] == 1
+
+    def test_errors_propagate_to_every_caller(self):
+        """A failing batch raises in each awaiting task"""
+
+        async def broken(items):
+            raise RuntimeError("gemini kapot")
+
+        scheduler = AsyncBatchScheduler(broken, max_batch_size=2, max_wait_ms=1)
+
+        async def run():
+            return await asyncio.gather(
+                scheduler.submit(1), scheduler.submit(2), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
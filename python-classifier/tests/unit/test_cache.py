@@ -0,0 +1,416 @@
+"""Unit tests for classification caches"""
+
+import dataclasses
+import json
+import os
+import random
+import threading
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+import torch
+from PIL import Image
+
+from src.cache import (
+    EmbeddingCache,
+    EmbeddingIndex,
+    NearDuplicateIndex,
+    TTLCache,
+    config_fingerprint,
+    content_key,
+    prompt_key,
+    quantize_stats,
+)
+from src.cache.embedding_cache import worker_path
+from src.config.app_config import AppConfig
+from src.features.perceptual_hash import dhash, hamming_distance
+from src.services.implementations.gemini_service import GeminiService
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    """Unit tests for the LRU/TTL cache"""
+
+    def test_hit_and_miss_counters(self):
+        """Lookups are counted as hits and misses"""
+        cache = TTLCache(max_size=4)
+        cache.put("a", 1)
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    def test_lru_eviction(self):
+        """Least recently used entry is evicted first"""
+        cache = TTLCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        """Entries expire after the TTL"""
+        clock = FakeClock()
+        cache = TTLCache(max_size=2, ttl_seconds=10, clock=clock)
+        cache.put("a", 1)
+        clock.now = 9.9
+        assert cache.get("a") == 1
+        clock.now = 10.0
+        assert cache.get("a") is None
+        assert cache.stats()["verlopen"] == 1
+        assert len(cache) == 0
+
+    def test_zero_size_disables_cache(self):
+        """max_size=0 never stores anything"""
+        cache = TTLCache(max_size=0)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+
+
+class TestContentKey:
+    """Unit tests for content addressing"""
+
+    def test_identical_bytes_same_key(self):
+        assert content_key(b"foto") == content_key(b"foto")
+        assert content_key(b"foto") != content_key(b"foto2")
+        assert len(content_key(b"foto")) == 32
+
+
+class TestNearDuplicateIndex:
+    """Unit tests for the multi-index Hamming index"""
+
+    def test_matches_brute_force(self):
+        """Index returns the same nearest match as a linear scan"""
+        rng = random.Random(42)
+        index = NearDuplicateIndex(max_distance=4, max_size=50_000)
+        hashes = [rng.getrandbits(64) for _ in range(20_000)]
+        for i, value in enumerate(hashes):
+            index.add(value, i)
+
+        for value in rng.sample(hashes, 50):
+            flipped = value ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+            payload, distance = index.search(flipped)
+            best = min(hamming_distance(flipped, h) for h in hashes)
+            assert distance == best
+            assert hamming_distance(hashes[payload], flipped) == best
+
+    def test_no_match_beyond_max_distance(self):
+        """Hashes further away than max_distance are not returned"""
+        index = NearDuplicateIndex(max_distance=2)
+        index.add(0, "a")
+        assert index.search(0b111) is None
+        assert index.search(0b11) == ("a", 2)
+
+    def test_evicts_oldest_when_full(self):
+        """Oldest entry is dropped from every band table"""
+        index = NearDuplicateIndex(max_distance=1, max_size=2)
+        index.add(1, "a")
+        index.add(1 << 40, "b")
+        index.add(1 << 20, "c")
+        assert len(index) == 2
+        assert index.search(1) is None
+
+    def test_entries_expire_after_ttl(self):
+        """Expired hashes are not matched and are dropped on the next add"""
+        clock = FakeClock()
+        index = NearDuplicateIndex(max_distance=1, ttl_seconds=10, clock=clock)
+        index.add(1, "a")
+        clock.now = 5.0
+        index.add(1 << 40, "b")
+        clock.now = 10.0
+        assert index.search(1) is None
+        assert index.search(1 << 40) == ("b", 0)
+        index.add(1 << 20, "c")
+        assert len(index) == 2
+        assert index.expirations == 1
+
+
+def clustered_vectors(n=3000, dim=256, clusters=40, seed=0):
+    """Vectoren rond vaste centra, zoals foto's van dezelfde soort afval"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=n)
+    vectors = centers[labels] + 0.3 * rng.normal(size=(n, dim))
+    return vectors.astype(np.float32), labels
+
+
+class TestEmbeddingIndex:
+    """Unit tests for the brute force, IVF and PQ nearest-neighbour index"""
+
+    @pytest.mark.parametrize(
+        "mode, pq_m", [("brute", 0), ("ivf", 0), ("brute", 32), ("ivf", 32)]
+    )
+    def test_recall_against_brute_force(self, mode, pq_m):
+        """Nearest neighbour of a perturbed vector is its own cluster"""
+        vectors, labels = clustered_vectors()
+        index = EmbeddingIndex(
+            mode=mode, pq_m=pq_m, nlist=16, nprobe=4, train_size=1000
+        )
+        for vector, label in zip(vectors, labels):
+            index.add(vector, int(label))
+
+        rng = np.random.default_rng(1)
+        queries = rng.choice(len(vectors), 100, replace=False)
+        hits = sum(
+            index.search(vectors[q] + 0.05 * rng.normal(size=256), 1)[0][1]
+            == labels[q]
+            for q in queries
+        )
+        assert index.trained == (mode == "ivf" or pq_m > 0)
+        assert hits >= 95
+
+    def test_pq_uses_less_memory(self):
+        """Product quantization drops the raw float32 vectors after training"""
+        vectors, _ = clustered_vectors(n=1200)
+        raw, pq = EmbeddingIndex(), EmbeddingIndex(pq_m=16, train_size=1000)
+        for i, vector in enumerate(vectors):
+            raw.add(vector, i)
+            pq.add(vector, i)
+
+        assert pq.memory_bytes() < raw.memory_bytes() / 2
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        """A reloaded index answers identically and keeps accepting vectors"""
+        vectors, labels = clustered_vectors(n=1500)
+        index = EmbeddingIndex(mode="ivf", pq_m=32, nlist=16, train_size=1000)
+        for vector, label in zip(vectors[:1200], labels[:1200]):
+            index.add(vector, int(label))
+        path = str(tmp_path / "index.npz")
+        index.save(path, {"fingerprint": "model"})
+
+        loaded = EmbeddingIndex(mode="ivf", pq_m=32, nlist=16, train_size=1000)
+        assert loaded.load(path) == {"fingerprint": "model"}
+        assert len(loaded) == 1200 and loaded.trained
+        for q in range(0, 1200, 100):
+            assert loaded.search(vectors[q], 3) == index.search(vectors[q], 3)
+
+        # Na laden worden nieuwe vectoren direct toegewezen en gecodeerd
+        for vector, label in zip(vectors[1200:], labels[1200:]):
+            loaded.add(vector, int(label))
+        assert len(loaded) == 1500
+        assert loaded.search(vectors[1400], 1)[0][1] == labels[1400]
+
+        with pytest.raises(ValueError, match="pq_m"):
+            EmbeddingIndex(mode="ivf", pq_m=0).load(path)
+
+    @pytest.mark.parametrize("mode, pq_m", [("brute", 0), ("ivf", 16)])
+    def test_full_index_evicts_oldest(self, mode, pq_m):
+        """A full index keeps learning: the oldest vectors make room"""
+        vectors, labels = clustered_vectors(n=1500)
+        index = EmbeddingIndex(
+            mode=mode, pq_m=pq_m, nlist=16, nprobe=16, train_size=500, max_size=1000
+        )
+        for i, vector in enumerate(vectors):
+            assert index.add(vector, i)
+
+        assert len(index) <= 1000
+        assert index.evictions == 1500 - len(index)
+        # Nieuwste vector is vindbaar, de oudste is verdwenen
+        assert index.search(vectors[-1], 1)[0][1] == 1499
+        assert all(i >= index.evictions for _, i in index.search(vectors[0], 20))
+
+    def test_concurrent_saves_stay_loadable(self, tmp_path):
+        """Writers to the same path never share a temp file"""
+        path = str(tmp_path / "index.npz")
+        indexes = []
+        for seed in range(2):
+            index = EmbeddingIndex()
+            for i, vector in enumerate(clustered_vectors(n=200, seed=seed)[0]):
+                index.add(vector, i)
+            indexes.append(index)
+
+        def save_often(index):
+            for _ in range(20):
+                index.save(path)
+
+        threads = [threading.Thread(target=save_often, args=(i,)) for i in indexes]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert os.listdir(tmp_path) == ["index.npz"]
+        loaded = EmbeddingIndex()
+        loaded.load(path)
+        assert len(loaded) == 200
+
+    def test_rejects_unknown_mode_and_wrong_dimension(self):
+        """Configuration and dimension errors are ValueErrors"""
+        with pytest.raises(ValueError, match="modus"):
+            EmbeddingIndex(mode="hnsw")
+        index = EmbeddingIndex()
+        index.add(np.ones(8), "a")
+        with pytest.raises(ValueError, match="dimensie"):
+            index.add(np.ones(4), "b")
+
+
+class TestEmbeddingCache:
+    """Neighbour agreement vote in front of Gemini"""
+
+    def test_hit_requires_agreeing_neighbours(self):
+        """Only k similar neighbours that agree on the type give a hit"""
+        cache = EmbeddingCache()
+        rng = np.random.default_rng(3)
+        base = rng.normal(size=64)
+        glas = [{"type": "Glas", "confidence": 0.9}]
+        textiel = [{"type": "Textiel", "confidence": 0.7}]
+
+        with patch.object(cache, "enabled", True), patch.object(
+            cache, "k", 3
+        ), patch.object(cache, "agreement", 0.8), patch.object(
+            cache, "_index", EmbeddingIndex()
+        ):
+            for _ in range(2):
+                cache.put(base + 0.01 * rng.normal(size=64), glas)
+            assert cache.get(base) is None  # nog te weinig buren
+
+            cache.put(base + 0.01 * rng.normal(size=64), textiel)
+            assert cache.get(base) is None  # 2 tegen 1: geen overeenstemming
+
+            cache.put(base + 0.01 * rng.normal(size=64), glas)
+            with patch.object(cache, "k", 4), patch.object(cache, "agreement", 0.7):
+                result = cache.get(torch.tensor(base).unsqueeze(0))
+                assert result == glas
+                result[0]["confidence"] = 0.0  # kopie, niet de opgeslagen payload
+                assert cache.get(base) == glas
+
+            assert cache.get(-base) is None  # niets gelijkends
+
+    def test_config_change_empties_index(self):
+        """Labels from an older afval config are never served after a reload"""
+        cache = EmbeddingCache()
+        vector = np.random.default_rng(5).normal(size=32)
+        glas = [{"type": "Glas", "confidence": 0.9}]
+
+        with patch.object(cache, "enabled", True), patch.object(
+            cache, "k", 1
+        ), patch.object(cache, "_index", EmbeddingIndex()), patch.object(
+            cache, "_config", None
+        ):
+            cache.put(vector, glas, "oud")
+            assert cache.get(vector, "oud") == glas
+            assert cache.get(vector, "nieuw") is None
+
+            cache.put(-vector, glas, "nieuw")
+            assert len(cache._index) == 1
+            assert cache.get(vector, "nieuw") is None
+
+
+    def test_worker_gets_own_file_seeded_from_shared(self, tmp_path):
+        """Pre-fork workers save to their own file but start from the shared one"""
+        shared = str(tmp_path / "index.npz")
+        assert worker_path(shared) == shared
+        with patch.dict(os.environ, {"WORKER_SLOT": "2"}):
+            assert worker_path(shared) == str(tmp_path / "index.worker2.npz")
+
+        index = EmbeddingIndex()
+        index.add(np.ones(8), [{"type": "Glas", "confidence": 0.9}])
+        index.save(shared, {"fingerprint": EmbeddingCache().fingerprint})
+
+        config = dataclasses.replace(
+            AppConfig(), embedding_index="brute", embedding_index_path=shared
+        )
+        with patch.dict(os.environ, {"WORKER_SLOT": "2"}):
+            # Losse instantie naast de singleton, zoals in een verse worker
+            cache = type(EmbeddingCache())(config)
+        assert len(cache._index) == 1
+        cache.put(-np.ones(8), [{"type": "Textiel", "confidence": 0.8}])
+        cache.save()
+        assert sorted(os.listdir(tmp_path)) == ["index.npz", "index.worker2.npz"]
+
+
+class TestPerceptualHash:
+    """Unit tests for dHash"""
+
+    def test_resized_image_has_close_hash(self):
+        """Rescaled copies of the same scene stay within a few bits"""
+        afbeelding = Image.radial_gradient("L").convert("RGB").resize((640, 480))
+        kleiner = afbeelding.resize((320, 240))
+        assert hamming_distance(dhash(afbeelding), dhash(kleiner)) <= 4
+
+    def test_different_images_differ(self):
+        """Unrelated images differ in many bits"""
+        gradient = Image.linear_gradient("L").convert("RGB").rotate(90)
+        gespiegeld = gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+        assert hamming_distance(dhash(gradient), dhash(gespiegeld)) > 10
+
+
+class TestPromptCacheKey:
+    """Unit tests for the quantized Gemini prompt key"""
+
+    STATS = {"mean": 0.12344, "std": -0.0001, "shape": "torch.Size([1, 1000])"}
+
+    def test_close_stats_share_key(self):
+        """Stats that round to the same values produce the same key"""
+        other = {**self.STATS, "mean": 0.12341, "std": 0.0001}
+        fingerprint = config_fingerprint(["Glas"], "{lokaal_resultaat}", "m")
+        assert prompt_key(quantize_stats(self.STATS, 2), fingerprint) == prompt_key(
+            quantize_stats(other, 2), fingerprint
+        )
+
+    def test_precision_separates_stats(self):
+        """Higher precision keeps slightly different stats apart"""
+        other = {**self.STATS, "mean": 0.12}
+        assert quantize_stats(self.STATS, 2) == quantize_stats(other, 2)
+        assert quantize_stats(self.STATS, 4) != quantize_stats(other, 4)
+
+    def test_config_change_changes_key(self):
+        """Changing waste types, templates or model invalidates cached prompts"""
+        stats = quantize_stats(self.STATS, 2)
+        base = config_fingerprint(["Glas"], "t", "m", "b")
+        for fingerprint in (
+            config_fingerprint(["Glas", "Textiel"], "t", "m", "b"),
+            config_fingerprint(["Glas"], "t2", "m", "b"),
+            config_fingerprint(["Glas"], "t", "m2", "b"),
+            config_fingerprint(["Glas"], "t", "m", "b2"),
+        ):
+            assert prompt_key(stats, fingerprint) != prompt_key(stats, base)
+
+
+class TestGeminiPromptCache:
+    """GeminiService skips the API for prompts it has already answered"""
+
+    def test_repeated_stats_hit_cache(self):
+        """Second call with near-identical features is served from the cache"""
+        service = GeminiService()
+        model = MagicMock()
+        model.generate_content.return_value.text = json.dumps(
+            [{"type": "Textiel", "confidence": 0.7}]
+        )
+        features = torch.linspace(-3.0, 5.0, 1000).unsqueeze(0)
+        before = service.prompt_cache.stats()
+
+        with patch.object(service, "model", model), patch.object(
+            service, "_initialized", True
+        ):
+            first = service.classify(features)
+            second = service.classify(features + 1e-6)
+
+        after = service.prompt_cache.stats()
+        assert first == second == [{"type": "Textiel", "confidence": 0.7}]
+        assert model.generate_content.call_count == 1
+        assert after["hits"] == before["hits"] + 1
+        assert after["gemini_calls"] == before["gemini_calls"] + 1
+        assert after["latency_bespaard_seconden"] >= before["latency_bespaard_seconden"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
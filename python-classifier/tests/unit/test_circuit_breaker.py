@@ -0,0 +1,109 @@
+"""Unit tests for the Gemini circuit breaker and hedged calls"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from src.exceptions.service_exceptions import ServiceNotAvailableError
+from src.services.circuit_breaker import DICHT, HALF_OPEN, OPEN, CircuitBreaker
+from src.services.implementations.gemini_service import GeminiService
+
+
+class TestCircuitBreaker:
+    """Unit tests for CircuitBreaker"""
+
+    def test_opens_on_error_rate(self):
+        """Failures above the threshold open the circuit and reject calls"""
+        breaker = CircuitBreaker("test", failure_rate=0.5, window=4, min_calls=4)
+        for success in (True, False, True, False):
+            breaker.record(breaker.before_call(), success, 0.01)
+
+        assert breaker.state == OPEN
+        with pytest.raises(ServiceNotAvailableError, match="circuit open"):
+            breaker.before_call()
+        assert breaker.stats()["geweigerd"] == 1
+
+    def test_slow_calls_count_as_failures(self):
+        """Successful but slow calls trip the breaker as well"""
+        breaker = CircuitBreaker(
+            "test", slow_call_seconds=1.0, failure_rate=0.5, window=2, min_calls=2
+        )
+        breaker.record(breaker.before_call(), True, 5.0)
+        assert breaker.state == DICHT
+        breaker.record(breaker.before_call(), True, 5.0)
+        assert breaker.state == OPEN
+
+    def test_half_open_probe_closes_circuit(self):
+        """After the open period one probe is allowed; success closes again"""
+        breaker = CircuitBreaker("test", window=1, min_calls=1, open_seconds=0.05)
+        breaker.record(breaker.before_call(), False, 0.0)
+        time.sleep(0.06)
+
+        probe = breaker.before_call()
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(ServiceNotAvailableError, match="half open"):
+            breaker.before_call()
+
+        breaker.record(probe, True, 0.01)
+        assert breaker.state == DICHT
+        breaker.before_call()
+
+    def test_failed_probe_reopens(self):
+        """A failing probe keeps the circuit open for another period"""
+        breaker = CircuitBreaker("test", window=1, min_calls=1, open_seconds=0.05)
+        breaker.record(breaker.before_call(), False, 0.0)
+        time.sleep(0.06)
+        breaker.record(breaker.before_call(), False, 0.0)
+
+        assert breaker.state == OPEN
+        assert breaker.stats()["keren_geopend"] == 2
+
+    def test_late_calls_from_before_opening_are_ignored(self):
+        """Only the probe decides half open; stale outcomes do not"""
+        breaker = CircuitBreaker("test", window=2, min_calls=2, open_seconds=0.05)
+        slow_success = breaker.before_call()
+        stale_failure = breaker.before_call()
+        breaker.record(breaker.before_call(), False, 0.0)
+        breaker.record(breaker.before_call(), False, 0.0)
+        assert breaker.state == OPEN
+        time.sleep(0.06)
+
+        probe = breaker.before_call()
+        breaker.record(slow_success, True, 0.01)
+        breaker.record(stale_failure, False, 0.0)
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(ServiceNotAvailableError, match="half open"):
+            breaker.before_call()
+
+        breaker.record(probe, True, 0.01)
+        assert breaker.state == DICHT
+        assert breaker.stats()["verouderd_genegeerd"] == 2
+
+
+class TestHedgedGeminiCall:
+    """Hedged retry in GeminiService"""
+
+    def test_hedge_returns_faster_duplicate(self):
+        """A slow first call is overtaken by the hedge, which wins"""
+        service = GeminiService()
+        calls = []
+
+        async def submit(stats):
+            calls.append(stats)
+            await asyncio.sleep(2.0 if len(calls) == 1 else 0.01)
+            return [{"type": "Glas", "confidence": 0.9 if len(calls) == 1 else 0.8}]
+
+        async def run():
+            start = time.perf_counter()
+            result = await service._hedged({"mean": 0.0})
+            return result, time.perf_counter() - start
+
+        with patch.object(service.app_config, "gemini_hedge_after_seconds", 0.05), \
+                patch.object(service.async_batcher, "submit", side_effect=submit):
+            result, elapsed = asyncio.run(run())
+
+        assert len(calls) == 2
+        assert elapsed < 1.0
+        assert result == [{"type": "Glas", "confidence": 0.8}]
@@ -0,0 +1,275 @@
+"""Unit tests for the async Gemini client against a local stub server"""
+
+import asyncio
+import dataclasses
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+import torch
+
+from src.config.app_config import AppConfig
+from src.exceptions.service_exceptions import ServiceNotAvailableError
+from src.services.batch_scheduler import AsyncBatchScheduler
+from src.services.circuit_breaker import CircuitBreaker
+from src.services.implementations.gemini_client import AsyncGeminiClient
+from src.services.implementations.gemini_service import GeminiService
+from tests.gemini_stub import GeminiStub
+
+
+def make_client(stub: GeminiStub, **kwargs) -> AsyncGeminiClient:
+    return AsyncGeminiClient(
+        api_key="stub-key", model="gemini-test", base_url=stub.url, **kwargs
+    )
+
+
+class TestAsyncGeminiClient:
+    """Async client behaviour: pooling, concurrency ceiling, timeouts"""
+
+    def test_generate_returns_candidate_text(self):
+        """Request format and response parsing match generateContent"""
+        with GeminiStub() as stub:
+            client = make_client(stub)
+            text = asyncio.run(client.generate("hallo"))
+
+        assert text == '[{"type": "Grofvuil", "confidence": 0.8}]'
+        request = stub.requests[0]
+        assert request["path"] == "/v1beta/models/gemini-test:generateContent"
+        assert request["api_key"] == "stub-key"
+        assert request["body"]["contents"][0]["parts"][0]["text"] == "hallo"
+
+    def test_many_calls_in_flight_on_one_loop(self):
+        """Hundreds of concurrent calls overlap on a single event loop"""
+        with GeminiStub(delay=0.3) as stub:
+            client = make_client(stub, max_concurrency=200)
+
+            async def run():
+                start = time.perf_counter()
+                tasks = [client.generate(f"prompt {i}") for i in range(200)]
+                return await asyncio.gather(*tasks), time.perf_counter() - start
+
+            results, elapsed = asyncio.run(run())
+
+        assert len(results) == 200
+        assert stub.max_active > 50
+        assert elapsed < 200 * 0.3 / 10
+
+    def test_concurrency_ceiling(self):
+        """No more than max_concurrency requests reach the server at once"""
+        with GeminiStub(delay=0.05) as stub:
+            client = make_client(stub, max_concurrency=4)
+
+            async def run():
+                await asyncio.gather(*(client.generate("x") for _ in range(20)))
+
+            asyncio.run(run())
+
+        assert len(stub.requests) == 20
+        assert stub.max_active <= 4
+
+    def test_timeout_raises_service_error(self):
+        """A slow Gemini response becomes ServiceNotAvailableError"""
+        with GeminiStub(delay=1.0) as stub:
+            client = make_client(stub, timeout_seconds=0.2)
+            with pytest.raises(ServiceNotAvailableError, match="timeout"):
+                asyncio.run(client.generate("x"))
+
+        assert client.stats()["timeouts"] == 1
+
+    def test_http_error_raises_service_error(self):
+        """Non-2xx responses are surfaced as ServiceNotAvailableError"""
+        with GeminiStub(status=429) as stub:
+            client = make_client(stub)
+            with pytest.raises(ServiceNotAvailableError, match="429"):
+                asyncio.run(client.generate("x"))
+
+        assert client.stats()["fouten"] == 1
+
+    def test_session_rebuilt_for_new_event_loop(self):
+        """The pooled session is per loop, so repeated asyncio.run works"""
+        with GeminiStub() as stub:
+            client = make_client(stub)
+            asyncio.run(client.generate("a"))
+            asyncio.run(client.generate("b"))
+
+        assert client.stats()["calls"] == 2
+
+
+class TestGeminiServiceAsync:
+    """GeminiService.classify_async end-to-end against the stub"""
+
+    def test_classify_async_validates_response(self):
+        """Stub output is parsed and validated like the blocking path"""
+        service = GeminiService()
+        features = torch.linspace(-7.0, 9.0, 1000).unsqueeze(0)
+
+        with GeminiStub(classificaties=[{"type": "Textiel", "confidence": 0.6}]) as stub:
+            client = make_client(stub)
+            with patch.object(service, "async_client", client):
+                result = asyncio.run(service.classify_async(features))
+
+        assert result == [{"type": "Textiel", "confidence": 0.6}]
+        assert len(stub.requests) == 1
+
+    def test_batched_classify_async_uses_one_request(self):
+        """Concurrent images share one prompt and get their own section back"""
+        service = GeminiService()
+        batcher = AsyncBatchScheduler(
+            service._generate_batch_async, max_batch_size=3, max_wait_ms=500
+        )
+        features = [
+            torch.linspace(-3.0 - i, 5.0 + i, 1000).unsqueeze(0) for i in range(3)
+        ]
+        reply = {
+            "1": [{"type": "Glas", "confidence": 0.9}],
+            "2": [{"type": "Papier en karton", "confidence": 0.8}],
+            "3": [{"type": "Organisch", "confidence": 0.7}],
+        }
+
+        async def run():
+            return await asyncio.gather(*(service.classify_async(f) for f in features))
+
+        with GeminiStub(classificaties=reply) as stub:
+            client = make_client(stub)
+            with patch.object(service, "async_client", client), patch.object(
+                service, "async_batcher", batcher
+            ), patch.object(service.prompt_cache, "enabled", False):
+                results = asyncio.run(run())
+
+        assert results == [reply["1"], reply["2"], reply["3"]]
+        assert len(stub.requests) == 1
+        prompt = stub.requests[0]["body"]["contents"][0]["parts"][0]["text"]
+        assert "AFBEELDING 3:" in prompt
+        assert prompt.count("BESCHIKBARE AFVAL CATEGORIEËN") == 1
+
+    def test_missing_section_is_retried_alone(self):
+        """An image absent from the bundled reply falls back to a single prompt"""
+        service = GeminiService()
+        stats = [service._prompt_key(torch.randn(1, 1000))[1] for _ in range(2)]
+        replies = iter(
+            [
+                '{"1": [{"type": "Glas", "confidence": 0.9}]}',
+                '[{"type": "Textiel", "confidence": 0.6}]',
+            ]
+        )
+        prompts = []
+
+        def generate(prompt):
+            prompts.append(prompt)
+            return next(replies)
+
+        with patch.object(service, "_generate", side_effect=generate):
+            results = service._generate_batch(stats)
+
+        assert results == [
+            [{"type": "Glas", "confidence": 0.9}],
+            [{"type": "Textiel", "confidence": 0.6}],
+        ]
+        assert "AFBEELDING 2:" in prompts[0]
+        assert "AFBEELDING" not in prompts[1]
+
+
+class TestGeminiWarmup:
+    """Warmup prepares the client that requests actually use"""
+
+    def test_async_warmup_connects_on_worker_loop(self):
+        """With GEMINI_ASYNC the REST client is built and connected on the loop"""
+        service = GeminiService()
+        with GeminiStub() as stub:
+            config = dataclasses.replace(
+                AppConfig(),
+                gemini_async=True,
+                gemini_api_key="stub-key",
+                gemini_model="gemini-test",
+                gemini_base_url=stub.url,
+            )
+
+            async def run():
+                loop = asyncio.get_running_loop()
+                await asyncio.to_thread(service.warmup, loop)
+                client = service.async_client
+                assert client._loop is loop
+                await client.generate("na warmup")
+                await client.aclose()
+
+            with patch.object(service, "app_config", config), patch.object(
+                service, "async_client", None
+            ), patch.object(service, "_lazy_init") as lazy_init:
+                asyncio.run(run())
+
+        lazy_init.assert_not_called()
+        assert [r["path"] for r in stub.requests] == [
+            "/v1beta/models/gemini-test",
+            "/v1beta/models/gemini-test:generateContent",
+        ]
+
+    def test_blocking_warmup_initialises_sdk(self):
+        """Without GEMINI_ASYNC the SDK path is initialised as before"""
+        service = GeminiService()
+        config = dataclasses.replace(AppConfig(), gemini_async=False)
+        with patch.object(service, "app_config", config), patch.object(
+            service, "_lazy_init"
+        ) as lazy_init:
+            service.warmup()
+        lazy_init.assert_called_once()
+
+    def test_failed_connect_is_service_error(self):
+        """An unreachable API surfaces as ServiceNotAvailableError"""
+        with GeminiStub(status=403) as stub:
+            client = make_client(stub)
+            with pytest.raises(ServiceNotAvailableError, match="HTTP 403"):
+                asyncio.run(client.connect())
+
+
+class TestGeminiServiceErrors:
+    """SDK and parse failures surface as ServiceNotAvailableError"""
+
+    def test_raising_sdk_is_service_error_and_breaker_failure(self):
+        """A raw SDK exception is mapped, so callers can fall back locally"""
+        service = GeminiService()
+        model = MagicMock()
+        model.generate_content.side_effect = RuntimeError("503 UNAVAILABLE")
+        breaker = CircuitBreaker("test", min_calls=100)
+        features = torch.linspace(-11.0, 2.0, 1000).unsqueeze(0)
+
+        with patch.object(service, "model", model), patch.object(
+            service, "_initialized", True
+        ), patch.object(service, "breaker", breaker), patch.object(
+            service.prompt_cache, "enabled", False
+        ):
+            with pytest.raises(ServiceNotAvailableError, match="503 UNAVAILABLE"):
+                service.classify(features)
+
+        assert breaker.stats()["foutpercentage"] == 1.0
+
+    def test_malformed_json_is_service_error_on_both_paths(self):
+        """Non-JSON or non-list replies are failed calls, not a 500"""
+        service = GeminiService()
+        features = torch.linspace(-13.0, 4.0, 1000).unsqueeze(0)
+
+        for reply in ("Sorry, ik kan dit niet classificeren", '{"type": "Glas"}'):
+            model = MagicMock()
+            model.generate_content.return_value.text = reply
+            breaker = CircuitBreaker("test", min_calls=100)
+            with patch.object(service, "model", model), patch.object(
+                service, "_initialized", True
+            ), patch.object(service, "breaker", breaker), patch.object(
+                service.prompt_cache, "enabled", False
+            ):
+                with pytest.raises(ServiceNotAvailableError, match="Gemini antwoord"):
+                    service.classify(features)
+            assert breaker.stats()["foutpercentage"] == 1.0
+
+        client = MagicMock()
+        client.generate = MagicMock(side_effect=lambda prompt: _reply("geen json"))
+        breaker = CircuitBreaker("test", min_calls=100)
+        with patch.object(service, "async_client", client), patch.object(
+            service, "breaker", breaker
+        ), patch.object(service.prompt_cache, "enabled", False):
+            with pytest.raises(ServiceNotAvailableError, match="geen geldige JSON"):
+                asyncio.run(service.classify_async(features))
+        assert breaker.stats()["foutpercentage"] == 1.0
+
+
+async def _reply(text: str) -> str:
+    return text
@@ -1,17 +1,63 @@
 """Unit tests for pipeline module"""
 
+import asyncio
+import dataclasses
+import os
+import threading
+import time
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import torch
 
+from src.cache.embedding_cache import EmbeddingCache
+from src.cache.embedding_index import EmbeddingIndex
+from src.config.app_config import AppConfig
+from src.config.config_registry import ConfigRegistry
+from src.exceptions.validation_exceptions import ValidationError
+from src.monitoring.metrics import Metrics
+from src.monitoring.profiling import Profiler, ProfileStore
+from src.monitoring.request_timing import RequestTiming
 from src.pipeline import (
+    BRON_FALLBACK,
+    BRON_INDEX,
+    BRON_LOKAAL,
+    LOKALE_FALLBACK,
+    classificatie_bron,
     extract_swin_features,
     classify_with_gemini,
     execute_classification,
+    execute_classification_async,
+    fallback_or_raise,
     classification_pipeline,
+    debug_pipeline,
+    add_pipeline_step,
+    create_custom_pipeline,
     validate_services
 )
 from src.exceptions.service_exceptions import ServiceNotAvailableError
+from src.features.prepared_image import PreparedImage
+from src.services.pipeline_engine import Done, Stage, StagedPipeline
+from src.services.worker_pools import BoundedExecutor
+
+
+def make_services(perceptual_hash):
+    """Mock factory whose services are ready and return fixed results"""
+    mock_service = MagicMock()
+    mock_service.is_ready.return_value = True
+    mock_service.prepare.return_value = PreparedImage(torch.zeros(1), perceptual_hash)
+    mock_service.extract_prepared.return_value = torch.randn(1, 1000)
+    mock_service.classify.side_effect = lambda features: [
+        {"type": "Papier en karton", "confidence": 0.8}
+    ]
+    mock_factory = MagicMock()
+    mock_factory.create_all_services.return_value = {
+        'lokaal': mock_service,
+        'gemini': mock_service
+    }
+    mock_factory.create_lokale_service.return_value = mock_service
+    mock_factory.create_gemini_service.return_value = mock_service
+    return mock_factory, mock_service
 
 
 class TestPipeline:
@@ -158,4 +204,464 @@ class TestPipeline:
         assert result == mock_result
         mock_factory_class.assert_called_once()
         mock_factory.create_gemini_service.assert_called_once()
-        mock_gemini_service.classify.assert_called_once()
\ No newline at end of file
+        mock_gemini_service.classify.assert_called_once()
+
+    @patch('src.pipeline.ServiceFactory')
+    def test_execute_classification_async_runs_off_event_loop(self, mock_factory_class):
+        """Test that inference runs in worker threads and Gemini is awaited on the loop"""
+        loop_thread = {}
+        worker_threads = []
+
+        def record(result):
+            def side_effect(*args):
+                worker_threads.append(threading.current_thread())
+                return result
+            return side_effect
+
+        mock_factory, mock_service = make_services(0x1111_2222_3333_4444)
+        mock_service.prepare.side_effect = record(mock_service.prepare.return_value)
+        mock_service.extract_prepared.side_effect = record(torch.randn(1, 1000))
+        mock_service.classify_async = AsyncMock(
+            return_value=[{"type": "Glas", "confidence": 0.9}]
+        )
+        mock_factory_class.return_value = mock_factory
+
+        async def run():
+            loop_thread["thread"] = threading.current_thread()
+            return await execute_classification_async(b"fake_image_data")
+
+        result = asyncio.run(run())
+
+        assert result == [{"type": "Glas", "confidence": 0.9}]
+        # Inference in worker threads, Gemini wordt op de loop zelf afgewacht
+        assert len(worker_threads) == 2
+        assert all(t is not loop_thread["thread"] for t in worker_threads)
+        mock_service.classify_async.assert_awaited_once()
+
+    @patch('src.pipeline.ServiceFactory')
+    def test_execute_classification_uses_result_cache(self, mock_factory_class):
+        """Test that identical bytes skip the pipeline unless the cache is bypassed"""
+        mock_factory, mock_service = make_services(0x5555_6666_7777_8888)
+        mock_factory_class.return_value = mock_factory
+
+        afbeelding = b"cache_test_image_bytes"
+        first = execute_classification(afbeelding)
+        first[0]["confidence"] = 0.0  # callers mogen de cache niet muteren
+        second = execute_classification(afbeelding)
+        third = execute_classification(afbeelding, gebruik_cache=False)
+
+        assert second == [{"type": "Papier en karton", "confidence": 0.8}]
+        assert third == second
+        assert mock_service.prepare.call_count == 2
+        assert mock_service.extract_prepared.call_count == 2
+
+    @patch('src.pipeline.ServiceFactory')
+    def test_execute_classification_reuses_near_duplicate(self, mock_factory_class):
+        """Test that a photo with a close perceptual hash skips ConvNeXt and Gemini"""
+        mock_factory, mock_service = make_services(0x0123_4567_89AB_CDEF)
+        mock_factory_class.return_value = mock_factory
+        execute_classification(b"dump_site_photo_1")
+
+        # Zelfde stapel grofvuil, andere hoek: hash verschilt 2 bits
+        near_hash = 0x0123_4567_89AB_CDEF ^ 0b101
+        mock_service.prepare.return_value = PreparedImage(torch.zeros(1), near_hash)
+        result = execute_classification(b"dump_site_photo_2")
+
+        assert result == [{"type": "Papier en karton", "confidence": 0.8}]
+        assert mock_service.prepare.call_count == 2
+        assert mock_service.extract_prepared.call_count == 1
+        assert mock_service.classify.call_count == 1
+
+    @patch('src.pipeline.ConfigRegistry')
+    @patch('src.pipeline.ServiceFactory')
+    def test_config_reload_bypasses_cached_results(self, mock_factory_class, mock_registry):
+        """Test that results cached under an older afval config are not served"""
+        mock_factory, mock_service = make_services(0x7777_0000_1111_2222)
+        mock_factory_class.return_value = mock_factory
+        mock_registry.return_value.app_config = AppConfig()
+        mock_registry.return_value.current.return_value.fingerprint = "config-a"
+
+        execute_classification(b"reload_photo")
+        execute_classification(b"reload_photo")
+        assert mock_service.classify.call_count == 1
+
+        mock_registry.return_value.current.return_value.fingerprint = "config-b"
+        execute_classification(b"reload_photo")
+        # Ook een bijna-duplicaat komt niet uit de cache van de oude config
+        assert mock_service.classify.call_count == 2
+        assert mock_service.extract_prepared.call_count == 2
+
+    @patch('src.pipeline.ServiceFactory')
+    def test_similar_embedding_skips_gemini(self, mock_factory_class):
+        """Test that a visually similar, already labelled photo skips Gemini"""
+        mock_factory, mock_service = make_services(0x5A5A_1234_C3C3_9876)
+        embedding = torch.randn(1, 768)
+        mock_service.extract_prepared.return_value = embedding
+        mock_service.classify_async = AsyncMock(
+            return_value=[{"type": "Papier en karton", "confidence": 0.8}]
+        )
+        mock_factory_class.return_value = mock_factory
+        cache = EmbeddingCache()
+
+        async def run(afbeelding):
+            result = await execute_classification_async(afbeelding)
+            return result, classificatie_bron.get()
+
+        with patch.object(cache, "enabled", True), patch.object(
+            cache, "k", 1
+        ), patch.object(cache, "_index", EmbeddingIndex()):
+            asyncio.run(run(b"labelled_photo"))
+            # Andere foto (hash ver weg), bijna dezelfde embedding
+            mock_service.prepare.return_value = PreparedImage(
+                torch.zeros(1), 0xA5A5_EDCB_3C3C_6789
+            )
+            mock_service.extract_prepared.return_value = embedding + 0.01
+            result, bron = asyncio.run(run(b"similar_photo"))
+
+        assert result == [{"type": "Papier en karton", "confidence": 0.8}]
+        assert bron == BRON_INDEX
+        assert mock_service.extract_prepared.call_count == 2
+        mock_service.classify_async.assert_awaited_once()
+
+    @patch('src.pipeline.ServiceFactory')
+    def test_async_falls_back_when_deadline_expires(self, mock_factory_class):
+        """Test that a hanging Gemini call is cut off and answered locally"""
+        registry = ConfigRegistry()
+        config = dataclasses.replace(
+            registry.app_config, request_deadline_seconds=0.2, local_fallback=True
+        )
+        mock_factory, mock_service = make_services(0x2468_ACE0_1357_9BDF)
+
+        async def hang(features, **kwargs):
+            await asyncio.sleep(5)
+
+        mock_service.classify_async = AsyncMock(side_effect=hang)
+        mock_service.classify_categories.return_value = [
+            {"type": "Glas", "confidence": 0.42}
+        ]
+        mock_factory_class.return_value = mock_factory
+
+        async def run():
+            start = time.perf_counter()
+            result = await execute_classification_async(b"slow_gemini_image")
+            return result, classificatie_bron.get(), time.perf_counter() - start
+
+        with patch.object(registry, "app_config", config):
+            result, bron, elapsed = asyncio.run(run())
+
+            assert result == [{"type": "Glas", "confidence": 0.42}]
+            assert bron == BRON_FALLBACK
+            assert elapsed < 2.0
+
+            # Fallback antwoorden worden niet gecacht
+            mock_service.classify_async = AsyncMock(
+                return_value=[{"type": "Glas", "confidence": 0.9}]
+            )
+            assert asyncio.run(execute_classification_async(b"slow_gemini_image")) == [
+                {"type": "Glas", "confidence": 0.9}
+            ]
+
+    @patch('src.pipeline.ServiceFactory')
+    def test_gemini_failure_uses_fallback_or_raises(self, mock_factory_class):
+        """Test that an open circuit gives the local answer, or 503 when disabled"""
+        mock_factory, mock_service = make_services(0x1357_9BDF_2468_ACE0)
+        mock_service.classify.side_effect = ServiceNotAvailableError("Gemini circuit open")
+        # Zonder lokale mapping volgt het vaste conservatieve antwoord
+        mock_service.classify_categories.side_effect = ServiceNotAvailableError("geen mapping")
+        mock_factory_class.return_value = mock_factory
+
+        registry = ConfigRegistry()
+        with patch.object(
+            registry,
+            "app_config",
+            dataclasses.replace(registry.app_config, local_fallback=True),
+        ):
+            assert execute_classification(b"circuit_open_image") == LOKALE_FALLBACK
+
+        with patch.object(
+            registry,
+            "app_config",
+            dataclasses.replace(registry.app_config, local_fallback=False),
+        ):
+            with pytest.raises(ServiceNotAvailableError, match="circuit open"):
+                execute_classification(b"circuit_open_image")
+
+    def test_app_config_is_read_once(self):
+        """Test that a changed environment does not alter a running process"""
+        registry = ConfigRegistry()
+        with patch.dict(os.environ, {"LOCAL_FALLBACK": "true"}), patch.object(
+            registry,
+            "app_config",
+            dataclasses.replace(registry.app_config, local_fallback=False),
+        ):
+            with pytest.raises(ServiceNotAvailableError):
+                fallback_or_raise({}, ServiceNotAvailableError("Gemini circuit open"))
+
+
+    @patch('src.pipeline.ServiceFactory')
+    def test_local_mode_skips_gemini(self, mock_factory_class):
+        """Test that modus=lokaal answers from the logits without Gemini"""
+        mock_factory, mock_service = make_services(0x0F0F_0F0F_F0F0_F0F0)
+        mock_service.is_ready.side_effect = [True, False]  # lokaal klaar, Gemini niet
+        mock_service.classify_categories.return_value = [
+            {"type": "Textiel", "confidence": 0.61}
+        ]
+        mock_factory_class.return_value = mock_factory
+
+        async def run():
+            result = await execute_classification_async(b"offline_image", modus="lokaal")
+            return result, classificatie_bron.get()
+
+        result, bron = asyncio.run(run())
+
+        assert result == [{"type": "Textiel", "confidence": 0.61}]
+        assert bron == BRON_LOKAAL
+        mock_service.classify.assert_not_called()
+        mock_service.classify_async.assert_not_called()
+
+    @patch('src.pipeline.ServiceFactory')
+    def test_local_mode_ignores_near_duplicate_gemini_answer(self, mock_factory_class):
+        """Test that modus=lokaal never returns a cached Gemini classification"""
+        mock_factory, mock_service = make_services(0x5A5A_5A5A_A5A5_A5A5)
+        mock_service.classify_categories.return_value = [
+            {"type": "Textiel", "confidence": 0.61}
+        ]
+        mock_factory_class.return_value = mock_factory
+
+        gemini = execute_classification(b"gemini_photo")
+        lokaal = execute_classification(b"same_photo_resized", modus="lokaal")
+
+        assert gemini == [{"type": "Papier en karton", "confidence": 0.8}]
+        assert lokaal == [{"type": "Textiel", "confidence": 0.61}]
+        assert asyncio.run(
+            execute_classification_async(b"same_photo_again", modus="lokaal")
+        ) == [{"type": "Textiel", "confidence": 0.61}]
+
+    @patch('src.pipeline.ServiceFactory')
+    def test_debug_pipeline_matches_debug_response(self, mock_factory_class, tmp_path):
+        """Test that /debug data fits DebugResponse and profiling writes artifacts"""
+        from src.api.endpoints.classification import DebugResponse
+
+        mock_factory, mock_service = make_services(0x1234_5678_9ABC_DEF0)
+        mock_service.backend.name = "eager"
+        mock_service.classify_categories.return_value = [
+            {"type": "Glas", "confidence": 0.7}
+        ]
+        mock_factory_class.return_value = mock_factory
+        profiler = Profiler(ProfileStore(tmp_path), token="geheim")
+
+        with patch("src.pipeline.Profiling", return_value=profiler):
+            result = debug_pipeline(b"debug_image", modus="lokaal", profiel=True)
+
+        DebugResponse(**result)
+        steps = result["pipeline_steps"]
+        assert list(steps) == ["decode", "inferentie", "profiel", "lokaal", "validatie"]
+        assert steps["inferentie"]["shape"] == [1, 1000]
+        assert result["classification"] == [{"type": "Glas", "confidence": 0.7}]
+        mock_service.extract_prepared.assert_called_once_with(
+            mock_service.prepare.return_value, batched=False
+        )
+        for bestand in steps["profiel"]["bestanden"]:
+            assert profiler.store.path(bestand) is not None
+
+    def test_unknown_mode_is_rejected(self):
+        """Test that an unknown modus is a validation error (400)"""
+        with pytest.raises(ValidationError, match="modus"):
+            execute_classification(b"any_image", modus="orakel")
+
+
+class TestStagedPipeline:
+    """Unit tests for the staged pipeline engine"""
+
+    def test_stages_of_different_requests_overlap(self):
+        """CPU work for one request runs while another waits on the network"""
+        def cpu(x):
+            time.sleep(0.1)
+            return x + 1
+
+        async def network(x):
+            await asyncio.sleep(0.1)
+            return x * 10
+
+        pipeline = StagedPipeline(
+            [Stage("cpu", cpu, workers=4), Stage("net", network, workers=8, blocking=False)]
+        )
+
+        async def run():
+            start = time.perf_counter()
+            results = await asyncio.gather(*(pipeline.submit(i) for i in range(8)))
+            return results, time.perf_counter() - start
+
+        results, elapsed = asyncio.run(run())
+
+        assert results == [(i + 1) * 10 for i in range(8)]
+        assert elapsed < 8 * 0.2 / 2  # sequentieel per request: 1.6s
+        assert pipeline.stats()["cpu"]["items"] == 8
+
+    def test_batch_stage_bundles_requests(self):
+        """A batch stage receives items from several concurrent requests"""
+        sizes = []
+
+        def double_all(batch):
+            sizes.append(len(batch))
+            return [x * 2 for x in batch]
+
+        pipeline = StagedPipeline(
+            [Stage("dubbel", double_all, batch_size=4, max_wait_ms=50)]
+        )
+
+        async def run():
+            return await asyncio.gather(*(pipeline.submit(i) for i in range(10)))
+
+        assert asyncio.run(run()) == [i * 2 for i in range(10)]
+        assert max(sizes) == 4
+        assert pipeline.stats()["dubbel"]["grootste_batch"] == 4
+
+    def test_stage_metrics_track_queue_wait_and_batches(self):
+        """Each stage reports its own duration, queue wait and batch sizes"""
+        pipeline = StagedPipeline(
+            [
+                Stage("gemeten_batch", lambda b: b, batch_size=8, max_wait_ms=20),
+                Stage("gemeten_los", lambda x: x),
+            ],
+            name="metrics_test",
+        )
+
+        async def run():
+            return await asyncio.gather(*(pipeline.submit(i) for i in range(6)))
+
+        assert asyncio.run(run()) == list(range(6))
+        metrics = Metrics()
+        batch = metrics.stage_batch_size.labels("metrics_test", "gemeten_batch")
+        los = metrics.stage_seconds.labels("metrics_test", "gemeten_los")
+        wait = metrics.stage_queue_wait_seconds.labels("metrics_test", "gemeten_los")
+        assert batch.sum == 6 and batch.count < 6
+        assert los.count == 6
+        assert wait.count == 6
+        assert 'stap="gemeten_los"' in metrics.render()
+
+    def test_request_timing_per_stage(self):
+        """A submitted RequestTiming gets queue wait, duration and CPU per stage"""
+
+        def busy(x):
+            end = time.thread_time() + 0.02
+            while time.thread_time() < end:
+                pass
+            return x
+
+        async def wait(x):
+            await asyncio.sleep(0.05)
+            return x
+
+        pipeline = StagedPipeline(
+            [Stage("rekenen", busy), Stage("wachten", wait, blocking=False)]
+        )
+        timing = RequestTiming()
+
+        assert asyncio.run(pipeline.submit(1, timing=timing)) == 1
+        assert set(timing.durations) == {"wachtrij", "rekenen", "wachten"}
+        assert timing.durations["wachten"] >= 0.05
+        assert 0.02 <= timing.cpu < timing.durations["wachten"]
+
+    def test_done_and_errors_affect_only_their_request(self):
+        """Done skips later stages; an exception fails just that request"""
+        later = MagicMock(side_effect=lambda x: x)
+
+        def first(x):
+            if x == "fout":
+                raise ValueError("kapot")
+            return Done("klaar") if x == "cache" else x
+
+        pipeline = StagedPipeline([first, later])
+
+        async def run():
+            return await asyncio.gather(
+                pipeline.submit("cache"),
+                pipeline.submit("fout"),
+                pipeline.submit("door"),
+                return_exceptions=True,
+            )
+
+        cached, error, normal = asyncio.run(run())
+
+        assert cached == "klaar"
+        assert isinstance(error, ValueError)
+        assert normal == "door"
+        later.assert_called_once_with("door")
+
+    def test_full_first_queue_is_rejected(self):
+        """A full entry queue gives 503 semantics instead of unbounded waiting"""
+        release = threading.Event()
+        pipeline = StagedPipeline(
+            [Stage("traag", lambda x: release.wait(5) and x, queue_size=1)]
+        )
+
+        async def run():
+            first = asyncio.ensure_future(pipeline.submit(1))
+            await asyncio.sleep(0.05)  # eerste job bezet de enige werker
+            second = asyncio.ensure_future(pipeline.submit(2))
+            await asyncio.sleep(0)
+            with pytest.raises(ServiceNotAvailableError, match="overbelast"):
+                await pipeline.submit(3)
+            release.set()
+            return await asyncio.gather(first, second)
+
+        assert asyncio.run(run()) == [1, 2]
+
+    def test_custom_pipeline_helpers(self):
+        """create_custom_pipeline and add_pipeline_step work called and staged"""
+        pipeline = add_pipeline_step(
+            create_custom_pipeline(lambda x: x + 1, lambda x: x * 3), lambda x: x - 2
+        )
+        assert pipeline(1) == 4
+        assert asyncio.run(pipeline.submit(2)) == 7
+
+        composed = add_pipeline_step(lambda x: x + 1, lambda x: x * 2)
+        assert composed(3) == 8
+
+
+class TestBoundedExecutor:
+    """Unit tests for bounded worker pools"""
+
+    def test_rejects_when_saturated(self):
+        """Test that a full pool and queue reject new work with 503 semantics"""
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+        release = threading.Event()
+
+        async def run():
+            blocking = asyncio.ensure_future(executor.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            assert executor.stats()["verzadigd"] is True
+            with pytest.raises(ServiceNotAvailableError, match="overbelast"):
+                await executor.run(lambda: None)
+            release.set()
+            await blocking
+
+        asyncio.run(run())
+        stats = executor.stats()
+        assert stats["afgewezen"] == 1
+        assert stats["voltooid"] == 1
+        assert stats["actief"] == 0
+
+    def test_cancelled_run_keeps_slot_until_thread_finishes(self):
+        """Test that a deadline cancel does not free the slot of a busy thread"""
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+        release = threading.Event()
+
+        async def run():
+            blocking = asyncio.ensure_future(executor.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            blocking.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await blocking
+            assert executor.stats()["actief"] == 1
+            with pytest.raises(ServiceNotAvailableError, match="overbelast"):
+                await executor.run(lambda: None)
+
+        asyncio.run(run())
+        release.set()
+        deadline = time.monotonic() + 2
+        while executor.stats()["actief"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert executor.stats()["actief"] == 0
+        assert executor.stats()["voltooid"] == 1
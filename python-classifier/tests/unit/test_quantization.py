@@ -0,0 +1,58 @@
+"""Unit tests for INT8 quantization and parity checks"""
+
+import pytest
+import torch
+import torch.ao.nn.quantized.dynamic as nnqd
+from torch import nn
+
+from src.services.quantization import check_parity, compare_outputs, quantize_int8
+
+
+def make_model() -> nn.Module:
+    """Small conv + linear model as ConvNeXt stand-in"""
+    torch.manual_seed(0)
+    return nn.Sequential(
+        nn.Conv2d(3, 8, 3, padding=1),
+        nn.AdaptiveAvgPool2d(1),
+        nn.Flatten(),
+        nn.Linear(8, 64),
+        nn.GELU(),
+        nn.Linear(64, 10),
+    ).eval()
+
+
+class TestQuantization:
+    """Unit tests for quantization helpers"""
+
+    def test_quantize_linear_layers_only_by_default(self):
+        """Linear layers are replaced, conv layers stay fp32"""
+        modules = list(quantize_int8(make_model()).modules())
+        assert sum(isinstance(m, nnqd.Linear) for m in modules) == 2
+        assert sum(type(m) is nn.Linear for m in modules) == 0
+        assert sum(type(m) is nn.Conv2d for m in modules) == 1
+
+    def test_quantize_conv_layers_when_requested(self):
+        """include_conv also converts Conv2d"""
+        modules = list(quantize_int8(make_model(), include_conv=True).modules())
+        assert sum(isinstance(m, nnqd.Conv2d) for m in modules) == 1
+
+    def test_parity_with_fp32(self):
+        """Quantized output stays close to fp32 and stats drift is reported"""
+        model = make_model()
+        report = check_parity(model, quantize_int8(model), torch.randn(4, 3, 16, 16))
+
+        assert report["ok"] is True
+        assert report["min_cosine"] > 0.99
+        assert set(report["stats_drift"]) >= {"mean", "std", "median", "q25", "q75"}
+
+    def test_compare_identical_outputs(self):
+        """Identical tensors have zero drift"""
+        tensor = torch.randn(2, 10)
+        report = compare_outputs(tensor, tensor.clone())
+        assert report["max_abs_diff"] == 0.0
+        assert report["top1_overeenkomst"] == 1.0
+        assert all(v == 0.0 for v in report["stats_drift"].values())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,13 +1,39 @@
 """Unit tests for AfvalAlert components"""
 
+import asyncio
+import os
 import pytest
 import torch
+import yaml
 from PIL import Image
 import io
+from unittest.mock import AsyncMock, MagicMock, patch
+import dataclasses
+import signal
 from src.config.app_config import AppConfig
 from src.config.afval_config import AfvalConfig
-from src.features.response_validation import validate_gemini_response
-from src.features.tensor_processing import extract_tensor_stats, format_feature_description
+from src.config.config_registry import ConfigSnapshot, ReloadingConfig
+from src.decorators.logging_decorator import logged
+from src.context_managers.image_context import decoded_image
+from src.features.batch_preprocessing import BatchPreprocessor
+from src.features.category_mapping import CategoryMapping
+from src.features.image_decoding import apply_transform, min_decode_side
+from src.features.response_validation import (
+    split_batch_response,
+    validate_gemini_response,
+)
+from src.features.tensor_processing import (
+    extract_tensor_stats,
+    extract_tensor_stats_batch,
+    extract_tensor_stats_many,
+    format_feature_description,
+    reference_tensor_stats,
+)
+from src.exceptions.service_exceptions import ServiceNotAvailableError
+from src.monitoring.metrics import Metrics, MetricsRegistry
+from src.monitoring.profiling import Profiler, ProfileStore
+from src.services import warmup
+from src.services.warmup import WarmupStatus, run_warmup, warmup_batch_sizes
 
 class TestUtilityFunctions:
     """Unit tests for utility functions"""
@@ -88,6 +114,30 @@ class TestUtilityFunctions:
         assert 'CONVNEXT BASE MODEL ANALYSE RESULTAAT:' in description
         assert 'Gemiddelde activatie: 0.500' in description
 
+    def test_split_batch_response_by_index(self):
+        """Bundled replies are split per image and validated separately"""
+        valid_types = ['Glas', 'Papier en karton']
+        response = {
+            '2': [{'type': 'Papier en karton', 'confidence': 0.7}],
+            '1': [{'type': 'Glas', 'confidence': 0.9}, {'type': 'Onzin', 'confidence': 0.5}],
+        }
+
+        parts = split_batch_response(response, 2, valid_types)
+        assert parts == [
+            [{'type': 'Glas', 'confidence': 0.9}],
+            [{'type': 'Papier en karton', 'confidence': 0.7}],
+        ]
+
+    def test_split_batch_response_marks_missing_sections(self):
+        """Missing or malformed sections become None, lists are read positionally"""
+        valid_types = ['Glas']
+        assert split_batch_response({'1': []}, 3, valid_types) == [[], None, None]
+        assert split_batch_response({'1': 'Glas'}, 1, valid_types) == [None]
+        assert split_batch_response(
+            [[{'type': 'Glas', 'confidence': 0.4}], []], 2, valid_types
+        ) == [[{'type': 'Glas', 'confidence': 0.4}], []]
+        assert split_batch_response('geen json object', 2, valid_types) == [None, None]
+
 class TestConfiguration:
     """Unit tests for configuration classes"""
     
@@ -99,6 +149,9 @@ class TestConfiguration:
         assert config.max_file_size == 20 * 1024 * 1024  # 20MB in bytes
         assert config.device in ['cuda', 'cpu']
         assert config.model_name == 'convnext_base_384_in22k_ft_in1k'
+        # Verzonnen fallback antwoorden alleen op verzoek
+        with patch.dict(os.environ, {}, clear=True):
+            assert AppConfig().local_fallback is False
     
     def test_afval_config_loading(self):
         """Test AfvalConfig loading from YAML"""
@@ -112,5 +165,495 @@ class TestConfiguration:
         assert isinstance(config.prompt_template, str)
         assert len(config.prompt_template) > 0
 
+
+class TestConfigRegistry:
+    """Unit tests for the load-once, reload-on-mtime config registry"""
+
+    YAML = (
+        'afval_types: ["Glas", "{extra}"]\n'
+        'gemini_prompt_template: "Types: {{afval_types}} | {{lokaal_resultaat}}"\n'
+    )
+
+    def write(self, path, extra, mtime):
+        path.write_text(self.YAML.format(extra=extra), encoding="utf-8")
+        os.utime(path, (mtime, mtime))
+
+    def test_loads_once_and_reloads_on_new_mtime(self, tmp_path):
+        """The YAML is parsed once; a changed mtime swaps in a new snapshot"""
+        path = tmp_path / "afval_types.yaml"
+        self.write(path, "Textiel", 1_000_000)
+
+        spy = patch("src.config.afval_config.yaml.safe_load", wraps=yaml.safe_load)
+        with spy as parse:
+            registry = ReloadingConfig(path, "gemini-test", check_seconds=0)
+            first = registry.current()
+            for _ in range(10):
+                assert registry.current() is first
+            assert parse.call_count == 1
+
+            self.write(path, "Organisch", 1_000_100)
+            second = registry.current()
+
+        assert parse.call_count == 2
+        assert second.afval_config.afval_types == ["Glas", "Organisch"]
+        assert second.versie == first.versie + 1
+        assert second.fingerprint != first.fingerprint
+
+    def test_broken_file_keeps_previous_snapshot(self, tmp_path):
+        """A half-written file does not replace a working config with defaults"""
+        path = tmp_path / "afval_types.yaml"
+        self.write(path, "Textiel", 1_000_000)
+        registry = ReloadingConfig(path, "gemini-test", check_seconds=0)
+        first = registry.current()
+
+        path.write_text("afval_types: [Glas", encoding="utf-8")
+        os.utime(path, (1_000_100, 1_000_100))
+
+        assert registry.current() is first
+        assert registry.stats()["herlaad_fouten"] == 1
+
+    def test_prerendered_prompts_match_format(self):
+        """Pre-rendered static prompt parts give the same text as str.format"""
+        config = AfvalConfig.from_yaml()
+        snapshot = ConfigSnapshot.build(config, "gemini-test")
+        types = ", ".join(config.afval_types)
+        beschrijving = "- Mediaan: 0.123 {geen placeholder}"
+
+        assert snapshot.render_prompt(beschrijving) == config.prompt_template.format(
+            afval_types=types, lokaal_resultaat=beschrijving
+        )
+        assert snapshot.render_batch_prompt(2, "AFBEELDING 1: ...") == (
+            config.batch_prompt_template.format(
+                aantal=2, afval_types=types, afbeeldingen="AFBEELDING 1: ..."
+            )
+        )
+
+class TestImageDecoding:
+    """Unit tests for the single-pass decode stage"""
+
+    @staticmethod
+    def jpeg_bytes(mode="RGB", size=(320, 240)):
+        buffer = io.BytesIO()
+        Image.radial_gradient("L").resize(size).convert(mode).save(buffer, format="JPEG")
+        return buffer.getvalue()
+
+    def test_matches_double_decode_path(self):
+        """Single pass produces the same tensor as open + convert + transform"""
+        from timm.data import create_transform
+
+        transform = create_transform(input_size=(3, 64, 64), crop_pct=0.875)
+        data = self.jpeg_bytes()
+
+        with decoded_image(data, 1024 * 1024) as (img, decode_duur):
+            tensor, timings = apply_transform(transform, img)
+        reference = transform(Image.open(io.BytesIO(data)).convert("RGB"))
+
+        assert torch.equal(tensor, reference)
+        assert decode_duur > 0
+        assert set(timings) == {"resize", "normalize"}
+
+    def test_converts_grayscale_to_rgb(self):
+        """Non-RGB uploads are converted once after decoding"""
+        with decoded_image(self.jpeg_bytes(mode="L"), 1024 * 1024) as (img, _):
+            assert img.mode == "RGB"
+
+    @pytest.mark.parametrize("data,max_bytes,message", [
+        (b"", 1024, "Geen afbeelding"),
+        (b"x" * 2048, 1024, "te groot"),
+        (b"geen afbeelding", 1024, "Ongeldige"),
+    ])
+    def test_rejects_invalid_input(self, data, max_bytes, message):
+        """Empty, oversized and undecodable uploads raise ValueError"""
+        with pytest.raises(ValueError, match=message):
+            with decoded_image(data, max_bytes):
+                pass
+
+    def test_rejects_truncated_image(self):
+        """A valid header with truncated pixel data fails at decode"""
+        data = self.jpeg_bytes()
+        with pytest.raises(ValueError, match="Ongeldige"):
+            with decoded_image(data[: len(data) // 2], 1024 * 1024):
+                pass
+
+    @pytest.mark.parametrize("fmt, mode", [
+        ("JPEG", "RGB"),
+        ("PNG", "RGB"),
+        ("GIF", "P"),
+        ("PNG", "P"),
+        ("PNG", "1"),
+    ])
+    def test_reduced_decode_keeps_model_resolution(self, fmt, mode):
+        """Reduced decode shrinks large photos but never below the resize target"""
+        from timm.data import create_transform
+
+        transform = create_transform(input_size=(3, 64, 64), crop_pct=1.0)
+        buffer = io.BytesIO()
+        Image.radial_gradient("L").resize((1200, 900)).convert(mode).save(
+            buffer, format=fmt
+        )
+        data = buffer.getvalue()
+        min_side = min_decode_side(transform)
+
+        with decoded_image(data, len(data), min_side) as (img, _):
+            assert 64 <= min(img.size) < 900
+            reduced, _ = apply_transform(transform, img)
+        with decoded_image(data, len(data)) as (img, _):
+            full, _ = apply_transform(transform, img)
+
+        assert min_side == 64
+        assert (reduced - full).abs().mean() < 0.05
+
+
+class TestBatchPreprocessor:
+    """Parity of vectorized preprocessing with the timm eval transform"""
+
+    SIZES = [(640, 480), (333, 777), (1000, 1000), (384, 384), (500, 385), (97, 61)]
+
+    @staticmethod
+    def data_config(**overrides):
+        config = {
+            "input_size": (3, 224, 224),
+            "interpolation": "bicubic",
+            "mean": (0.485, 0.456, 0.406),
+            "std": (0.229, 0.224, 0.225),
+            "crop_pct": 0.875,
+            "crop_mode": "center",
+        }
+        config.update(overrides)
+        return config
+
+    @pytest.mark.parametrize("overrides", [
+        {},
+        {"input_size": (3, 384, 384), "crop_pct": 1.0},
+        {"interpolation": "bilinear", "crop_pct": 0.95},
+        {"mean": (0.5, 0.5, 0.5), "std": (0.5, 0.5, 0.5)},
+    ])
+    def test_matches_timm_transform(self, overrides):
+        """Batch output equals stacking timm's per-image transform"""
+        from timm.data import create_transform
+
+        config = self.data_config(**overrides)
+        transform = create_transform(**config)
+        preprocessor = BatchPreprocessor.from_data_config(config)
+        images = [Image.effect_noise(size, 60).convert("RGB") for size in self.SIZES]
+
+        reference = torch.stack([transform(img) for img in images])
+        batch = preprocessor.collate([preprocessor.to_pixels(img) for img in images])
+
+        assert batch.shape == reference.shape
+        assert batch.dtype == torch.float32
+        torch.testing.assert_close(batch, reference, rtol=0, atol=1e-5)
+
+    def test_reuses_preallocated_buffer(self):
+        """Smaller batches write into the same buffer as earlier larger ones"""
+        preprocessor = BatchPreprocessor.from_data_config(self.data_config())
+        pixels = preprocessor.to_pixels(Image.new("RGB", (300, 200), "red"))
+
+        first = preprocessor.collate([pixels] * 4)
+        second = preprocessor.collate([pixels] * 2)
+        assert second.data_ptr() == first.data_ptr()
+        assert second.shape[0] == 2
+
+    @pytest.mark.parametrize("overrides", [
+        {"crop_mode": "squash"},
+        {"crop_pct": 1.15},
+        {"input_size": (3, 224, 320)},
+    ])
+    def test_unsupported_config_falls_back(self, overrides):
+        """Configs the engine cannot reproduce exactly return None"""
+        assert BatchPreprocessor.from_data_config(self.data_config(**overrides)) is None
+
+
+class TestFusedTensorStats:
+    """Exact parity of the fused stats kernel with the multi-pass reference"""
+
+    @pytest.mark.parametrize("shape", [(1, 1000), (1, 768), (1, 1024), (4, 1000), (1, 3, 7, 9), (1, 5)])
+    @pytest.mark.parametrize("seed", range(5))
+    def test_matches_reference_exactly(self, shape, seed):
+        """Every statistic is bit-identical to the original implementation"""
+        generator = torch.Generator().manual_seed(seed)
+        tensor = torch.randn(*shape, generator=generator) * (seed + 0.5) + (seed - 2)
+        assert extract_tensor_stats(tensor) == reference_tensor_stats(tensor)
+
+    def test_matches_reference_with_ties(self):
+        """ReLU-style outputs with many equal values select the same quantiles"""
+        tensor = torch.randn(1, 1000).relu()
+        assert extract_tensor_stats(tensor) == reference_tensor_stats(tensor)
+
+    def test_batch_returns_per_sample_stats(self):
+        """Batch rows equal separate calls on each (1, ...) sample"""
+        batch = torch.randn(16, 1000)
+        expected = [reference_tensor_stats(sample) for sample in batch.split(1)]
+        assert extract_tensor_stats_batch(batch) == expected
+
+    def test_non_cpu_path_matches_reference(self, monkeypatch):
+        """The torch-only path (used for GPU and half precision) also matches"""
+        import src.features.tensor_processing as tensor_processing
+
+        monkeypatch.setattr(
+            tensor_processing, "_batch_values_numpy", tensor_processing._batch_values_torch
+        )
+        batch = torch.randn(8, 1000)
+        expected = [reference_tensor_stats(sample) for sample in batch.split(1)]
+        assert extract_tensor_stats_batch(batch) == expected
+
+    def test_many_matches_single_calls(self):
+        """Stats for separate request tensors equal one extract_tensor_stats each"""
+        tensors = [torch.randn(1, 1000) for _ in range(5)] + [torch.randn(768)]
+        assert extract_tensor_stats_many(tensors) == [
+            extract_tensor_stats(t) for t in tensors
+        ]
+        assert extract_tensor_stats_many([]) == []
+
+
+class TestMetrics:
+    """Unit tests for the Prometheus metrics registry"""
+
+    def test_histogram_renders_cumulative_buckets(self):
+        """Buckets are cumulative and end in +Inf, followed by sum and count"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_seconds", "Test", ["stap"], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.labels(stap="decode").observe(value)
+
+        lines = registry.render().splitlines()
+
+        assert lines[:2] == ["# HELP test_seconds Test", "# TYPE test_seconds histogram"]
+        assert lines[2:] == [
+            'test_seconds_bucket{stap="decode",le="0.1"} 1',
+            'test_seconds_bucket{stap="decode",le="1"} 3',
+            'test_seconds_bucket{stap="decode",le="+Inf"} 4',
+            'test_seconds_sum{stap="decode"} 4.05',
+            'test_seconds_count{stap="decode"} 4',
+        ]
+
+    def test_counters_gauges_and_collectors(self):
+        """Label values are escaped and collectors run before every render"""
+        registry = MetricsRegistry()
+        errors = registry.counter("test_errors_total", "Fouten", ["fout"])
+        depth = registry.gauge("test_depth", "Wachtrij")
+        registry.add_collector(lambda: depth.set(7))
+
+        errors.labels('a"b').inc()
+        errors.labels('a"b').inc(2)
+
+        text = registry.render()
+        assert 'test_errors_total{fout="a\\"b"} 3' in text
+        assert "test_depth 7" in text
+        assert registry.counter("test_errors_total", "Fouten", ["fout"]) is errors
+        with pytest.raises(ValueError):
+            registry.gauge("test_errors_total", "Fouten")
+
+    def test_const_labels_on_every_sample(self):
+        """Constant labels (worker pid) go on every sample, before le"""
+        registry = MetricsRegistry()
+        registry.counter("test_total", "Calls").inc()
+        histogram = registry.histogram("test_seconds", "Duur", buckets=(1,))
+        histogram.observe(0.5)
+
+        lines = registry.render({"worker": "42"}).splitlines()
+
+        assert 'test_total{worker="42"} 1' in lines
+        assert 'test_seconds_bucket{worker="42",le="1"} 1' in lines
+        assert 'test_seconds_count{worker="42"} 1' in lines
+
+    def test_logged_records_duration_and_errors(self):
+        """@logged observes every call and counts exceptions by type"""
+
+        @logged
+        def gemeten(fail):
+            if fail:
+                raise KeyError("weg")
+            return "ok"
+
+        name = f"{gemeten.__module__}.{gemeten.__qualname__}"
+        metrics = Metrics()
+        assert gemeten(False) == "ok"
+        with pytest.raises(KeyError):
+            gemeten(True)
+
+        assert metrics.call_seconds.labels(name).count == 2
+        assert metrics.calls_in_flight.labels(name).value == 0
+        assert metrics.call_errors.labels(name, "KeyError").value == 1
+
+
+class TestProfiler:
+    """Unit tests for on-demand profiling"""
+
+    def test_capture_writes_pstats_and_chrome_trace(self, tmp_path):
+        """Both artifacts are written and the summary lists the hot functions"""
+        import json
+        import pstats
+
+        profiler = Profiler(ProfileStore(tmp_path), token="geheim")
+        model = torch.nn.Linear(16, 4)
+
+        result, summary = profiler.capture(
+            "20260101-120000-0000abcd", model, torch.ones(2, 16)
+        )
+
+        assert result.shape == (2, 4)
+        pstats_file, trace_file = (tmp_path / name for name in summary["bestanden"])
+        assert pstats.Stats(str(pstats_file)).total_calls > 0
+        assert "traceEvents" in json.loads(trace_file.read_text())
+        assert summary["top"] and not profiler.busy()
+
+    def test_store_prunes_and_rejects_unknown_names(self, tmp_path):
+        """Only generated names are served and the oldest profiles are removed"""
+        store = ProfileStore(tmp_path, max_profiles=2)
+        ids = [f"20260101-12000{i}-0000abcd" for i in range(3)]
+        for i, profile_id in enumerate(ids):
+            for path in store.paths(profile_id):
+                path.write_text("x")
+                os.utime(path, (1000 + i, 1000 + i))
+        store.prune()
+
+        assert store.path(f"{ids[0]}.pstats") is None
+        assert store.path(f"{ids[2]}.trace.json") is not None
+        assert store.path("../geheim.pstats") is None
+        assert [a["bestand"] for a in store.artifacts()][0].startswith(ids[2])
+
+    def test_token_and_single_capture(self, tmp_path):
+        """Without a token profiling is off; a running capture rejects a second"""
+        assert not Profiler(ProfileStore(tmp_path)).authorized("")
+        profiler = Profiler(ProfileStore(tmp_path), token="geheim", sample_rate=1.0)
+        assert profiler.authorized("geheim") and not profiler.authorized("fout")
+        assert profiler.sample()
+
+        def nested():
+            return profiler.capture("20260101-120000-0000beef", lambda: None)
+
+        with pytest.raises(ServiceNotAvailableError, match="profiel"):
+            profiler.capture("20260101-120000-0000abcd", nested)
+
+
+class TestWarmup:
+    """Unit tests for the startup load with retries"""
+
+    def setup_method(self):
+        self.config = dataclasses.replace(
+            AppConfig(), warmup_max_attempts=3, warmup_retry_seconds=1.0
+        )
+        self.lokale = MagicMock()
+        self.factory = MagicMock()
+        self.factory.create_lokale_service.return_value = self.lokale
+        self.state = WarmupStatus()
+
+    def test_batch_sizes_default_to_single_and_max(self):
+        """Warmup runs batch size 1 and the micro-batch maximum by default"""
+        config = dataclasses.replace(self.config, batch_max_size=8)
+        assert warmup_batch_sizes(config) == (1, 8)
+        config = dataclasses.replace(config, warmup_batch_sizes=(2, 4))
+        assert warmup_batch_sizes(config) == (2, 4)
+
+    def test_startup_warmup_is_opt_in(self):
+        """The lifespan only loads the model eagerly with WARMUP_ON_STARTUP"""
+        import importlib
+
+        # src.api.app is ook de naam van de FastAPI instantie in src.api
+        app_module = importlib.import_module("src.api.app")
+
+        async def start_and_stop():
+            async with app_module.lifespan(app_module.app):
+                pass
+
+        for enabled in (False, True):
+            config = dataclasses.replace(self.config, warmup_on_startup=enabled)
+            with patch.object(app_module, "AppConfig", return_value=config), \
+                    patch("src.services.warmup.start_warmup") as start, \
+                    patch("src.cache.embedding_cache.EmbeddingCache"), \
+                    patch(
+                        "src.services.implementations.gemini_service.GeminiService"
+                    ) as gemini:
+                gemini.return_value.aclose = AsyncMock()
+                asyncio.run(start_and_stop())
+            assert start.called is enabled
+
+    def test_failed_warmup_is_retried(self):
+        """A load error is retried with doubling delays until it succeeds"""
+        self.lokale.warmup.side_effect = [OSError("schijf vol"), OSError("nog"), None]
+
+        with patch.object(warmup, "ServiceFactory", return_value=self.factory), \
+                patch.object(warmup.time, "sleep") as sleep, \
+                patch.object(warmup.os, "kill") as kill, \
+                patch.object(self.state, "status", "niet_gestart"), \
+                patch.object(self.state, "fout", None), \
+                patch.object(self.state, "pogingen", 0):
+            run_warmup(self.config)
+            assert self.state.status == "klaar"
+            assert self.state.pogingen == 3
+            assert self.state.fout is None
+
+        assert [c.args[0] for c in sleep.call_args_list] == [1.0, 2.0]
+        kill.assert_not_called()
+
+    def test_persistent_failure_stops_process(self):
+        """After the last attempt the process is terminated, not left unready"""
+        self.lokale.warmup.side_effect = RuntimeError("model kapot")
+
+        with patch.object(warmup, "ServiceFactory", return_value=self.factory), \
+                patch.object(warmup.time, "sleep"), \
+                patch.object(warmup.os, "kill") as kill, \
+                patch.object(self.state, "status", "niet_gestart"), \
+                patch.object(self.state, "fout", None), \
+                patch.object(self.state, "pogingen", 0):
+            run_warmup(self.config)
+            assert self.state.status == "mislukt"
+
+        assert self.lokale.warmup.call_count == 3
+        kill.assert_called_once_with(os.getpid(), signal.SIGTERM)
+
+
+class TestCategoryMapping:
+    """ImageNet logits to afval types through the sparse config matrix"""
+
+    TYPES = ["Glas", "Textiel", "Overig"]
+
+    def test_matches_dense_reference_for_batch(self):
+        """One softmax and sparse matmul equals a dense per-class sum"""
+        mapping = CategoryMapping(
+            self.TYPES, {"Glas": [1, 2], "Textiel": [2, 3]}, rest_type="Overig", num_classes=6
+        )
+        logits = torch.randn(5, 6)
+        kansen = torch.softmax(logits, dim=-1)
+        expected = torch.stack(
+            [
+                kansen[:, 1] + kansen[:, 2] / 2,
+                kansen[:, 2] / 2 + kansen[:, 3],
+                kansen[:, 0] + kansen[:, 4] + kansen[:, 5],
+            ],
+            dim=1,
+        )
+        assert torch.allclose(mapping.scores(logits), expected, atol=1e-6)
+        assert torch.allclose(mapping.scores(logits).sum(dim=1), torch.ones(5))
+
+    def test_classify_returns_sorted_top_types(self):
+        """Results have the Gemini answer shape, highest confidence first"""
+        mapping = CategoryMapping(self.TYPES, {"Glas": [0], "Textiel": [1]}, num_classes=3)
+        logits = torch.tensor([[2.0, 3.0, -10.0], [6.0, 0.0, 0.0]])
+
+        first, second = mapping.classify(logits)
+        assert [item["type"] for item in first] == ["Textiel", "Glas"]
+        assert second[0]["type"] == "Glas"
+        assert all(0.0 <= item["confidence"] <= 1.0 for item in first + second)
+        assert validate_gemini_response(first, self.TYPES) == first
+
+    def test_shipped_config_is_valid(self):
+        """The imagenet_mapping in afval_types.yaml builds against the afval types"""
+        config = AfvalConfig.from_yaml()
+        mapping = CategoryMapping.from_config(config.imagenet_mapping, config.afval_types)
+        assert mapping is not None
+        assert mapping.matrix.shape == (len(config.afval_types), 1000)
+        assert len(mapping.classify(torch.randn(1, 1000))[0]) >= 1
+
+    def test_rejects_unknown_types_and_indices(self):
+        """Config mistakes fail loudly instead of silently dropping mass"""
+        with pytest.raises(ValueError, match="Plastic"):
+            CategoryMapping(self.TYPES, {"Plastic": [1]})
+        with pytest.raises(ValueError, match="buiten bereik"):
+            CategoryMapping(self.TYPES, {"Glas": [1000]})
+        assert CategoryMapping.from_config({}, self.TYPES) is None
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
\ No newline at end of file